@@ -2,28 +2,67 @@
 # Punto de entrada principal del backend FastAPI.
 # Aquí se inicializa la app, se crean las tablas y se incluyen los routers (rutas API).
 # app.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from database import Base, engine
+from database_async import async_engine
 from routes import (
     usuarios_routes,
     clientes_routes,
     entrada_routes,
     salida_routes,
     resumen_routes,
-    ajuste_routes
+    ajuste_routes,
+    facturacion_routes
 )
+from services.time_service import obtener_fecha_actual
+from services.periodo_service import asegurar_periodo
+from services import alerta_worker
+from services import resumen_buffer
+from services import group_commit
+from services import reserva_service
+from services import saldo_diario_service
+from services import cierre_anual
 
 
 # 🔹 Crear las tablas en la base de datos si no existen
 Base.metadata.create_all(bind=engine)
 
+# 🔹 Arranque / apagado de tareas en segundo plano
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rollover del período vigente fuera de las peticiones
+    asegurar_periodo(obtener_fecha_actual())
+    # Cierres anuales que quedaron a medias (caída o reinicio)
+    cierre_anual.reanudar_pendientes()
+    # Despacho de alertas por correo (outbox)
+    alerta_worker.iniciar()
+    # Volcado periódico de contadores (solo con RESUMEN_WRITE_BEHIND=1)
+    resumen_buffer.iniciar()
+    # Committer compartido de salidas (solo con GROUP_COMMIT=1)
+    group_commit.iniciar()
+    # Volcado de consumos y vencimiento de reservas de folios
+    reserva_service.iniciar()
+    # Saldos diarios consolidados (consultas de saldo a una fecha)
+    saldo_diario_service.iniciar()
+    yield
+    saldo_diario_service.detener()
+    reserva_service.detener()
+    group_commit.detener()
+    resumen_buffer.detener()
+    alerta_worker.detener()
+    await async_engine.dispose()
+
+
 # 🔹 Inicializar la app FastAPI
 app = FastAPI(
     title="API Control de Folios Electrónicos",
     description="Sistema backend para gestión de usuarios y control de folios",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 🔹 CORS (OBLIGATORIO PARA FRONTEND)
@@ -38,6 +77,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El frontend lee el cursor de la siguiente página y los ETag
+    expose_headers=["X-Siguiente-Cursor", "ETag"],
 )
 
 # 🔹 Registrar los routers
@@ -47,6 +88,7 @@ app.include_router(entrada_routes.router)
 app.include_router(salida_routes.router)
 app.include_router(resumen_routes.router)
 app.include_router(ajuste_routes.router)
+app.include_router(facturacion_routes.router)
 
 # 🔹 Ruta raíz
 @app.get("/")
@@ -4,20 +4,58 @@ Todas las verificaciones de permisos se hacen en las rutas (routes),
 aquí sólo operaciones puras contra la base de datos.
 """
 
+import os
+
+from sqlalchemy import Boolean, and_, func, insert, select, type_coerce
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from services.time_service import obtener_fecha_actual
+from services import cliente_cache, resumen_buffer
+from services.paginacion import paginar, paginar_por
+from services.serializacion import columnas
 
 from models.cliente_model import Cliente
 from models.resumen_mensual_model import ResumenMensual
-from models.resumen_anual_model import ResumenAnual
 
-from schemas.cliente_schema import ClienteCreate, ClienteUpdate
+from schemas.cliente_schema import ClienteCreate, ClienteUpdate, ClienteResponse
+from crud.crud_resumen import COLUMNAS_SALIDA, insertar_periodos
+from crud.crud_saldos import registrar_movimiento, registrar_movimientos, sumar_saldo
+
+# Tamaño de los IN (...) de la importación masiva
+IMPORTACION_LOTE = int(os.getenv("IMPORTACION_LOTE", "1000"))
 
 
 # ======================================================
 #                   CREAR CLIENTE
 # ======================================================
+def _nuevo_cliente(cliente: ClienteCreate) -> dict:
+    return {
+        "nombre": cliente.nombre,
+        "nit": cliente.nit,
+        "saldo_actual": cliente.saldo_actual or 0,
+        "bloqueado": cliente.bloqueado or False,
+        "minimo_alerta": cliente.minimo_alerta,
+        "inactivo": cliente.inactivo or False,
+        "valor_folio": cliente.valor_folio,
+        "correo_electronico": cliente.correo_electronico,
+    }
+
+
+def _periodos_clientes(db: Session, ids: list[int]):
+    """Resumen anual + 12 mensuales del año actual (solo el mes actual abierto)."""
+    hoy = obtener_fecha_actual()
+
+    for i in range(0, len(ids), IMPORTACION_LOTE):
+        insertar_periodos(
+            db,
+            select(Cliente.id.label("cliente_id"), Cliente.saldo_actual.label("saldo"))
+            .where(Cliente.id.in_(ids[i:i + IMPORTACION_LOTE])),
+            hoy.year,
+            hoy.month
+        )
+
+
 def create_cliente(db: Session, cliente: ClienteCreate) -> Cliente:
     """
     Crea un nuevo cliente y genera:
@@ -26,6 +64,7 @@ def create_cliente(db: Session, cliente: ClienteCreate) -> Cliente:
     Regla:
     - SOLO el mes actual queda abierto
     - Los demás meses quedan cerrados
+    Todo en una sola transacción.
     """
 
     # -------------------------------
@@ -41,114 +80,218 @@ def create_cliente(db: Session, cliente: ClienteCreate) -> Cliente:
     # -------------------------------
     # Crear cliente
     # -------------------------------
-    nuevo = Cliente(
-        nombre=cliente.nombre,
-        nit=cliente.nit,
-        saldo_actual=cliente.saldo_actual or 0,
-        bloqueado=cliente.bloqueado or False,
-        minimo_alerta=cliente.minimo_alerta,
-        inactivo=cliente.inactivo or False,
-        valor_folio=cliente.valor_folio,
-        correo_electronico=cliente.correo_electronico
-    )
+    nuevo = Cliente(**_nuevo_cliente(cliente))
 
     db.add(nuevo)
-    db.commit()
+    db.flush()
+
+    try:
+        # Saldo inicial → primer movimiento del libro
+        registrar_movimiento(db, nuevo.id, nuevo.saldo_actual, "apertura")
+
+        _periodos_clientes(db, [nuevo.id])
+
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error creando resúmenes del cliente: {str(e)}"
+        )
+
     db.refresh(nuevo)
+    return nuevo
+
+
+# ======================================================
+#            IMPORTAR CLIENTES (carga masiva)
+# ======================================================
+def importar_clientes(db: Session, clientes: list[tuple[int, ClienteCreate]]) -> dict[int, dict]:
+    """
+    Crea en una sola transacción los clientes (índice, datos) que no
+    choquen por NIT, con su movimiento de apertura y sus resúmenes.
+    Devuelve {indice: {estado, mensaje, cliente_id}}.
+    """
+    resultados: dict[int, dict] = {}
 
     # -------------------------------
-    # Fechas actuales
+    # NIT repetidos en el archivo
     # -------------------------------
-    hoy = obtener_fecha_actual()
-    print(f"Fecha actual obtenida: {hoy}")  # Debug: Verificar fecha actual
-    anio_actual = hoy.year
-    mes_actual = hoy.month
+    primeros: dict[str, int] = {}
+    for indice, cliente in clientes:
+        if cliente.nit in primeros:
+            resultados[indice] = {
+                "estado": "error",
+                "mensaje": f"NIT repetido en el archivo (registro {primeros[cliente.nit]})",
+                "cliente_id": None
+            }
+        else:
+            primeros[cliente.nit] = indice
 
-
-    try:
-        # ==================================================
-        # Resumen anual
-        # ==================================================
-        resumen_anual = ResumenAnual(
-            cliente_id=nuevo.id,
-            anio=anio_actual,
-            total_facturas=0,
-            total_notas_credito=0,
-            total_notas_debito=0,
-            total_documentos_soporte=0,
-            total_ajuste_documentos_soporte=0,  # ✅ corregido
-            total_nomina_electronica=0,
-            total_ajuste_nomina=0,
-            total_nota_ajuste=0,
-            total_entradas=0,
-            total_ajustes=0,                    # ✅ nuevo
-            saldo_inicial=nuevo.saldo_actual,
-            saldo_final=nuevo.saldo_actual,
-            estado="abierto"
+    # -------------------------------
+    # NIT ya registrados (una consulta por bloque)
+    # -------------------------------
+    nits = list(primeros)
+    existentes = set()
+    for i in range(0, len(nits), IMPORTACION_LOTE):
+        existentes.update(
+            db.execute(
+                select(Cliente.nit).where(Cliente.nit.in_(nits[i:i + IMPORTACION_LOTE]))
+            ).scalars()
         )
 
-        db.add(resumen_anual)
-
-        # ==================================================
-        # Resúmenes mensuales (12 meses)
-        # ==================================================
-        for mes in range(1, 13):
-
-            if mes < mes_actual:
-                estado = "cerrado"
-                saldo_inicial = 0
-                saldo_final = 0
-
-            elif mes == mes_actual:
-                estado = "abierto"
-                saldo_inicial = nuevo.saldo_actual
-                saldo_final = nuevo.saldo_actual
-
-            else:  # meses futuros
-                estado = "cerrado"
-                saldo_inicial = 0
-                saldo_final = 0
-
-            resumen_mensual = ResumenMensual(
-                cliente_id=nuevo.id,
-                anio=anio_actual,
-                mes=mes,
-                estado=estado,
-                saldo_inicial=saldo_inicial,
-                saldo_final=saldo_final,
-
-                total_facturas=0,
-                total_notas_credito=0,
-                total_notas_debito=0,
-                total_documentos_soporte=0,
-                total_ajuste_documentos_soporte=0,
-                total_nomina_electronica=0,
-                total_ajuste_nomina=0,
-                total_nota_ajuste=0,
-                total_entradas=0,
-                total_ajustes=0
+    for nit in existentes:
+        resultados[primeros.pop(nit)] = {
+            "estado": "error",
+            "mensaje": "Ya existe un cliente con ese NIT.",
+            "cliente_id": None
+        }
+
+    if not primeros:
+        return resultados
+
+    # -------------------------------
+    # Insertar clientes, libro y resúmenes
+    # -------------------------------
+    datos = dict(clientes)
+    nuevos = [_nuevo_cliente(datos[indice]) for indice in primeros.values()]
+
+    try:
+        db.execute(insert(Cliente), nuevos)
+
+        # MySQL no tiene RETURNING: los id se leen por NIT
+        nits = list(primeros)
+        ids: dict[str, int] = {}
+        for i in range(0, len(nits), IMPORTACION_LOTE):
+            ids.update(
+                db.execute(
+                    select(Cliente.nit, Cliente.id).where(Cliente.nit.in_(nits[i:i + IMPORTACION_LOTE]))
+                ).all()
             )
 
-            db.add(resumen_mensual)
+        registrar_movimientos(
+            db,
+            {ids[fila["nit"]]: fila["saldo_actual"] for fila in nuevos},
+            "apertura"
+        )
 
+        _periodos_clientes(db, sorted(ids.values()))
 
         db.commit()
 
-    except Exception as e:
+    except IntegrityError:
         db.rollback()
         raise HTTPException(
-            status_code=500,
-            detail=f"Error creando resúmenes del cliente: {str(e)}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Otro proceso registró alguno de estos NIT durante la importación; vuelva a intentarlo."
         )
 
-    return nuevo
-  
+    for nit, indice in primeros.items():
+        resultados[indice] = {"estado": "creado", "mensaje": "Cliente creado", "cliente_id": ids[nit]}
+
+    return resultados
+
 
 # ======================================================
 #                   OBTENER
 # ======================================================
-def get_clientes(db: Session) -> list[Cliente]:
-    return db.query(Cliente).all()
+def get_clientes(db: Session, limit: int, cursor: str | None = None) -> tuple[list, str | None]:
+    """Filas (tuplas de columnas de ClienteResponse) y siguiente cursor."""
+    return paginar(db.query(*columnas(ClienteResponse, Cliente)), Cliente.id, limit, cursor)
+
+
+# ======================================================
+#       PANEL ADMIN: saldo + consumo del mes (una consulta)
+# ======================================================
+def get_clientes_overview(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    orden: str = "id",
+    bajo_alerta: bool = False,
+    saldo_negativo: bool = False
+) -> tuple[list, str | None]:
+    """
+    Filas (tuplas en el orden de ClienteOverviewResponse) y siguiente cursor.
+    orden: id | saldo | consumo, con "-" delante para descendente.
+    Clientes LEFT JOIN resumen_mensual del mes en curso; el join usa
+    uq_resumen_mensual (cliente_id, anio, mes).
+    """
+    hoy = obtener_fecha_actual()
+
+    contadores = [
+        func.coalesce(getattr(ResumenMensual, columna), 0).label(columna)
+        for columna in (*COLUMNAS_SALIDA.values(), "total_entradas", "total_ajustes")
+    ]
+    documentos = contadores[:len(COLUMNAS_SALIDA)]
+    consumo = documentos[0].element
+    for contador in documentos[1:]:
+        consumo = consumo + contador.element
+
+    query = (
+        db.query(
+            Cliente.id,
+            Cliente.nombre,
+            Cliente.nit,
+            Cliente.saldo_actual,
+            Cliente.minimo_alerta,
+            type_coerce(Cliente.bloqueado, Boolean).label("bloqueado"),
+            Cliente.inactivo,
+            *contadores,
+            consumo.label("consumo_mes")
+        )
+        .outerjoin(ResumenMensual, and_(
+            ResumenMensual.cliente_id == Cliente.id,
+            ResumenMensual.anio == hoy.year,
+            ResumenMensual.mes == hoy.month
+        ))
+    )
+
+    if bajo_alerta:
+        query = query.filter(Cliente.saldo_actual <= Cliente.minimo_alerta)
+    if saldo_negativo:
+        query = query.filter(Cliente.saldo_actual < 0)
+
+    descendente = orden.startswith("-")
+    criterio = orden.lstrip("-")
+
+    if criterio == "saldo":
+        filas, siguiente = paginar_por(
+            query, Cliente.saldo_actual, "saldo_actual", Cliente.id, limit, cursor, descendente
+        )
+    elif criterio == "consumo":
+        filas, siguiente = paginar_por(
+            query, consumo, "consumo_mes", Cliente.id, limit, cursor, descendente
+        )
+    else:
+        filas, siguiente = paginar(query, Cliente.id, limit, cursor, descendente)
+
+    # Write-behind: sumar lo que aún no se volcó a resumen_mensual
+    if resumen_buffer.activo():
+        filas = [_con_pendientes(fila, hoy.year, hoy.month) for fila in filas]
+
+    return filas, siguiente
+
+
+def _con_pendientes(fila, anio: int, mes: int) -> tuple:
+    deltas = resumen_buffer.pendientes(fila.id, anio, mes)
+    if not deltas:
+        return fila
+
+    datos = fila._asdict()
+    for columna, delta in deltas.items():
+        if columna in datos:
+            datos[columna] += delta
+        if columna in COLUMNAS_SALIDA.values():
+            datos["consumo_mes"] += delta
+
+    return tuple(datos.values())
+
+
+def version_cliente(db: Session, cliente_id: int) -> int | None:
+    """Versión de la fila (base del ETag), sin cargar el cliente."""
+    return db.query(Cliente.version).filter(Cliente.id == cliente_id).scalar()
 
 
 def get_cliente_by_id(db: Session, cliente_id: int) -> Cliente:
@@ -186,10 +329,24 @@ def update_cliente(db: Session, cliente_id: int, datos: ClienteUpdate) -> Client
                 detail="Ya existe otro cliente con ese NIT."
             )
 
+    # Cambio manual de saldo: delta contra el saldo bloqueado en la BD
+    # (no el leído arriba) y UPDATE atómico; queda en el libro como edición
+    saldo_nuevo = update_data.pop("saldo_actual", None)
+    if saldo_nuevo is not None:
+        saldo = db.execute(
+            select(Cliente.saldo_actual)
+            .where(Cliente.id == cliente_id)
+            .with_for_update()
+        ).scalar()
+
+        saldo_antes, saldo_despues = sumar_saldo(db, cliente_id, saldo_nuevo - saldo)
+        registrar_movimiento(db, cliente_id, saldo_despues - saldo_antes, "edicion")
+
     for key, val in update_data.items():
         setattr(cliente, key, val)
 
     db.commit()
+    cliente_cache.invalidar(cliente_id)
     db.refresh(cliente)
     return cliente
 
@@ -207,6 +364,7 @@ def delete_cliente(db: Session, cliente_id: int):
 
     db.delete(cliente)
     db.commit()
+    cliente_cache.invalidar(cliente_id)
 
     return {"message": f"Cliente '{cliente.nombre}' eliminado correctamente."}
 
@@ -224,6 +382,7 @@ def toggle_bloqueo_cliente(db: Session, cliente_id: int, bloquear: bool) -> Clie
 
     cliente.bloqueado = bloquear
     db.commit()
+    cliente_cache.invalidar(cliente_id)
     db.refresh(cliente)
     return cliente
 
@@ -243,5 +402,6 @@ def toggle_inactivo_cliente(db: Session, cliente_id: int, inactivar: bool) -> Cl
         cliente.bloqueado = True
 
     db.commit()
+    cliente_cache.invalidar(cliente_id)
     db.refresh(cliente)
     return cliente
@@ -1,11 +1,12 @@
 from typing import List
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from datetime import date
 
 from models.entrada_model import Entrada
 from models.cliente_model import Cliente
-from schemas.entrada_schema import EntradaCreate, EntradaUpdate
+from schemas.entrada_schema import EntradaCreate, EntradaUpdate, EntradaResponse
 
 from services.time_service import obtener_fecha_actual
 
@@ -15,9 +16,12 @@ from crud.crud_resumen import (
     restar_entrada,
     recalcular_saldo_resumenes,
     validar_mes_abierto,
-    cierre_mensual_automatico,
-    sincronizar_mes_actual
+    cierre_mensual_automatico
 )
+from services.periodo_service import asegurar_periodo
+from crud.crud_saldos import registrar_movimiento, sumar_saldo
+from services.paginacion import paginar
+from services.serializacion import columnas
 
 
 # ======================================================
@@ -55,18 +59,15 @@ def create_entrada(db: Session, entrada_in: EntradaCreate, usuario_id: int) -> E
     )
 
     try:
-        cliente.saldo_actual = (cliente.saldo_actual or 0) + entrada_in.cantidad
+        # 🔥 saldo con UPDATE atómico (no pisa salidas concurrentes)
+        saldo_antes, saldo_despues = sumar_saldo(db, cliente.id, entrada_in.cantidad)
 
         db.add(entrada)
         db.flush()
 
+        # 🔥 contadores + saldo_final en dos UPDATE
         sumar_entrada(db, entrada.cliente_id, entrada.cantidad, entrada.fecha)
-        recalcular_saldo_resumenes(
-            db,
-            entrada.cliente_id,
-            entrada.fecha.year,
-            entrada.fecha.month
-        )
+        registrar_movimiento(db, entrada.cliente_id, saldo_despues - saldo_antes, "entrada", entrada.id)
 
         db.commit()
         db.refresh(entrada)
@@ -80,28 +81,82 @@ def create_entrada(db: Session, entrada_in: EntradaCreate, usuario_id: int) -> E
 # ======================================================
 # LISTAR / OBTENER
 # ======================================================
-def get_entradas(db: Session) -> List[Entrada]:
-    return db.query(Entrada).order_by(Entrada.id.desc()).all()
-
-
-def get_entrada_by_id(db: Session, entrada_id: int) -> Entrada:
-    entrada = db.query(Entrada).filter_by(id=entrada_id).first()
+def filtrar_entradas(query, desde: date | None = None, hasta: date | None = None):
+    if desde:
+        query = query.filter(Entrada.fecha >= desde)
+    if hasta:
+        query = query.filter(Entrada.fecha <= hasta)
+    return query
+
+
+def get_entradas(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None
+) -> tuple[list, str | None]:
+    """Filas (tuplas de columnas de EntradaResponse) y siguiente cursor."""
+    query = filtrar_entradas(db.query(*columnas(EntradaResponse, Entrada)), desde, hasta)
+    return paginar(query, Entrada.id, limit, cursor, descendente=True)
+
+
+def get_entrada_by_id(db: Session, entrada_id: int, bloquear: bool = False) -> Entrada:
+    query = db.query(Entrada).filter_by(id=entrada_id)
+
+    # Edición / borrado: la fila queda bloqueada hasta el commit
+    if bloquear:
+        query = query.populate_existing().with_for_update()
+
+    entrada = query.first()
     if not entrada:
         raise HTTPException(404, "Entrada no encontrada")
     return entrada
 
 
-def get_entradas_by_cliente(db: Session, cliente_id: int) -> List[Entrada]:
-    cliente = db.query(Cliente).filter_by(id=cliente_id).first()
+def get_entradas_by_cliente(
+    db: Session,
+    cliente_id: int,
+    limit: int,
+    cursor: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None
+) -> tuple[list, str | None]:
+    cliente = db.query(Cliente.id).filter_by(id=cliente_id).first()
     if not cliente:
         raise HTTPException(404, "Cliente no encontrado")
 
-    return (
-        db.query(Entrada)
-        .filter_by(cliente_id=cliente_id)
-        .order_by(Entrada.id.desc())
-        .all()
+    query = filtrar_entradas(
+        db.query(*columnas(EntradaResponse, Entrada)).filter(Entrada.cliente_id == cliente_id),
+        desde,
+        hasta
     )
+    return paginar(query, Entrada.id, limit, cursor, descendente=True)
+
+def consulta_exportacion_entradas(
+    cliente_id: int,
+    desde: date | None = None,
+    hasta: date | None = None
+):
+    """select() de columnas para services/exportacion (sin objetos ORM)."""
+    consulta = (
+        select(
+            Entrada.id,
+            Entrada.fecha,
+            Entrada.cantidad,
+            Entrada.numero_factura,
+            Entrada.usuario_id
+        )
+        .where(Entrada.cliente_id == cliente_id)
+        .order_by(Entrada.id)
+    )
+
+    if desde:
+        consulta = consulta.where(Entrada.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(Entrada.fecha <= hasta)
+
+    return consulta
 
 # ======================================================
 # ACTUALIZAR ENTRADA
@@ -126,20 +181,30 @@ def update_entrada(db: Session, entrada_id: int, entrada_data: EntradaUpdate) ->
     # 🔒 ORDEN CORRECTO
     validar_mes_actual(fecha_nueva)
 
-    sincronizar_mes_actual(db, fecha_nueva)
+    asegurar_periodo(fecha_nueva)
 
     cierre_mensual_automatico(db, entrada.cliente_id, fecha_nueva)
 
     validar_mes_abierto(db, entrada.cliente_id, fecha_nueva)
 
+    # 🔒 Releer bloqueada: una edición concurrente no deja cantidad_original vieja
+    entrada = get_entrada_by_id(db, entrada_id, bloquear=True)
+    cantidad_original = entrada.cantidad
+    fecha_original = entrada.fecha
+    cantidad_nueva = data.get("cantidad", cantidad_original)
+
     try:
-        # Revertir original
-        restar_entrada(db, entrada.cliente_id, cantidad_original, fecha_original)
-        cliente.saldo_actual -= cantidad_original
+        # Revertir original y aplicar nueva: un solo UPDATE atómico del saldo
+        saldo_antes, saldo_despues = sumar_saldo(
+            db, entrada.cliente_id, cantidad_nueva - cantidad_original
+        )
 
-        # Aplicar nueva
+        restar_entrada(db, entrada.cliente_id, cantidad_original, fecha_original)
         sumar_entrada(db, entrada.cliente_id, cantidad_nueva, fecha_nueva)
-        cliente.saldo_actual += cantidad_nueva
+
+        registrar_movimiento(
+            db, entrada.cliente_id, saldo_despues - saldo_antes, "entrada", entrada.id
+        )
 
         entrada.cantidad = cantidad_nueva
         entrada.fecha = fecha_nueva
@@ -175,16 +240,20 @@ def delete_entrada(db: Session, entrada_id: int):
     # 🔒 ORDEN CORRECTO
     validar_mes_actual(entrada.fecha)
 
-    sincronizar_mes_actual(db, entrada.fecha)
+    asegurar_periodo(entrada.fecha)
 
     cierre_mensual_automatico(db, entrada.cliente_id, entrada.fecha)
 
     validar_mes_abierto(db, entrada.cliente_id, entrada.fecha)
 
+    # 🔒 Releer bloqueada: un borrado / edición concurrente espera
+    entrada = get_entrada_by_id(db, entrada_id, bloquear=True)
+
     try:
-        cliente.saldo_actual -= entrada.cantidad
+        saldo_antes, saldo_despues = sumar_saldo(db, entrada.cliente_id, -entrada.cantidad)
 
         restar_entrada(db, entrada.cliente_id, entrada.cantidad, entrada.fecha)
+        registrar_movimiento(db, entrada.cliente_id, saldo_despues - saldo_antes, "entrada", entrada.id)
 
         recalcular_saldo_resumenes(
             db,
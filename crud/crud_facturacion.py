@@ -0,0 +1,46 @@
+# crud/crud_facturacion.py
+# Consultas de la facturación mensual (el cálculo y los estados
+# de cuenta están en services/facturacion.py).
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from models.facturacion_model import Facturacion
+from schemas.facturacion_schema import FacturacionResponse
+from services.paginacion import paginar
+from services.serializacion import columnas
+
+
+def get_facturas_periodo(
+    db: Session,
+    anio: int,
+    mes: int,
+    limit: int,
+    cursor: str | None = None,
+    estado: str | None = None
+) -> tuple[list, str | None]:
+    query = db.query(*columnas(FacturacionResponse, Facturacion)).filter(
+        Facturacion.anio == anio,
+        Facturacion.mes == mes
+    )
+
+    if estado:
+        query = query.filter(Facturacion.estado == estado)
+
+    return paginar(query, Facturacion.id, limit, cursor)
+
+
+def get_factura_cliente(db: Session, cliente_id: int, anio: int, mes: int) -> Facturacion:
+    factura = (
+        db.query(Facturacion)
+        .filter(
+            Facturacion.cliente_id == cliente_id,
+            Facturacion.anio == anio,
+            Facturacion.mes == mes
+        )
+        .first()
+    )
+
+    if not factura:
+        raise HTTPException(404, "No existe facturación del cliente para el período")
+
+    return factura
@@ -0,0 +1,183 @@
+# crud/crud_pronostico.py
+# Pronóstico de consumo: ritmo diario de salidas y fecha
+# estimada en la que el cliente se queda sin folios.
+#
+# - Una sola consulta agregada (cliente, día) sobre salidas_diarias
+# - Matriz clientes × días con NumPy
+# - Ritmo diario = media ponderada exponencial (los días recientes
+#   pesan más, vida media PRONOSTICO_VIDA_MEDIA días)
+# - Más allá de PRONOSTICO_HORIZONTE días no se estima fecha
+#   (saldo grande con ritmo mínimo: fecha fuera de rango)
+# - El saldo es el efectivo (saldo + folios reservados sin usar,
+#   crud_reservas.columna_saldo_efectivo): una reserva grande no
+#   adelanta la fecha de agotamiento
+import os
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.cliente_model import Cliente
+from models.salida_diaria_model import SalidaDiaria
+from crud.crud_reservas import columna_saldo_efectivo
+from schemas.cliente_schema import PronosticoResponse
+from services.time_service import obtener_fecha_actual
+
+PRONOSTICO_DIAS = int(os.getenv("PRONOSTICO_DIAS", "56"))
+PRONOSTICO_VIDA_MEDIA = float(os.getenv("PRONOSTICO_VIDA_MEDIA", "14"))
+PRONOSTICO_HORIZONTE = int(os.getenv("PRONOSTICO_HORIZONTE", "3650"))
+
+
+# ======================================================
+# 📊 CONSUMO DIARIO (una consulta, todos los clientes)
+# ======================================================
+def _consumo_diario(
+    db: Session,
+    ids: np.ndarray,
+    desde: date,
+    hasta: date,
+    cliente_id: int | None = None
+) -> np.ndarray:
+    """
+    Matriz (len(ids) × días) con los folios consumidos por día.
+    ids debe venir ordenado; los clientes que no están en ids se ignoran.
+    """
+    dias = (hasta - desde).days + 1
+    matriz = np.zeros((len(ids), dias), dtype=np.float64)
+
+    query = (
+        select(SalidaDiaria.cliente_id, SalidaDiaria.fecha, func.sum(SalidaDiaria.cantidad))
+        .where(SalidaDiaria.fecha >= desde, SalidaDiaria.fecha <= hasta)
+        .group_by(SalidaDiaria.cliente_id, SalidaDiaria.fecha)
+    )
+    if cliente_id is not None:
+        query = query.where(SalidaDiaria.cliente_id == cliente_id)
+
+    # Core sobre la conexión de la sesión: sin la capa de carga del ORM
+    filas = db.connection().execute(query).all()
+    if not filas or not len(ids):
+        return matriz
+
+    desplazamiento = {desde + timedelta(days=d): d for d in range(dias)}
+    n = len(filas)
+    clientes = np.fromiter((f[0] for f in filas), dtype=np.int64, count=n)
+    columnas = np.fromiter((desplazamiento[f[1]] for f in filas), dtype=np.int64, count=n)
+    cantidades = np.fromiter((f[2] for f in filas), dtype=np.float64, count=n)
+
+    # cliente_id → fila de la matriz
+    posiciones = np.searchsorted(ids, clientes)
+    posiciones[posiciones == len(ids)] = 0
+    validos = ids[posiciones] == clientes
+
+    # (cliente, día) es único por el GROUP BY: asignación directa
+    matriz[posiciones[validos], columnas[validos]] = cantidades[validos]
+    return matriz
+
+
+def _pesos(dias: int) -> np.ndarray:
+    """Peso de cada día de la ventana (suman 1); el más reciente pesa más."""
+    antiguedad = np.arange(dias - 1, -1, -1, dtype=np.float64)
+    pesos = 0.5 ** (antiguedad / PRONOSTICO_VIDA_MEDIA)
+    return pesos / pesos.sum()
+
+
+# ======================================================
+# 🔮 PRONÓSTICO
+# ======================================================
+def _pronosticar(
+    db: Session,
+    clientes: list,
+    dias: int,
+    cliente_id: int | None = None
+) -> list[tuple]:
+    """
+    clientes: tuplas (id, nombre, saldo efectivo, minimo_alerta) ordenadas por id.
+    Devuelve tuplas en el orden de PronosticoResponse.
+    """
+    # Solo días cerrados: el de hoy va a medias y bajaría el ritmo
+    hoy = obtener_fecha_actual()
+    hasta = hoy - timedelta(days=1)
+    desde = hasta - timedelta(days=dias - 1)
+
+    ids = np.fromiter((c[0] for c in clientes), dtype=np.int64, count=len(clientes))
+    saldos = np.fromiter((c[2] for c in clientes), dtype=np.float64, count=len(clientes))
+
+    matriz = _consumo_diario(db, ids, desde, hasta, cliente_id)
+    consumo = matriz.sum(axis=1)
+    tasa = matriz @ _pesos(dias)
+
+    # Días de saldo al ritmo actual; -1 = no consume o no se agota
+    # dentro del horizonte (se compara en float, antes de convertir)
+    restantes = np.full(len(ids), -1, dtype=np.int64)
+    duracion = np.divide(saldos, tasa, out=np.full(len(ids), np.inf), where=tasa > 0)
+    alcanza = (saldos > 0) & (duracion <= PRONOSTICO_HORIZONTE)
+    restantes[alcanza] = np.floor(duracion[alcanza])
+    restantes[saldos <= 0] = 0
+
+    filas = []
+    for cliente, total, ritmo, quedan in zip(
+        clientes,
+        consumo.astype(np.int64).tolist(),
+        np.round(tasa, 2).tolist(),
+        restantes.tolist()
+    ):
+        agota = quedan >= 0
+        filas.append((
+            *cliente,
+            total,
+            ritmo,
+            quedan if agota else None,
+            hoy + timedelta(days=quedan) if agota else None
+        ))
+
+    return filas
+
+
+def _columnas_cliente():
+    return (
+        Cliente.id,
+        Cliente.nombre,
+        columna_saldo_efectivo().label("saldo_actual"),
+        Cliente.minimo_alerta
+    )
+
+
+def pronostico_cliente(db: Session, cliente_id: int, dias: int = PRONOSTICO_DIAS) -> dict:
+    cliente = (
+        db.query(*_columnas_cliente())
+        .filter(Cliente.id == cliente_id)
+        .first()
+    )
+    if not cliente:
+        raise HTTPException(404, "Cliente no encontrado")
+
+    fila = _pronosticar(db, [tuple(cliente)], dias, cliente_id)[0]
+    return dict(zip(PronosticoResponse.model_fields, fila))
+
+
+def pronostico_clientes(
+    db: Session,
+    dias: int = PRONOSTICO_DIAS,
+    dias_max: int | None = None,
+    incluir_inactivos: bool = False
+) -> list[tuple]:
+    """
+    Pronóstico de todos los clientes, los que se agotan antes primero
+    (los que no consumen van al final).
+    dias_max: solo los que se agotan en esa cantidad de días o menos.
+    """
+    query = db.query(*_columnas_cliente())
+    if not incluir_inactivos:
+        query = query.filter(Cliente.inactivo.is_(False))
+
+    clientes = query.order_by(Cliente.id).all()
+    filas = _pronosticar(db, clientes, dias)
+
+    if dias_max is not None:
+        filas = [f for f in filas if f[6] is not None and f[6] <= dias_max]
+
+    filas.sort(key=lambda f: (f[6] is None, f[6] or 0, f[0]))
+    return filas
+
@@ -0,0 +1,318 @@
+# crud/crud_reservas.py
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.cliente_model import Cliente
+from models.reserva_model import ReservaFolios
+from models.salida_model import Salida
+from schemas.salida_schema import SalidaCreate
+from services.time_service import obtener_fecha_actual
+from services import cliente_cache, reserva_service
+from services.periodo_service import (
+    asegurar_periodo,
+    cliente_sincronizado,
+    marcar_cliente_sincronizado
+)
+from crud.crud_resumen import sumar_salidas_lote, cierre_mensual_automatico, periodos_con_resumen
+from crud.crud_saldos import registrar_movimiento
+from crud.crud_salidas_diarias import sumar_salidas_diarias
+from crud.crud_salidas import (
+    descontar_folios,
+    resultado_debito,
+    verificar_y_encolar_alerta
+)
+
+
+# ======================================================
+# 💰 SALDO EFECTIVO (saldo + folios reservados sin usar)
+# ======================================================
+def columna_saldo_efectivo():
+    """
+    Cliente.saldo_actual + folios reservados sin usar, correlacionado con
+    Cliente.id: sirve en consultas de uno o de muchos clientes.
+    """
+    reservados = (
+        select(func.coalesce(func.sum(ReservaFolios.cantidad - ReservaFolios.consumidos), 0))
+        .where(ReservaFolios.cliente_id == Cliente.id, ReservaFolios.estado == "activa")
+        .scalar_subquery()
+    )
+
+    return Cliente.saldo_actual + reservados
+
+
+def saldo_efectivo(db: Session, cliente_id: int) -> int:
+    return db.execute(
+        select(columna_saldo_efectivo()).where(Cliente.id == cliente_id)
+    ).scalar()
+
+
+# ======================================================
+# ➕ CREAR RESERVA
+# ======================================================
+def crear_reserva(db: Session, nit: str, cantidad: int, duracion_segundos: int, usuario_id: int | None):
+    """
+    Mueve `cantidad` folios de saldo_actual a una reserva con un único
+    UPDATE condicional. A diferencia de una salida, exige saldo aunque el
+    cliente no esté bloqueado: la reserva solo aparta folios que existen.
+    El saldo efectivo no cambia, así que no se evalúan alertas.
+    """
+    asegurar_periodo(obtener_fecha_actual())
+
+    cliente = cliente_cache.obtener_por_nit(db, nit)
+
+    if not cliente:
+        raise HTTPException(status_code=404, detail="El cliente no existe.")
+
+    if cliente.inactivo:
+        raise HTTPException(
+            status_code=409,
+            detail="El cliente está inactivo y no puede emitir documentos."
+        )
+
+    if descontar_folios(db, cliente.id, cantidad, exigir_saldo=True) is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Folios insuficientes para reservar {cantidad}."
+        )
+
+    ahora = datetime.utcnow()
+    reserva = ReservaFolios(
+        cliente_id=cliente.id,
+        usuario_id=usuario_id,
+        cantidad=cantidad,
+        consumidos=0,
+        estado="activa",
+        creada=ahora,
+        expira=ahora + timedelta(seconds=duracion_segundos)
+    )
+
+    db.add(reserva)
+    db.commit()
+    db.refresh(reserva)
+
+    reserva_service.registrar(reserva)
+
+    return reserva
+
+
+def obtener_reserva(db: Session, reserva_id: int):
+    return db.query(ReservaFolios).filter(ReservaFolios.id == reserva_id).first()
+
+
+def reservas_activas(db: Session) -> list[ReservaFolios]:
+    return db.query(ReservaFolios).filter(ReservaFolios.estado == "activa").all()
+
+
+def reservas_vencidas(db: Session) -> list[int]:
+    return list(db.execute(
+        select(ReservaFolios.id).where(
+            ReservaFolios.estado == "activa",
+            ReservaFolios.expira <= datetime.utcnow()
+        )
+    ).scalars())
+
+
+# ======================================================
+# 📝 REGISTRAR CONSUMOS (escritura agrupada)
+# ======================================================
+def registrar_consumos(db: Session, reserva_id: int, items: list[SalidaCreate]) -> tuple[list[dict], int | None]:
+    """
+    Escribe en una transacción las salidas consumidas de una reserva:
+    - la fila de la reserva bloqueada: estado y consumidos salen de la BD
+    - una consulta de duplicados
+    - inserción masiva de las salidas
+    - un UPDATE de la reserva y uno por resumen
+
+    Entra la parte del lote que cabe en la reserva; solo el exceso se
+    rechaza. Devuelve (resultado por ítem, folios que le quedan a la
+    reserva en la BD; None si ya no está activa).
+    Un IntegrityError (documento registrado en paralelo) se propaga
+    para que el llamador reintente.
+    """
+    hoy = obtener_fecha_actual()
+    asegurar_periodo(hoy)
+
+    cliente_id = db.execute(
+        select(ReservaFolios.cliente_id).where(ReservaFolios.id == reserva_id)
+    ).scalar()
+    cliente = cliente_cache.obtener_por_id(db, cliente_id)
+
+    if not cliente_sincronizado(cliente.id, hoy):
+        cierre_mensual_automatico(db, cliente.id, hoy)
+        marcar_cliente_sincronizado(db, cliente.id, hoy)
+
+    # 🔒 Hasta el commit: otro worker que consuma la misma reserva espera
+    reserva = (
+        db.query(ReservaFolios)
+        .filter(ReservaFolios.id == reserva_id)
+        .populate_existing()
+        .with_for_update()
+        .one()
+    )
+
+    if reserva.estado != "activa":
+        db.rollback()
+        return [{"estado": "RECHAZADO", "mensaje": "La reserva ya no está activa."} for _ in items], None
+
+    disponibles = reserva.cantidad - reserva.consumidos
+
+    # El estado puede haber cambiado después de crear la reserva (y la caché
+    # de otro worker no se entera): se lee de la BD
+    inactivo = db.execute(select(Cliente.inactivo).where(Cliente.id == cliente.id)).scalar()
+    if inactivo:
+        db.rollback()
+        return [
+            {"estado": "RECHAZADO", "mensaje": "El cliente está inactivo y no puede emitir documentos."}
+            for _ in items
+        ], disponibles
+
+    existentes = set(
+        db.query(Salida.tipo_documento, Salida.numero_documento)
+        .filter(
+            Salida.cliente_id == cliente.id,
+            Salida.numero_documento.in_({item.numero_documento for item in items})
+        )
+        .all()
+    )
+
+    resultados: list[dict | None] = [None] * len(items)
+    nuevas = []
+    indices_nuevas = []
+    conteos: dict[str, int] = {}
+
+    for indice, item in enumerate(items):
+        clave = (item.tipo_documento, item.numero_documento)
+
+        if clave in existentes:
+            resultados[indice] = {
+                "estado": "APROBADO",
+                "mensaje": "Documento duplicado. No se descontó folio."
+            }
+            continue
+
+        # Lo que excede a la reserva se rechaza; lo anterior entra
+        if len(nuevas) >= disponibles:
+            resultados[indice] = {"estado": "RECHAZADO", "mensaje": "La reserva no tiene folios disponibles."}
+            continue
+
+        existentes.add(clave)
+        conteos[item.tipo_documento.value] = conteos.get(item.tipo_documento.value, 0) + 1
+        indices_nuevas.append(indice)
+        nuevas.append({
+            "cliente_id": cliente.id,
+            "tipo_documento": item.tipo_documento,
+            "numero_documento": item.numero_documento,
+            "fecha_documento": hoy,
+            "cantidad": 1,
+        })
+
+    if not nuevas:
+        db.rollback()
+        return resultados, disponibles
+
+    # Mismas reglas que una salida: sin resumen o mes cerrado → rechazo por ítem
+    estado_mes = periodos_con_resumen(db, [cliente.id], hoy).get(cliente.id)
+    if estado_mes is None or estado_mes == "cerrado":
+        db.rollback()
+        mensaje = "No existe resumen del período" if estado_mes is None else "El mes está cerrado"
+        for indice in indices_nuevas:
+            resultados[indice] = {"estado": "RECHAZADO", "mensaje": mensaje}
+        return resultados, disponibles
+
+    db.execute(
+        update(ReservaFolios)
+        .where(ReservaFolios.id == reserva_id)
+        .values(consumidos=ReservaFolios.consumidos + len(nuevas))
+        .execution_options(synchronize_session=False)
+    )
+
+    db.execute(insert(Salida), nuevas)
+    sumar_salidas_lote(db, cliente.id, conteos, hoy)
+    sumar_salidas_diarias(db, hoy, {cliente.id: conteos})
+    # El libro sigue el saldo efectivo: el folio se descuenta al consumirlo
+    registrar_movimiento(db, cliente.id, -len(nuevas), "salida")
+
+    # Alertas y mensajes sobre el saldo efectivo
+    saldo_despues = saldo_efectivo(db, cliente.id)
+    saldo_antes = saldo_despues + len(nuevas)
+
+    saldo = saldo_antes
+    for indice in indices_nuevas:
+        saldo -= 1
+        resultados[indice] = resultado_debito(cliente.bloqueado, saldo, cliente.minimo_alerta)
+
+    if not cliente.bloqueado:
+        verificar_y_encolar_alerta(
+            db,
+            cliente,
+            saldo_antes,
+            saldo_despues,
+            resultados[indices_nuevas[-1]]["mensaje"]
+        )
+
+    db.commit()
+
+    return resultados, disponibles - len(nuevas)
+
+
+# ======================================================
+# 🔓 LIBERAR / VENCER
+# ======================================================
+def cerrar_reserva(db: Session, reserva_id: int, estado: str = "liberada"):
+    """Cierra la reserva y devuelve al saldo los folios no usados."""
+    reserva = (
+        db.query(ReservaFolios)
+        .filter(ReservaFolios.id == reserva_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
+
+    if not reserva or reserva.estado != "activa":
+        db.rollback()
+        return reserva
+
+    devueltos = reserva.cantidad - reserva.consumidos
+
+    reserva.estado = estado
+    reserva.cerrada = datetime.utcnow()
+
+    if devueltos:
+        db.execute(
+            update(Cliente)
+            .where(Cliente.id == reserva.cliente_id)
+            .values(saldo_actual=Cliente.saldo_actual + devueltos)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+    db.refresh(reserva)
+
+    return reserva
+
+
+# ======================================================
+# ⚡ VERSIONES ASYNC (AsyncSession)
+# ======================================================
+async def crear_reserva_async(db: AsyncSession, nit: str, cantidad: int, duracion_segundos: int, usuario_id: int | None):
+    return await db.run_sync(crear_reserva, nit, cantidad, duracion_segundos, usuario_id)
+
+
+async def obtener_reserva_async(db: AsyncSession, reserva_id: int):
+    return await db.run_sync(obtener_reserva, reserva_id)
+
+
+async def consumir_reserva_async(db: AsyncSession, reserva_id: int, data: SalidaCreate, cliente_id: int | None = None):
+    """La salida se aparta en memoria y se espera a que su lote se escriba."""
+    futuro = await db.run_sync(reserva_service.consumir, reserva_id, data, cliente_id)
+    return await asyncio.wrap_future(futuro)
+
+
+async def liberar_reserva_async(db: AsyncSession, reserva_id: int):
+    return await db.run_sync(reserva_service.liberar, reserva_id)
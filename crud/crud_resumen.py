@@ -1,127 +1,382 @@
+import os
+import zlib
+
+from sqlalchemy import case, exists, func, literal, select, true, union_all, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from datetime import date
+from datetime import date, datetime
 
 from models.resumen_mensual_model import ResumenMensual
 from models.resumen_anual_model import ResumenAnual
 from models.cliente_model import Cliente
+from models.proceso_cierre_model import ProcesoCierre
 
 from services.time_service import obtener_fecha_actual
+from services import cliente_cache
+from services import resumen_buffer
+from services.etag import construir as construir_etag
+
+
+def _saldo_cliente(cliente_id: int):
+    """Subconsulta escalar con el saldo actual del cliente."""
+    return (
+        select(Cliente.saldo_actual)
+        .where(Cliente.id == cliente_id)
+        .scalar_subquery()
+    )
 
 
 def recalcular_saldo_resumenes(db: Session, cliente_id: int, anio: int, mes: int):
 
-    cliente = db.query(Cliente).filter_by(id=cliente_id).first()
-    if not cliente:
-        return  # helper silencioso
+    # En write-behind el saldo_final lo fija el volcado del buffer
+    if resumen_buffer.activo():
+        return
 
-    resumen_m = db.query(ResumenMensual).filter_by(
-        cliente_id=cliente_id, anio=anio, mes=mes
-    ).first()
+    # El saldo del cliente puede estar modificado solo en memoria
+    db.flush()
 
-    resumen_a = db.query(ResumenAnual).filter_by(
-        cliente_id=cliente_id, anio=anio
-    ).first()
+    saldo = _saldo_cliente(cliente_id)
 
-    # Si no existen aún, no es error
-    if not resumen_m or not resumen_a:
-        return
+    # 🔒 No tocar meses cerrados (si no existen aún, no es error)
+    mensual = db.execute(
+        update(ResumenMensual)
+        .where(
+            ResumenMensual.cliente_id == cliente_id,
+            ResumenMensual.anio == anio,
+            ResumenMensual.mes == mes,
+            ResumenMensual.estado != "cerrado"
+        )
+        .values(saldo_final=saldo)
+        .execution_options(synchronize_session=False)
+    )
 
-    # 🔒 No tocar meses cerrados
-    if resumen_m.estado == "cerrado":
+    if mensual.rowcount == 0:
         return
 
-    resumen_m.saldo_final = cliente.saldo_actual
-    resumen_a.saldo_final = cliente.saldo_actual
-
-    db.flush()
+    db.execute(
+        update(ResumenAnual)
+        .where(
+            ResumenAnual.cliente_id == cliente_id,
+            ResumenAnual.anio == anio
+        )
+        .values(saldo_final=saldo)
+        .execution_options(synchronize_session=False)
+    )
 
 # ======================================================
-# ➕ ENTRADAS
+# ⚡ DELTAS DE CONTADORES (UPDATE col = col + delta)
 # ======================================================
-def sumar_entrada(db: Session, cliente_id: int, cantidad: int, fecha: date):
+def _sentencias_deltas(cliente_id: int, anio: int, mes: int, deltas: dict[str, int], tope_cero: bool):
+    """(modelo, UPDATE) del mes y del año, en ese orden."""
+    saldo = _saldo_cliente(cliente_id)
+    sentencias = []
+
+    for modelo, condiciones in (
+        (ResumenMensual, [
+            ResumenMensual.anio == anio,
+            ResumenMensual.mes == mes,
+            ResumenMensual.estado != "cerrado",
+            exists().where(ResumenAnual.cliente_id == cliente_id, ResumenAnual.anio == anio)
+        ]),
+        (ResumenAnual, [ResumenAnual.anio == anio]),
+    ):
+        valores = {"saldo_final": saldo}
+        for columna, delta in deltas.items():
+            nuevo = getattr(modelo, columna) + delta
+            if tope_cero:
+                nuevo = case((nuevo < 0, 0), else_=nuevo)
+            valores[columna] = nuevo
+
+        sentencias.append((
+            modelo,
+            update(modelo)
+            .where(modelo.cliente_id == cliente_id, *condiciones)
+            .values(valores)
+            .execution_options(synchronize_session=False)
+        ))
+
+    return sentencias
+
+
+def _aplicado(modelo, resultado) -> bool:
+    if resultado.rowcount > 0:
+        return True
+
+    if modelo is ResumenMensual:
+        return False
+
+    # El mes ya se escribió: nunca devolver False con medio cambio hecho
+    raise HTTPException(409, "El resumen anual cambió durante la actualización; reintente")
+
+
+def aplicar_deltas_resumen(
+    db: Session,
+    cliente_id: int,
+    anio: int,
+    mes: int,
+    deltas: dict[str, int],
+    tope_cero: bool = False
+) -> bool:
+    """
+    Suma los deltas {columna: cantidad} al resumen mensual y anual con un
+    UPDATE por tabla y deja saldo_final = saldo actual del cliente.
+    Un mes cerrado no se toca en absoluto (la regla va en el WHERE, sin
+    lectura previa).
+
+    Todo o nada: el UPDATE del mes exige también la fila anual, así que
+    si devuelve False (falta alguna fila o el mes está cerrado) no se
+    escribió nada. tope_cero: ningún contador queda por debajo de 0.
+    """
+    for modelo, sentencia in _sentencias_deltas(cliente_id, anio, mes, deltas, tope_cero):
+        if not _aplicado(modelo, db.execute(sentencia)):
+            return False
+
+    return True
+
+
+async def aplicar_deltas_resumen_async(
+    db: AsyncSession,
+    cliente_id: int,
+    anio: int,
+    mes: int,
+    deltas: dict[str, int]
+) -> bool:
+    for modelo, sentencia in _sentencias_deltas(cliente_id, anio, mes, deltas, False):
+        if not _aplicado(modelo, await db.execute(sentencia)):
+            return False
+
+    return True
+
+
+def aplicar_deltas_anual(db: Session, cliente_id: int, anio: int, deltas: dict[str, int]) -> bool:
+    """
+    Deltas de un mes ya cerrado (volcado write-behind tardío): solo el
+    resumen anual, si sigue abierto. El mes lo rehace la reconciliación.
+    """
+    resultado = db.execute(
+        update(ResumenAnual)
+        .where(
+            ResumenAnual.cliente_id == cliente_id,
+            ResumenAnual.anio == anio,
+            ResumenAnual.estado != "cerrado"
+        )
+        .values(
+            {columna: getattr(ResumenAnual, columna) + delta for columna, delta in deltas.items()}
+            | {"saldo_final": _saldo_cliente(cliente_id)}
+        )
+        .execution_options(synchronize_session=False)
+    )
 
-    anio, mes = fecha.year, fecha.month
+    return resultado.rowcount > 0
 
-    resumen_m = db.query(ResumenMensual).filter_by(
-        cliente_id=cliente_id, anio=anio, mes=mes
-    ).first()
 
-    resumen_a = db.query(ResumenAnual).filter_by(
-        cliente_id=cliente_id, anio=anio
-    ).first()
+def estado_periodo(db: Session, cliente_id: int, anio: int, mes: int) -> tuple[str | None, str | None]:
+    """(estado del mes, estado del año); None si falta la fila."""
+    mensual = db.execute(
+        select(ResumenMensual.estado).where(
+            ResumenMensual.cliente_id == cliente_id,
+            ResumenMensual.anio == anio,
+            ResumenMensual.mes == mes
+        )
+    ).scalar()
 
-    if not resumen_m or not resumen_a:
-        raise HTTPException(409, "No existe resumen del período")
+    anual = db.execute(
+        select(ResumenAnual.estado).where(
+            ResumenAnual.cliente_id == cliente_id,
+            ResumenAnual.anio == anio
+        )
+    ).scalar()
 
-    resumen_m.total_entradas += cantidad
-    resumen_a.total_entradas += cantidad
+    return mensual, anual
 
-   
-    recalcular_saldo_resumenes(db, cliente_id, anio, mes)
-    db.flush()
 
-def restar_entrada(db: Session, cliente_id: int, cantidad: int, fecha: date):
+def exigir_periodo_abierto(db: Session, cliente_id: int, fecha: date):
+    """
+    409 si el período no tiene resumen (mensual y anual) o el mes está
+    cerrado. Lo usa el write-behind antes de acumular: mismas reglas
+    que el UPDATE directo, sin esperar al volcado.
+    """
+    _validar_estado_periodo(db.execute(_consulta_estado_periodo(cliente_id, fecha)).scalar())
 
-    anio, mes = fecha.year, fecha.month
 
-    resumen_m = db.query(ResumenMensual).filter_by(
-        cliente_id=cliente_id, anio=anio, mes=mes
-    ).first()
+async def exigir_periodo_abierto_async(db: AsyncSession, cliente_id: int, fecha: date):
+    _validar_estado_periodo((await db.execute(_consulta_estado_periodo(cliente_id, fecha))).scalar())
 
-    resumen_a = db.query(ResumenAnual).filter_by(
-        cliente_id=cliente_id, anio=anio
-    ).first()
 
-    if not resumen_m or not resumen_a:
+def _consulta_estado_periodo(cliente_id: int, fecha: date):
+    return select(ResumenMensual.estado).where(
+        ResumenMensual.cliente_id == cliente_id,
+        ResumenMensual.anio == fecha.year,
+        ResumenMensual.mes == fecha.month,
+        exists().where(
+            ResumenAnual.cliente_id == cliente_id,
+            ResumenAnual.anio == fecha.year
+        )
+    )
+
+
+def _validar_estado_periodo(estado: str | None):
+    if estado is None:
         raise HTTPException(409, "No existe resumen del período")
 
-    resumen_m.total_entradas = max(resumen_m.total_entradas - cantidad, 0)
-    resumen_a.total_entradas = max(resumen_a.total_entradas - cantidad, 0)
+    if estado == "cerrado":
+        raise HTTPException(409, "El mes está cerrado")
+
+
+def _rechazar_periodo(db: Session, cliente_id: int, fecha: date):
+    """El UPDATE condicional no tocó filas: 409 con el motivo exacto."""
+    exigir_periodo_abierto(db, cliente_id, fecha)
+    raise HTTPException(409, "No existe resumen del período")
+
+
+# ======================================================
+# ➕ ENTRADAS
+# ======================================================
+def sumar_entrada(db: Session, cliente_id: int, cantidad: int, fecha: date):
+
+    if resumen_buffer.activo():
+        exigir_periodo_abierto(db, cliente_id, fecha)
+        resumen_buffer.acumular(db, cliente_id, fecha, {"total_entradas": cantidad})
+        return
+
+    db.flush()
+
+    if not aplicar_deltas_resumen(
+        db, cliente_id, fecha.year, fecha.month,
+        {"total_entradas": cantidad}
+    ):
+        _rechazar_periodo(db, cliente_id, fecha)
+
+def restar_entrada(db: Session, cliente_id: int, cantidad: int, fecha: date):
+
+    # El tope en 0 necesita los totales reales: volcar antes lo pendiente
+    # de este cliente, dentro de esta transacción
+    if resumen_buffer.activo():
+        resumen_buffer.volcar_cliente(db, cliente_id)
 
-    
-    recalcular_saldo_resumenes(db, cliente_id, anio, mes)
     db.flush()
 
+    if not aplicar_deltas_resumen(
+        db, cliente_id, fecha.year, fecha.month,
+        {"total_entradas": -cantidad},
+        tope_cero=True
+    ):
+        _rechazar_periodo(db, cliente_id, fecha)
+
 # ======================================================
 # ➖ SALIDAS (DOCUMENTOS)
 # ======================================================
+# tipo_documento → columna del resumen
+COLUMNAS_SALIDA = {
+    "FACTURA": "total_facturas",
+    "NOTA_CREDITO": "total_notas_credito",
+    "NOTA_DEBITO": "total_notas_debito",
+    "DOCUMENTO_SOPORTE": "total_documentos_soporte",
+    "AJUSTE_DOCUMENTO_SOPORTE": "total_ajuste_documentos_soporte",
+    "NOMINA_ELECTRONICA": "total_nomina_electronica",
+    "AJUSTE_NOMINA": "total_ajuste_nomina",
+    "NOTA_AJUSTE": "total_nota_ajuste",
+}
+
+
+def _deltas_salida(tipo: str) -> dict[str, int]:
+    if tipo not in COLUMNAS_SALIDA:
+        raise HTTPException(400, f"Tipo desconocido: {tipo}")
+
+    return {COLUMNAS_SALIDA[tipo]: 1}
+
+
 def sumar_salida(db: Session, cliente_id: int, tipo: str, fecha: date | None):
 
     fecha = fecha or obtener_fecha_actual()
-    anio, mes = fecha.year, fecha.month
+    deltas = _deltas_salida(tipo)
 
-    m = db.query(ResumenMensual).filter_by(
-        cliente_id=cliente_id, anio=anio, mes=mes
-    ).first()
+    if resumen_buffer.activo():
+        exigir_periodo_abierto(db, cliente_id, fecha)
+        resumen_buffer.acumular(db, cliente_id, fecha, deltas)
+        return
 
-    a = db.query(ResumenAnual).filter_by(
-        cliente_id=cliente_id, anio=anio
-    ).first()
+    # Máximo dos UPDATE; el mes cerrado o inexistente se detecta por filas afectadas
+    if not aplicar_deltas_resumen(
+        db, cliente_id, fecha.year, fecha.month, deltas
+    ):
+        _rechazar_periodo(db, cliente_id, fecha)
+
+
+async def sumar_salida_async(db: AsyncSession, cliente_id: int, tipo: str, fecha: date):
+    """sumar_salida con await sobre la AsyncSession (camino caliente de POST /salidas/)."""
+    deltas = _deltas_salida(tipo)
 
-    if not m or not a:
+    if resumen_buffer.activo():
+        await exigir_periodo_abierto_async(db, cliente_id, fecha)
+        resumen_buffer.acumular(db.sync_session, cliente_id, fecha, deltas)
+        return
+
+    if not await aplicar_deltas_resumen_async(db, cliente_id, fecha.year, fecha.month, deltas):
+        await exigir_periodo_abierto_async(db, cliente_id, fecha)
         raise HTTPException(409, "No existe resumen del período")
 
-    mapa = {
-        "FACTURA": "total_facturas",
-        "NOTA_CREDITO": "total_notas_credito",
-        "NOTA_DEBITO": "total_notas_debito",
-        "DOCUMENTO_SOPORTE": "total_documentos_soporte",
-        "AJUSTE_DOCUMENTO_SOPORTE": "total_ajuste_documentos_soporte",
-        "NOMINA_ELECTRONICA": "total_nomina_electronica",
-        "AJUSTE_NOMINA": "total_ajuste_nomina",
-        "NOTA_AJUSTE": "total_nota_ajuste",
+def periodos_con_resumen(db: Session, cliente_ids, fecha: date) -> dict[int, str]:
+    """
+    Devuelve {cliente_id: estado del mes} para los clientes que tienen
+    resumen mensual y anual del período (dos consultas para todo el lote).
+    """
+    if not cliente_ids:
+        return {}
+
+    anio, mes = fecha.year, fecha.month
+
+    mensuales = dict(
+        db.query(ResumenMensual.cliente_id, ResumenMensual.estado)
+        .filter(
+            ResumenMensual.cliente_id.in_(cliente_ids),
+            ResumenMensual.anio == anio,
+            ResumenMensual.mes == mes
+        )
+        .all()
+    )
+
+    anuales = {
+        cid for (cid,) in db.query(ResumenAnual.cliente_id).filter(
+            ResumenAnual.cliente_id.in_(cliente_ids),
+            ResumenAnual.anio == anio
+        )
     }
 
-    if tipo not in mapa:
-        raise HTTPException(400, f"Tipo desconocido: {tipo}")
+    return {cid: estado for cid, estado in mensuales.items() if cid in anuales}
 
-    setattr(m, mapa[tipo], getattr(m, mapa[tipo]) + 1)
-    setattr(a, mapa[tipo], getattr(a, mapa[tipo]) + 1)
 
-  
-    recalcular_saldo_resumenes(db, cliente_id, anio, mes)
-    db.flush()
+def sumar_salidas_lote(
+    db: Session,
+    cliente_id: int,
+    conteos: dict[str, int],
+    fecha: date
+):
+    """
+    Aplica en un solo UPDATE por tabla los contadores acumulados de un lote
+    de salidas de un cliente ({tipo_documento: cantidad}).
+    Misma regla que una salida suelta: un mes cerrado no se toca (los
+    llamadores rechazan antes, por ítem, los documentos de meses cerrados;
+    aquí solo queda el 409 si el mes se cerró en medio).
+    """
+    for tipo in conteos:
+        if tipo not in COLUMNAS_SALIDA:
+            raise HTTPException(400, f"Tipo desconocido: {tipo}")
+
+    deltas = {COLUMNAS_SALIDA[tipo]: cantidad for tipo, cantidad in conteos.items()}
+
+    if resumen_buffer.activo():
+        exigir_periodo_abierto(db, cliente_id, fecha)
+        resumen_buffer.acumular(db, cliente_id, fecha, deltas)
+        return
+
+    if not aplicar_deltas_resumen(
+        db, cliente_id, fecha.year, fecha.month, deltas
+    ):
+        _rechazar_periodo(db, cliente_id, fecha)
 
 # ======================================================
 # 🔒 VALIDAR MES ABIERTO
@@ -147,7 +402,10 @@ def validar_mes_abierto(db: Session, cliente_id: int, fecha: date):
 # 📅 CIERRE AUTOMÁTICO MENSUAL
 # ======================================================
 def cierre_mensual_automatico(db: Session, cliente_id: int, fecha: date):
-
+    """
+    Cierra el mes anterior del cliente y abre el de fecha. No hace
+    commit: se confirma con la transacción del llamador.
+    """
     anio, mes = fecha.year, fecha.month
     anio_ant, mes_ant = (anio - 1, 12) if mes == 1 else (anio, mes - 1)
 
@@ -157,10 +415,12 @@ def cierre_mensual_automatico(db: Session, cliente_id: int, fecha: date):
 
     if anterior and anterior.estado == "abierto":
         anterior.estado = "cerrado"
+
+    # Enero: cierre anual solo de este cliente (el global corre en
+    # segundo plano, services/cierre_anual.py); crea el año nuevo
     if mes == 1:
-        cierre_anual_manual(db, anio - 1)
-        return
-    
+        cerrar_anio_bloque(db, anio - 1, cliente_id, cliente_id)
+
     actual = db.query(ResumenMensual).filter_by(
         cliente_id=cliente_id, anio=anio, mes=mes
     ).first()
@@ -175,75 +435,240 @@ def cierre_mensual_automatico(db: Session, cliente_id: int, fecha: date):
         actual.saldo_inicial = cliente.saldo_actual
         actual.saldo_final = cliente.saldo_actual
 
-    db.commit()
+
+# ======================================================
+# 🗓️ FILAS DE PERÍODO (resumen anual + 12 mensuales)
+# ======================================================
+def _insertar_omitiendo(db: Session, modelo, clave: list[str], columnas: list[str], origen):
+    """
+    INSERT ... SELECT que omite las filas que ya existen en la clave
+    única. El NOT EXISTS del SELECT no basta: dos transacciones (cierre
+    por cliente y cierre por bloques) pueden insertar la misma fila a
+    la vez; el conflicto lo resuelve la BD en vez de fallar.
+    """
+    dialecto = db.get_bind().dialect.name
+
+    if dialecto in ("mysql", "mariadb"):
+        sentencia = mysql.insert(modelo).from_select(columnas, origen)
+        return sentencia.on_duplicate_key_update(id=modelo.id)
+
+    # SQLite y PostgreSQL: ON CONFLICT sobre la restricción única
+    modulo = postgresql if dialecto == "postgresql" else sqlite
+    sentencia = modulo.insert(modelo).from_select(columnas, origen)
+    return sentencia.on_conflict_do_nothing(index_elements=clave)
+
+
+def insertar_periodos(db: Session, clientes, anio: int, mes_abierto: int):
+    """
+    Crea con dos INSERT ... SELECT el resumen anual y los 12 mensuales
+    de anio para los clientes de la consulta (columnas cliente_id, saldo).
+    Solo mes_abierto queda abierto y con saldo; los demás meses, cerrados
+    y en 0. Las filas que ya existen se omiten, también si otra
+    transacción las crea en paralelo. No hace commit.
+    """
+    origen = clientes.subquery()
+
+    db.execute(
+        _insertar_omitiendo(
+            db,
+            ResumenAnual,
+            ["cliente_id", "anio"],
+            ["cliente_id", "anio", "saldo_inicial", "saldo_final", "estado"],
+            select(
+                origen.c.cliente_id,
+                literal(anio),
+                origen.c.saldo,
+                origen.c.saldo,
+                literal("abierto")
+            ).where(~exists().where(
+                ResumenAnual.cliente_id == origen.c.cliente_id,
+                ResumenAnual.anio == anio
+            ))
+        )
+    )
+
+    meses = union_all(*(select(literal(mes).label("mes")) for mes in range(1, 13))).subquery()
+    abierto = meses.c.mes == mes_abierto
+
+    db.execute(
+        _insertar_omitiendo(
+            db,
+            ResumenMensual,
+            ["cliente_id", "anio", "mes"],
+            ["cliente_id", "anio", "mes", "estado", "saldo_inicial", "saldo_final"],
+            select(
+                origen.c.cliente_id,
+                literal(anio),
+                meses.c.mes,
+                case((abierto, "abierto"), else_="cerrado"),
+                case((abierto, origen.c.saldo), else_=0),
+                case((abierto, origen.c.saldo), else_=0)
+            )
+            .select_from(origen)
+            .join(meses, true())
+            .where(~exists().where(
+                ResumenMensual.cliente_id == origen.c.cliente_id,
+                ResumenMensual.anio == anio,
+                ResumenMensual.mes == meses.c.mes
+            ))
+        )
+    )
 
 
 # ======================================================
-# 🧾 CIERRE ANUAL GLOBAL (MANUAL)
+# 🧾 CIERRE ANUAL GLOBAL (por bloques, reanudable)
 # ======================================================
-def cierre_anual_manual(db: Session, anio: int):
+CIERRE_ANUAL_LOTE = int(os.getenv("CIERRE_ANUAL_LOTE", "1000"))
+
+
+def cerrar_anio_bloque(db: Session, anio: int, primero: int, ultimo: int):
+    """
+    Cierra anio y abre anio + 1 para los clientes con id entre primero
+    y ultimo. Idempotente: lo ya cerrado / creado no se toca. No hace commit.
+    """
+    db.execute(
+        update(ResumenMensual)
+        .where(
+            ResumenMensual.anio == anio,
+            ResumenMensual.cliente_id.between(primero, ultimo),
+            ResumenMensual.estado != "cerrado"
+        )
+        .values(estado="cerrado")
+        .execution_options(synchronize_session=False)
+    )
 
-    # 🔒 Verificar si el año ya está cerrado
-    existe_abierto = db.query(ResumenAnual).filter_by(
-        anio=anio,
-        estado="abierto"
-    ).first()
+    saldo = select(Cliente.saldo_actual).where(Cliente.id == ResumenAnual.cliente_id).scalar_subquery()
+
+    db.execute(
+        update(ResumenAnual)
+        .where(
+            ResumenAnual.anio == anio,
+            ResumenAnual.cliente_id.between(primero, ultimo),
+            ResumenAnual.estado != "cerrado"
+        )
+        .values(estado="cerrado", saldo_final=saldo)
+        .execution_options(synchronize_session=False)
+    )
+
+    insertar_periodos(
+        db,
+        select(Cliente.id.label("cliente_id"), Cliente.saldo_actual.label("saldo"))
+        .where(Cliente.id.between(primero, ultimo)),
+        anio + 1,
+        mes_abierto=1
+    )
+
+
+def preparar_cierre_anual(db: Session, anio: int) -> ProcesoCierre | None:
+    """
+    Devuelve el proceso de cierre del año, creándolo si no existe.
+    Si el año no tiene resúmenes abiertos no se registra nada (None):
+    un cierre pedido antes de tiempo no debe impedir el de enero.
+    Un proceso terminado se reabre si el año volvió a tener abiertos.
+    """
+    existe_abierto = db.query(ResumenAnual.id).filter(
+        ResumenAnual.anio == anio,
+        ResumenAnual.estado == "abierto"
+    ).first() is not None
+
+    proceso = (
+        db.query(ProcesoCierre)
+        .filter(ProcesoCierre.anio == anio)
+        .with_for_update()
+        .first()
+    )
+    ahora = datetime.utcnow()
+
+    if proceso:
+        if proceso.estado == "terminado" and existe_abierto:
+            # Reabrir desde el inicio: cerrar_anio_bloque es idempotente
+            proceso.estado = "en_curso"
+            proceso.ultimo_cliente_id = 0
+            proceso.clientes_procesados = 0
+            proceso.clientes_total = db.query(func.count(Cliente.id)).scalar()
+            proceso.error = None
+            proceso.terminado = None
+            proceso.actualizado = ahora
+        db.commit()
+        return proceso
 
     if not existe_abierto:
-        return {"msg": f"Año {anio} ya estaba cerrado"}
+        db.rollback()
+        return None
 
-    clientes = db.query(Cliente).all()
-    nuevo_anio = anio + 1
+    proceso = ProcesoCierre(
+        anio=anio,
+        estado="en_curso",
+        clientes_total=db.query(func.count(Cliente.id)).scalar(),
+        iniciado=ahora,
+        actualizado=ahora
+    )
+    db.add(proceso)
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro proceso lo creó al mismo tiempo
+        db.rollback()
+        proceso = db.query(ProcesoCierre).filter(ProcesoCierre.anio == anio).one()
+
+    return proceso
+
+
+def cierre_anual_manual(db: Session, anio: int, lote: int = CIERRE_ANUAL_LOTE) -> ProcesoCierre | None:
+    """
+    Cierra el año para todos los clientes, un bloque de ids por
+    transacción. El avance se guarda en procesos_cierre con el mismo
+    commit que el bloque: si se corta, la siguiente llamada sigue
+    desde ahí. Con varios procesos, el FOR UPDATE sobre el proceso
+    hace que cada bloque se aplique una sola vez.
+    None si el año no tiene nada que cerrar.
+    """
+    # Los saldos finales salen de clientes: volcar antes lo pendiente
+    if resumen_buffer.activo():
+        resumen_buffer.flush()
+
+    if preparar_cierre_anual(db, anio) is None:
+        return None
+
+    while True:
+        proceso = (
+            db.query(ProcesoCierre)
+            .filter(ProcesoCierre.anio == anio)
+            .with_for_update()
+            .one()
+        )
 
-    for cliente in clientes:
+        if proceso.estado == "terminado":
+            db.commit()
+            return proceso
 
-        # cerrar meses
-        meses = db.query(ResumenMensual).filter_by(
-            cliente_id=cliente.id, anio=anio
+        ids = db.scalars(
+            select(Cliente.id)
+            .where(Cliente.id > proceso.ultimo_cliente_id)
+            .order_by(Cliente.id)
+            .limit(lote)
         ).all()
 
-        for m in meses:
-            m.estado = "cerrado"
-
-        # cerrar resumen anual
-        resumen_anual = db.query(ResumenAnual).filter_by(
-            cliente_id=cliente.id, anio=anio
-        ).first()
-
-        if resumen_anual:
-            resumen_anual.estado = "cerrado"
-            resumen_anual.saldo_final = cliente.saldo_actual
-
-        # 🔒 Verificar que el nuevo año no exista
-        ya_existe = db.query(ResumenAnual).filter_by(
-            cliente_id=cliente.id,
-            anio=nuevo_anio
-        ).first()
-
-        if ya_existe:
-            continue
-
-        # crear nuevo año
-        nuevo_anual = ResumenAnual(
-            cliente_id=cliente.id,
-            anio=nuevo_anio,
-            estado="abierto",
-            saldo_inicial=cliente.saldo_actual,
-            saldo_final=cliente.saldo_actual
-        )
-        db.add(nuevo_anual)
-
-        for mes in range(1, 13):
-            db.add(ResumenMensual(
-                cliente_id=cliente.id,
-                anio=nuevo_anio,
-                mes=mes,
-                estado="abierto" if mes == 1 else "cerrado",
-                saldo_inicial=cliente.saldo_actual if mes == 1 else 0,
-                saldo_final=cliente.saldo_actual if mes == 1 else 0
-            ))
+        ahora = datetime.utcnow()
+
+        if not ids:
+            proceso.estado = "terminado"
+            proceso.error = None
+            proceso.terminado = ahora
+            proceso.actualizado = ahora
+            db.commit()
+            return proceso
+
+        cerrar_anio_bloque(db, anio, ids[0], ids[-1])
+
+        proceso.estado = "en_curso"
+        proceso.ultimo_cliente_id = ids[-1]
+        proceso.clientes_procesados += len(ids)
+        proceso.actualizado = ahora
+        db.commit()
+
 
-    db.commit()
 # ======================================================
 # 📌 OBTENER RESUMEN MENSUAL POR NIT
 # ======================================================
@@ -253,7 +678,7 @@ def resumen_mensual_por_nit(
     anio: int,
     mes: int
 ):
-    cliente = db.query(Cliente).filter_by(nit=nit).first()
+    cliente = cliente_cache.obtener_por_nit(db, nit)
     if not cliente:
         raise HTTPException(404, "Cliente no encontrado")
 
@@ -263,7 +688,7 @@ def resumen_mensual_por_nit(
         mes=mes
     ).first()
 
-    return resumen
+    return resumen_buffer.fusionar(resumen, cliente.id, anio, mes)
 
 
 # ======================================================
@@ -274,7 +699,7 @@ def resumen_anual_por_nit(
     nit: str,
     anio: int
 ):
-    cliente = db.query(Cliente).filter_by(nit=nit).first()
+    cliente = cliente_cache.obtener_por_nit(db, nit)
     if not cliente:
         raise HTTPException(404, "Cliente no encontrado")
 
@@ -283,7 +708,7 @@ def resumen_anual_por_nit(
         anio=anio
     ).first()
 
-    return resumen
+    return resumen_buffer.fusionar(resumen, cliente.id, anio)
 # ======================================================
 # 📊 RESÚMENES MENSUALES DEL AÑO POR NIT
 # ======================================================
@@ -292,7 +717,7 @@ def resumenes_mensuales_anio_por_nit(
     nit: str,
     anio: int
 ):
-    cliente = db.query(Cliente).filter_by(nit=nit).first()
+    cliente = cliente_cache.obtener_por_nit(db, nit)
     if not cliente:
         raise HTTPException(404, "Cliente no encontrado")
 
@@ -312,33 +737,170 @@ def resumenes_mensuales_anio_por_nit(
             detail=f"No existen resúmenes para el año {anio}"
         )
 
-    return resumenes
+    return [
+        resumen_buffer.fusionar(r, cliente.id, anio, r.mes)
+        for r in resumenes
+    ]
+
+# ======================================================
+# 📑 REPORTE DE TODOS LOS CLIENTES (un año o un mes)
+# ======================================================
+def consulta_reporte(anio: int, mes: int | None = None):
+    """
+    select() de columnas para services/exportacion: una fila por cliente
+    con los contadores del período, una columna por tipo de documento.
+    Con mes → resumen_mensual; sin mes → resumen_anual.
+    Los deltas write-behind se vuelcan antes (ver route).
+    """
+    modelo = ResumenMensual if mes else ResumenAnual
+
+    documentos = [
+        func.coalesce(getattr(modelo, columna), 0).label(tipo)
+        for tipo, columna in COLUMNAS_SALIDA.items()
+    ]
+    total_documentos = documentos[0].element
+    for columna in documentos[1:]:
+        total_documentos = total_documentos + columna.element
+
+    consulta = (
+        select(
+            Cliente.id.label("cliente_id"),
+            Cliente.nit,
+            Cliente.nombre,
+            modelo.anio,
+            *([modelo.mes] if mes else []),
+            *documentos,
+            total_documentos.label("total_documentos"),
+            func.coalesce(modelo.total_entradas, 0).label("entradas"),
+            func.coalesce(modelo.total_ajustes, 0).label("ajustes"),
+            modelo.saldo_inicial,
+            modelo.saldo_final,
+            modelo.estado
+        )
+        .join(Cliente, Cliente.id == modelo.cliente_id)
+        .where(modelo.anio == anio)
+        .order_by(Cliente.id)
+    )
+
+    if mes:
+        consulta = consulta.where(ResumenMensual.mes == mes)
+
+    return consulta
+
+# ======================================================
+# 🏷️ VERSIONES PARA ETAG (sin cargar las filas)
+# ======================================================
+def _marca_pendientes(cliente_id: int, anio: int, mes: int | None = None) -> str:
+    """Huella de los deltas write-behind aún no volcados (cambian la respuesta)."""
+    deltas = resumen_buffer.pendientes(cliente_id, anio, mes)
+    if not deltas:
+        return "0"
+    return format(zlib.crc32(repr(sorted(deltas.items())).encode()), "x")
+
+
+def _periodo_pasado(anio: int, mes: int | None = None) -> bool:
+    """(anio, mes) — o el año entero si mes es None — es anterior al período vigente."""
+    hoy = obtener_fecha_actual()
+    if mes is None:
+        return anio < hoy.year
+    return (anio, mes) < (hoy.year, hoy.month)
+
+
+def version_resumen(db: Session, cliente_id: int, anio: int, mes: int | None = None):
+    """
+    (etag, definitivo) del resumen mensual, o del anual si mes es None.
+    definitivo: cerrado y de un período ya pasado (los meses futuros
+    también nacen cerrados). None si el resumen no existe.
+    """
+    modelo = ResumenMensual if mes is not None else ResumenAnual
+
+    consulta = select(modelo.id, modelo.version, modelo.estado).where(
+        modelo.cliente_id == cliente_id,
+        modelo.anio == anio
+    )
+    if mes is not None:
+        consulta = consulta.where(ResumenMensual.mes == mes)
+
+    fila = db.execute(consulta).first()
+
+    if fila is None:
+        return None
+
+    etag = construir_etag(
+        "rm" if mes is not None else "ra",
+        fila.id,
+        fila.version,
+        _marca_pendientes(cliente_id, anio, mes)
+    )
+    return etag, fila.estado == "cerrado" and _periodo_pasado(anio, mes)
+
+
+def version_resumenes_mensuales(db: Session, cliente_id: int, anio: int):
+    """(etag, definitivo) de los resúmenes mensuales del año, o None.
+    definitivo: año ya pasado con todos sus meses cerrados."""
+    cantidad, suma_versiones, abiertos = db.execute(
+        select(
+            func.count(ResumenMensual.id),
+            func.coalesce(func.sum(ResumenMensual.version), 0),
+            func.coalesce(func.sum(case((ResumenMensual.estado != "cerrado", 1), else_=0)), 0)
+        ).where(
+            ResumenMensual.cliente_id == cliente_id,
+            ResumenMensual.anio == anio
+        )
+    ).one()
+
+    if not cantidad:
+        return None
+
+    # Las versiones solo crecen: la suma cambia con cualquier UPDATE del año
+    etag = construir_etag(
+        "rms", cliente_id, anio, cantidad, suma_versiones,
+        _marca_pendientes(cliente_id, anio)
+    )
+    return etag, abiertos == 0 and _periodo_pasado(anio)
+
+
+# ======================================================
+# ⚡ LECTURAS ASYNC (AsyncSession)
+# ======================================================
+async def version_resumen_async(db: AsyncSession, cliente_id: int, anio: int, mes: int | None = None):
+    return await db.run_sync(version_resumen, cliente_id, anio, mes)
+
+
+async def version_resumenes_mensuales_async(db: AsyncSession, cliente_id: int, anio: int):
+    return await db.run_sync(version_resumenes_mensuales, cliente_id, anio)
+
+
+async def resumen_mensual_por_nit_async(db: AsyncSession, nit: str, anio: int, mes: int):
+    return await db.run_sync(resumen_mensual_por_nit, nit, anio, mes)
+
+
+async def resumen_anual_por_nit_async(db: AsyncSession, nit: str, anio: int):
+    return await db.run_sync(resumen_anual_por_nit, nit, anio)
+
+
+async def resumenes_mensuales_anio_por_nit_async(db: AsyncSession, nit: str, anio: int):
+    return await db.run_sync(resumenes_mensuales_anio_por_nit, nit, anio)
+
 
 #======================================================
 # + sumar ajuste
 #=====================================================
 def sumar_ajuste(db: Session, cliente_id: int, cantidad: int, fecha: date):
 
-    m = db.query(ResumenMensual).filter_by(
-        cliente_id=cliente_id,
-        anio=fecha.year,
-        mes=fecha.month
-    ).first()
-
-    a = db.query(ResumenAnual).filter_by(
-        cliente_id=cliente_id,
-        anio=fecha.year
-    ).first()
-
-    if not m or not a:
-        raise HTTPException(409, "Resumen no encontrado")
-
-    m.total_ajustes += cantidad
-    a.total_ajustes += cantidad
+    if resumen_buffer.activo():
+        exigir_periodo_abierto(db, cliente_id, fecha)
+        resumen_buffer.acumular(db, cliente_id, fecha, {"total_ajustes": cantidad})
+        return
 
-    recalcular_saldo_resumenes(db, cliente_id, fecha.year, fecha.month)
     db.flush()
 
+    if not aplicar_deltas_resumen(
+        db, cliente_id, fecha.year, fecha.month,
+        {"total_ajustes": cantidad}
+    ):
+        _rechazar_periodo(db, cliente_id, fecha)
+
 # ======================================================
 # sincronizar mes actual
 # ======================================================
@@ -0,0 +1,245 @@
+# crud/crud_saldos.py
+# Libro de movimientos del saldo, saldos diarios consolidados
+# y consultas de saldo a una fecha.
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.cliente_model import Cliente
+from models.movimiento_saldo_model import MovimientoSaldo
+from models.saldo_diario_model import SaldoDiario
+from services.time_service import obtener_fecha_actual
+
+SALDO_SERIE_MAX_DIAS = int(os.getenv("SALDO_SERIE_MAX_DIAS", "1096"))
+
+
+# ======================================================
+# ⚡ CAMBIO ATÓMICO DEL SALDO
+# ======================================================
+def sumar_saldo(db: Session, cliente_id: int, cantidad: int) -> tuple[int, int]:
+    """
+    saldo_actual = saldo_actual + cantidad (+ o -) en un solo UPDATE,
+    igual que descontar_folios: una salida concurrente nunca se pisa.
+    Devuelve (saldo_antes, saldo_despues) leídos tras el UPDATE.
+    """
+    db.execute(
+        update(Cliente)
+        .where(Cliente.id == cliente_id)
+        .values(saldo_actual=Cliente.saldo_actual + cantidad)
+        .execution_options(synchronize_session=False)
+    )
+
+    # La fila ya está bloqueada por el UPDATE → lectura consistente
+    saldo_despues = db.execute(
+        select(Cliente.saldo_actual).where(Cliente.id == cliente_id)
+    ).scalar()
+
+    return saldo_despues - cantidad, saldo_despues
+
+
+# ======================================================
+# 📝 REGISTRAR MOVIMIENTOS (misma transacción que la operación)
+# ======================================================
+def _insertar_movimiento(cliente_id: int, cantidad: int, origen: str, referencia_id: int | None):
+    return insert(MovimientoSaldo).values(
+        cliente_id=cliente_id,
+        fecha=obtener_fecha_actual(),
+        cantidad=cantidad,
+        origen=origen,
+        referencia_id=referencia_id,
+        creado=datetime.utcnow()
+    )
+
+
+def registrar_movimiento(
+    db: Session,
+    cliente_id: int,
+    cantidad: int,
+    origen: str,
+    referencia_id: int | None = None
+):
+    """Agrega al libro el delta de saldo de una operación (no hace commit)."""
+    if not cantidad:
+        return
+
+    db.execute(_insertar_movimiento(cliente_id, cantidad, origen, referencia_id))
+
+
+async def registrar_movimiento_async(
+    db: AsyncSession,
+    cliente_id: int,
+    cantidad: int,
+    origen: str,
+    referencia_id: int | None = None
+):
+    if not cantidad:
+        return
+
+    await db.execute(_insertar_movimiento(cliente_id, cantidad, origen, referencia_id))
+
+
+def registrar_movimientos(db: Session, deltas: dict[int, int], origen: str):
+    """Un movimiento por cliente ({cliente_id: delta}) en un solo executemany."""
+    hoy = obtener_fecha_actual()
+    ahora = datetime.utcnow()
+
+    filas = [
+        {
+            "cliente_id": cliente_id,
+            "fecha": hoy,
+            "cantidad": cantidad,
+            "origen": origen,
+            "referencia_id": None,
+            "creado": ahora,
+        }
+        for cliente_id, cantidad in deltas.items()
+        if cantidad
+    ]
+
+    if filas:
+        db.execute(insert(MovimientoSaldo), filas)
+
+
+# ======================================================
+# 📸 CONSOLIDACIÓN DIARIA
+# ======================================================
+def consolidar_dia(db: Session, dia: date) -> int:
+    """
+    Escribe el saldo al cierre de `dia` de los clientes con movimientos
+    ese día: último saldo consolidado + deltas del día (un INSERT ... SELECT).
+    """
+    anterior = (
+        select(SaldoDiario.saldo)
+        .where(SaldoDiario.cliente_id == MovimientoSaldo.cliente_id, SaldoDiario.fecha < dia)
+        .order_by(SaldoDiario.fecha.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    resultado = db.execute(
+        insert(SaldoDiario).from_select(
+            ["cliente_id", "fecha", "saldo"],
+            select(
+                MovimientoSaldo.cliente_id,
+                literal(dia),
+                func.coalesce(anterior, 0) + func.sum(MovimientoSaldo.cantidad)
+            )
+            .where(MovimientoSaldo.fecha == dia)
+            .group_by(MovimientoSaldo.cliente_id)
+        )
+    )
+
+    return resultado.rowcount
+
+
+def consolidar_pendientes(db: Session, hasta: date | None = None) -> int:
+    """
+    Consolida, en orden, los días con movimientos posteriores al último
+    consolidado y hasta `hasta` (por defecto ayer). Un commit por día.
+    Devuelve cuántos días se consolidaron.
+    """
+    hasta = hasta or obtener_fecha_actual() - timedelta(days=1)
+    ultimo = db.execute(select(func.max(SaldoDiario.fecha))).scalar()
+    dias = 0
+
+    while True:
+        siguiente = select(func.min(MovimientoSaldo.fecha)).where(MovimientoSaldo.fecha <= hasta)
+        if ultimo is not None:
+            siguiente = siguiente.where(MovimientoSaldo.fecha > ultimo)
+
+        dia = db.execute(siguiente).scalar()
+        if dia is None:
+            return dias
+
+        consolidar_dia(db, dia)
+        db.commit()
+
+        ultimo = dia
+        dias += 1
+
+
+# ======================================================
+# 🔍 SALDO A UNA FECHA
+# ======================================================
+def _validar_cliente_y_fecha(db: Session, cliente_id: int, fecha: date):
+    if db.query(Cliente.id).filter(Cliente.id == cliente_id).first() is None:
+        raise HTTPException(404, "Cliente no encontrado")
+
+    if fecha > obtener_fecha_actual():
+        raise HTTPException(400, "La fecha no puede ser futura")
+
+
+def _saldo_al_cierre(db: Session, cliente_id: int, fecha: date) -> int:
+    # Última foto <= fecha (índice uq_saldo_diario) ...
+    foto = db.execute(
+        select(SaldoDiario.fecha, SaldoDiario.saldo)
+        .where(SaldoDiario.cliente_id == cliente_id, SaldoDiario.fecha <= fecha)
+        .order_by(SaldoDiario.fecha.desc())
+        .limit(1)
+    ).first()
+
+    # ... más los deltas aún no consolidados hasta esa fecha
+    deltas = select(func.coalesce(func.sum(MovimientoSaldo.cantidad), 0)).where(
+        MovimientoSaldo.cliente_id == cliente_id,
+        MovimientoSaldo.fecha <= fecha
+    )
+    if foto is not None:
+        deltas = deltas.where(MovimientoSaldo.fecha > foto.fecha)
+
+    return (foto.saldo if foto is not None else 0) + db.execute(deltas).scalar()
+
+
+def saldo_en_fecha(db: Session, cliente_id: int, fecha: date | None = None) -> dict:
+    """Saldo efectivo del cliente al cierre de `fecha` (hoy: saldo en curso)."""
+    fecha = fecha or obtener_fecha_actual()
+    _validar_cliente_y_fecha(db, cliente_id, fecha)
+
+    return {
+        "cliente_id": cliente_id,
+        "fecha": fecha,
+        "saldo": _saldo_al_cierre(db, cliente_id, fecha)
+    }
+
+
+def serie_saldo(db: Session, cliente_id: int, desde: date, hasta: date | None = None) -> dict:
+    """
+    Saldo al cierre de cada día entre desde y hasta (inclusive):
+    saldo del día anterior + suma acumulada de los deltas diarios.
+    """
+    hasta = hasta or obtener_fecha_actual()
+    _validar_cliente_y_fecha(db, cliente_id, hasta)
+
+    if desde > hasta:
+        raise HTTPException(400, "desde debe ser anterior o igual a hasta")
+
+    dias = (hasta - desde).days + 1
+    if dias > SALDO_SERIE_MAX_DIAS:
+        raise HTTPException(400, f"El rango supera el máximo de {SALDO_SERIE_MAX_DIAS} días")
+
+    base = _saldo_al_cierre(db, cliente_id, desde - timedelta(days=1))
+
+    por_dia = db.execute(
+        select(MovimientoSaldo.fecha, func.sum(MovimientoSaldo.cantidad))
+        .where(
+            MovimientoSaldo.cliente_id == cliente_id,
+            MovimientoSaldo.fecha.between(desde, hasta)
+        )
+        .group_by(MovimientoSaldo.fecha)
+    ).all()
+
+    deltas = np.zeros(dias, dtype=np.int64)
+    if por_dia:
+        indices = np.fromiter(((fecha - desde).days for fecha, _ in por_dia), dtype=np.int64, count=len(por_dia))
+        deltas[indices] = [total for _, total in por_dia]
+
+    return {
+        "cliente_id": cliente_id,
+        "desde": desde,
+        "hasta": hasta,
+        "saldos": (base + np.cumsum(deltas)).tolist()
+    }
@@ -1,158 +1,530 @@
 #crud/crud_salidas.py
+import asyncio
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from models.salida_model import Salida
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.salida_model import Salida, TipoDocumentoEnum
 from models.cliente_model import Cliente
-from schemas.salida_schema import SalidaCreate
+from schemas.salida_schema import SalidaCreate, SalidaResponse
 from services.time_service import obtener_fecha_actual
-from services.email_service import enviar_alerta_folios   
-from crud.crud_resumen import sumar_salida, sincronizar_mes_actual, cierre_mensual_automatico
+from models.alerta_model import AlertaOutbox
+from models.reserva_model import ReservaFolios
+from crud.crud_resumen import (
+    sumar_salida,
+    sumar_salida_async,
+    sumar_salidas_lote,
+    periodos_con_resumen,
+    cierre_mensual_automatico
+)
+from crud.crud_saldos import registrar_movimiento, registrar_movimiento_async, registrar_movimientos
+from crud.crud_salidas_diarias import sumar_salidas_diarias, sumar_salidas_diarias_async
+from services import cliente_cache, group_commit
+from services.paginacion import paginar
+from services.serializacion import columnas
+from services.periodo_service import (
+    asegurar_periodo,
+    cliente_sincronizado,
+    marcar_cliente_sincronizado
+)
 
 # ======================================================
 # 🔔 ALERTAS CONTROLADAS (SIN SPAM)
 # ======================================================
-def verificar_y_enviar_alerta(cliente, saldo_antes, saldo_despues, mensaje):
+def verificar_y_encolar_alerta(db: Session, cliente, saldo_antes, saldo_despues, mensaje):
+    """
+    Escribe la alerta en alertas_outbox dentro de la transacción actual.
+    El envío del correo lo hace services/alerta_worker.py en segundo plano.
+    """
     # 🟡 Cruza mínimo de alerta
-    if (
+    cruza_minimo = (
         saldo_antes > cliente.minimo_alerta
         and saldo_despues <= cliente.minimo_alerta
         and saldo_despues > 0
-    ):
-        enviar_alerta_folios(
-            cliente_nombre=cliente.nombre,
-            nit=cliente.nit,
-            mensaje=mensaje,
-            saldo=saldo_despues
-        )
+    )
 
     # 🔴 Llega a 0
-    if saldo_antes > 0 and saldo_despues == 0:
-        enviar_alerta_folios(
+    llega_a_cero = saldo_antes > 0 and saldo_despues == 0
+
+    if cruza_minimo or llega_a_cero:
+        db.add(AlertaOutbox(
+            cliente_id=cliente.id,
             cliente_nombre=cliente.nombre,
             nit=cliente.nit,
             mensaje=mensaje,
             saldo=saldo_despues
+        ))
+
+
+# ======================================================
+# ⚡ MOTOR DE DÉBITO ATÓMICO
+# ======================================================
+def descontar_folios(db: Session, cliente_id: int, cantidad: int, exigir_saldo: bool = False):
+    """
+    Descuenta folios con un único UPDATE condicional.
+    Las reglas de inactivo / bloqueado van en el WHERE, así dos salidas
+    concurrentes del mismo cliente nunca pierden un débito.
+    exigir_saldo=True pide saldo suficiente aunque el cliente no esté
+    bloqueado (reservas: solo se apartan folios que existen).
+
+    Devuelve (saldo_antes, saldo_despues, bloqueado) o None si las reglas
+    del cliente no permiten el débito.
+    """
+    resultado = db.execute(_sentencia_debito(cliente_id, cantidad, exigir_saldo))
+
+    if resultado.rowcount == 0:
+        return None
+
+    # La fila ya está bloqueada por el UPDATE → lectura consistente
+    saldo_despues, bloqueado = db.execute(_consulta_saldo(cliente_id)).one()
+
+    return saldo_despues + cantidad, saldo_despues, bool(bloqueado)
+
+
+async def descontar_folios_async(db: AsyncSession, cliente_id: int, cantidad: int):
+    resultado = await db.execute(_sentencia_debito(cliente_id, cantidad, False))
+
+    if resultado.rowcount == 0:
+        return None
+
+    saldo_despues, bloqueado = (await db.execute(_consulta_saldo(cliente_id))).one()
+
+    return saldo_despues + cantidad, saldo_despues, bool(bloqueado)
+
+
+def _sentencia_debito(cliente_id: int, cantidad: int, exigir_saldo: bool):
+    con_saldo = Cliente.saldo_actual >= cantidad
+
+    return (
+        update(Cliente)
+        .where(
+            Cliente.id == cliente_id,
+            Cliente.inactivo == False,  # noqa: E712
+            con_saldo if exigir_saldo else or_(Cliente.bloqueado == 0, con_saldo)
         )
+        .values(saldo_actual=Cliente.saldo_actual - cantidad)
+        .execution_options(synchronize_session=False)
+    )
 
 
-def crear_salida(db: Session, data: SalidaCreate):
-    hoy = obtener_fecha_actual()
-# 1. Sincronizar mes actual (global, no depende del cliente)
-    sincronizar_mes_actual(db)
+def _consulta_saldo(cliente_id: int):
+    return select(Cliente.saldo_actual, Cliente.bloqueado).where(Cliente.id == cliente_id)
 
-    # 2. Buscar cliente por NIT
-    cliente: Cliente | None = db.query(Cliente).filter(Cliente.nit == data.nit).first()
-    
-    if not cliente:
+
+def folios_reservados(db: Session, cliente_ids) -> dict[int, int]:
+    """
+    Folios en reservas activas aún no consumidos, por cliente (desde la
+    BD: vale con varios workers y tras un reinicio).
+    Saldo efectivo = saldo_actual + esto.
+    """
+    reservados = dict(db.execute(_consulta_reservados(cliente_ids)).all())
+
+    return {cliente_id: int(reservados.get(cliente_id) or 0) for cliente_id in cliente_ids}
+
+
+async def folios_reservados_async(db: AsyncSession, cliente_id: int) -> int:
+    reservados = dict((await db.execute(_consulta_reservados([cliente_id]))).all())
+
+    return int(reservados.get(cliente_id) or 0)
+
+
+def _consulta_reservados(cliente_ids):
+    return (
+        select(
+            ReservaFolios.cliente_id,
+            func.sum(ReservaFolios.cantidad - ReservaFolios.consumidos)
+        )
+        .where(ReservaFolios.cliente_id.in_(cliente_ids), ReservaFolios.estado == "activa")
+        .group_by(ReservaFolios.cliente_id)
+    )
+
+
+def es_documento_duplicado(error: IntegrityError) -> bool:
+    """
+    True solo si el IntegrityError viene de uq_salida_documento
+    (MySQL 1062 con el nombre del índice; SQLite no da el nombre,
+    pero la única UNIQUE de salidas es esa). FK, NOT NULL, etc. → False.
+    """
+    codigo = error.orig.args[0] if error.orig.args else None
+    mensaje = str(error.orig)
+
+    if codigo == 1062:
+        return "uq_salida_documento" in mensaje
+
+    return mensaje.startswith("UNIQUE constraint failed: salidas.")
+
+
+def motivo_rechazo(db: Session, cliente_id: int) -> dict:
+    """Explica por qué descontar_folios no pudo aplicar el débito."""
+    return _motivo(db.execute(select(Cliente.inactivo).where(Cliente.id == cliente_id)).scalar())
+
+
+async def motivo_rechazo_async(db: AsyncSession, cliente_id: int) -> dict:
+    return _motivo((await db.execute(select(Cliente.inactivo).where(Cliente.id == cliente_id))).scalar())
+
+
+def _motivo(inactivo: bool | None) -> dict:
+    if inactivo is None:
         return {"estado": "RECHAZADO", "mensaje": "El cliente no existe."}
 
-    # 3. Cliente inactivo
-    if cliente.inactivo:
+    if inactivo:
         return {
             "estado": "RECHAZADO",
             "mensaje": "El cliente está inactivo y no puede emitir documentos."
         }
 
-    # 4. Cierre mensual automático (usamos cliente.id, no data.cliente_id)
-    cierre_mensual_automatico(db, cliente.id, hoy)
-    cantidad = 1
- 
+    return {
+        "estado": "RECHAZADO",
+        "mensaje": "Cliente sin folios disponibles, Porfavor contactese con DREAMSOFT para adquirir más folios."
+    }
 
 
-    cliente: Cliente = db.query(Cliente).filter(Cliente.nit == data.nit).first()
+def crear_salida(db: Session, data: SalidaCreate):
+    hoy = obtener_fecha_actual()
+    # 1. Período vigente (caché de proceso, sin consultas)
+    asegurar_periodo(hoy)
+
+    # 2. Buscar cliente por NIT (caché; el saldo siempre sale de la BD)
+    cliente = cliente_cache.obtener_por_nit(db, data.nit)
 
     if not cliente:
         return {"estado": "RECHAZADO", "mensaje": "El cliente no existe."}
 
-    # Cliente inactivo
+    # 3. Cliente inactivo
     if cliente.inactivo:
         return {
             "estado": "RECHAZADO",
             "mensaje": "El cliente está inactivo y no puede emitir documentos."
         }
 
-    # Duplicado
-    duplicado = db.query(Salida).filter(
-        Salida.cliente_id == cliente.id,
-        Salida.tipo_documento == data.tipo_documento,
-        Salida.numero_documento == data.numero_documento
-    ).first()
+    # 4. Cierre mensual automático (una vez por cliente y período)
+    if not cliente_sincronizado(cliente.id, hoy):
+        cierre_mensual_automatico(db, cliente.id, hoy)
+        marcar_cliente_sincronizado(db, cliente.id, hoy)
+    cantidad = 1
+
+    # ====================================
+    # 5. REGISTRAR SALIDA (el índice único detecta el duplicado)
+    # ====================================
+    nueva_salida = Salida(
+        cliente_id=cliente.id,
+        tipo_documento=data.tipo_documento,
+        numero_documento=data.numero_documento,
+        fecha_documento=hoy,
+        cantidad=cantidad
+    )
 
-    if duplicado:
+    try:
+        with db.begin_nested():
+            db.add(nueva_salida)
+            db.flush()
+    except IntegrityError as e:
+        if not es_documento_duplicado(e):
+            raise
         return {
             "estado": "APROBADO",
             "mensaje": "Documento duplicado. No se descontó folio."
         }
-    saldo_antes = cliente.saldo_actual
-    saldo_despues = cliente.saldo_actual - cantidad
 
     # ====================================
-    # 4. CLIENTE BLOQUEADO
+    # 6. DÉBITO ATÓMICO
     # ====================================
-    if cliente.bloqueado:
+    debito = descontar_folios(db, cliente.id, cantidad)
 
-        if cliente.saldo_actual <= 0:
-            return {
-                "estado": "RECHAZADO",
-                "mensaje": "Cliente sin folios disponibles, Porfavor contactese con DREAMSOFT para adquirir más folios."
-            }
+    if debito is None:
+        db.rollback()
+        return motivo_rechazo(db, cliente.id)
 
-        # Bloqueado pero queda en mínimo de alerta
-        if saldo_despues <= cliente.minimo_alerta:
-            mensaje = f"Folios restantes: {saldo_despues}. Se recomienda adquirir más folios."
+    saldo_antes, saldo_despues, bloqueado = debito
 
-        # Bloqueado y operación normal
-        else:
-            mensaje = f"Operación aprobada."
+    # Mensajes y alertas sobre el saldo efectivo (incluye folios reservados)
+    reservados = folios_reservados(db, [cliente.id])[cliente.id]
+    saldo_antes += reservados
+    saldo_despues += reservados
 
-        # Registrar salida
-        nueva_salida = Salida(
-            cliente_id=cliente.id,
-            tipo_documento=data.tipo_documento,
-            numero_documento=data.numero_documento,
-            fecha_documento=hoy,
-            cantidad=cantidad
+    # 🔥 Actualiza resumen mensual + anual
+    sumar_salida(db, cliente.id, data.tipo_documento, hoy)
+    sumar_salidas_diarias(db, hoy, {cliente.id: {data.tipo_documento.value: cantidad}})
+    registrar_movimiento(db, cliente.id, -cantidad, "salida", nueva_salida.id)
+
+    resultado = resultado_debito(bloqueado, saldo_despues, cliente.minimo_alerta)
+
+    # Las alertas solo aplican a clientes no bloqueados
+    if not bloqueado:
+        verificar_y_encolar_alerta(
+            db,
+            cliente,
+            saldo_antes,
+            saldo_despues,
+            resultado["mensaje"]
         )
 
-        db.add(nueva_salida)
-        cliente.saldo_actual = saldo_despues
-        # 🔥 Actualiza resumen mensual + anual
-        sumar_salida(db, cliente.id, data.tipo_documento, hoy)
-        db.commit()
-        db.refresh(nueva_salida) 
-        db.refresh(cliente)
-        return {"estado": "APROBADO", "mensaje": mensaje}
-    
-    # ====================================
-    # 5. CLIENTE NO BLOQUEADO
-    # ====================================
+    db.commit()
+
+    return resultado
 
-    # Caso → saldo suficiente y sobra
-    if cliente.saldo_actual > cantidad:
 
-        saldo_despues = cliente.saldo_actual - cantidad
+def resultado_debito(bloqueado: bool, saldo_despues: int, minimo_alerta: int) -> dict:
+    """Estado y mensaje de una salida aprobada según el saldo resultante."""
 
-        # Caso queda en 0 EXACTO
-        if saldo_despues == 0:
-            mensaje = "Ya no te quedan folios disponibles. Contacte a su proveedor."
+    # ====================================
+    # CLIENTE BLOQUEADO (con saldo)
+    # ====================================
+    if bloqueado:
 
-        # Caso dentro de mínimo de alerta
-        elif saldo_despues <= cliente.minimo_alerta:
+        # Bloqueado pero queda en mínimo de alerta
+        if saldo_despues <= minimo_alerta:
             mensaje = f"Folios restantes: {saldo_despues}. Se recomienda adquirir más folios."
 
+        # Bloqueado y operación normal
         else:
             mensaje = "Operación aprobada."
 
-    # Caso → saldo exacto al consumo (1 → queda en 0)
-    elif cliente.saldo_actual == cantidad:
-        saldo_despues = 0
+        return {"estado": "APROBADO", "mensaje": mensaje}
+
+    # ====================================
+    # CLIENTE NO BLOQUEADO
+    # ====================================
+
+    # Caso queda en 0 EXACTO
+    if saldo_despues == 0:
         mensaje = "Ya no te quedan folios disponibles. Contacte a su proveedor."
 
     # Caso → saldo insuficiente → saldo negativo permitido
-    else:
-        saldo_despues = cliente.saldo_actual - cantidad
+    elif saldo_despues < 0:
         mensaje = f"Saldo insuficiente. Su saldo es negativo ({saldo_despues}). Contacte a su proveedor."
 
-    # Registrar salida
+    # Caso dentro de mínimo de alerta
+    elif saldo_despues <= minimo_alerta:
+        mensaje = f"Folios restantes: {saldo_despues}. Se recomienda adquirir más folios."
+
+    else:
+        mensaje = "Operación aprobada."
+
+    # Cambio principal: decidir estado final según si está en o por debajo del mínimo
+    estado_final = "APROBADO"
+    if saldo_despues <= minimo_alerta:
+        estado_final = "APROBADO/FINALIZANDO"
+
+    return {"estado": estado_final, "mensaje": mensaje}
+
+
+# ======================================================
+# 📦 SALIDAS POR LOTE (UNA TRANSACCIÓN)
+# ======================================================
+def crear_salidas_lote(db: Session, items: list[SalidaCreate]) -> list[dict]:
+    """
+    Registra un lote de salidas en una sola transacción:
+    - una consulta de clientes y una de duplicados para todo el lote
+    - inserción masiva de las salidas nuevas
+    - un UPDATE de saldo por cliente y uno por resumen mensual / anual
+
+    Devuelve un resultado por ítem, en el mismo orden recibido.
+    """
+    hoy = obtener_fecha_actual()
+    asegurar_periodo(hoy)
+
+    resultados: list[dict | None] = [None] * len(items)
+
+    # -------------------------------
+    # Clientes del lote
+    # -------------------------------
+    nits = {item.nit for item in items}
+    activos = [
+        cliente_id for cliente_id, inactivo in db.query(Cliente.id, Cliente.inactivo)
+        .filter(Cliente.nit.in_(nits))
+        .all()
+        if not inactivo
+    ]
+
+    for cliente_id in activos:
+        if not cliente_sincronizado(cliente_id, hoy):
+            cierre_mensual_automatico(db, cliente_id, hoy)
+            marcar_cliente_sincronizado(db, cliente_id, hoy)
+
+    # 🔒 Bloquear las filas de los clientes hasta el commit
+    clientes = {
+        c.nit: c for c in db.query(Cliente)
+        .filter(Cliente.nit.in_(nits))
+        .populate_existing()
+        .with_for_update()
+        .all()
+    }
+
+    periodos = periodos_con_resumen(db, [c.id for c in clientes.values()], hoy)
+
+    # -------------------------------
+    # Duplicados (una sola consulta sobre uq_salida_documento)
+    # -------------------------------
+    vistos = set(
+        db.query(Salida.cliente_id, Salida.tipo_documento, Salida.numero_documento)
+        .filter(
+            Salida.cliente_id.in_([c.id for c in clientes.values()]),
+            Salida.numero_documento.in_({item.numero_documento for item in items})
+        )
+        .all()
+    )
+
+    # -------------------------------
+    # Evaluar ítems en orden
+    # -------------------------------
+    saldos = {c.id: c.saldo_actual for c in clientes.values()}
+    saldos_iniciales = dict(saldos)
+    # Folios en reservas activas: cuentan para mensajes y alertas
+    reservados = folios_reservados(db, [c.id for c in clientes.values()])
+    conteos: dict[int, dict[str, int]] = {}
+    ultimo_mensaje: dict[int, str] = {}
+    nuevas = []
+    cantidad = 1
+
+    for indice, item in enumerate(items):
+        cliente = clientes.get(item.nit)
+
+        if not cliente:
+            resultados[indice] = {"estado": "RECHAZADO", "mensaje": "El cliente no existe."}
+            continue
+
+        if cliente.inactivo:
+            resultados[indice] = {
+                "estado": "RECHAZADO",
+                "mensaje": "El cliente está inactivo y no puede emitir documentos."
+            }
+            continue
+
+        clave = (cliente.id, item.tipo_documento, item.numero_documento)
+        if clave in vistos:
+            resultados[indice] = {
+                "estado": "APROBADO",
+                "mensaje": "Documento duplicado. No se descontó folio."
+            }
+            continue
+
+        if cliente.id not in periodos:
+            resultados[indice] = {"estado": "RECHAZADO", "mensaje": "No existe resumen del período"}
+            continue
+
+        if periodos[cliente.id] == "cerrado":
+            resultados[indice] = {"estado": "RECHAZADO", "mensaje": "El mes está cerrado"}
+            continue
+
+        if cliente.bloqueado and saldos[cliente.id] <= 0:
+            resultados[indice] = {
+                "estado": "RECHAZADO",
+                "mensaje": "Cliente sin folios disponibles, Porfavor contactese con DREAMSOFT para adquirir más folios."
+            }
+            continue
+
+        vistos.add(clave)
+        saldos[cliente.id] -= cantidad
+
+        por_tipo = conteos.setdefault(cliente.id, {})
+        por_tipo[item.tipo_documento.value] = por_tipo.get(item.tipo_documento.value, 0) + cantidad
+
+        nuevas.append({
+            "cliente_id": cliente.id,
+            "tipo_documento": item.tipo_documento,
+            "numero_documento": item.numero_documento,
+            "fecha_documento": hoy,
+            "cantidad": cantidad,
+        })
+
+        resultados[indice] = resultado_debito(
+            bool(cliente.bloqueado),
+            saldos[cliente.id] + reservados[cliente.id],
+            cliente.minimo_alerta
+        )
+        ultimo_mensaje[cliente.id] = resultados[indice]["mensaje"]
+
+    # -------------------------------
+    # Escrituras agregadas
+    # -------------------------------
+    if nuevas:
+        try:
+            db.execute(insert(Salida), nuevas)
+        except IntegrityError as e:
+            db.rollback()
+            if not es_documento_duplicado(e):
+                raise
+            # Otro proceso registró alguno de estos documentos al mismo tiempo
+            raise HTTPException(
+                status_code=409,
+                detail="Documentos registrados en paralelo. Reintente el lote."
+            )
+
+    for cliente_id, por_tipo in conteos.items():
+        consumidos = sum(por_tipo.values())
+
+        db.execute(
+            update(Cliente)
+            .where(Cliente.id == cliente_id)
+            .values(saldo_actual=Cliente.saldo_actual - consumidos)
+            .execution_options(synchronize_session=False)
+        )
+
+        sumar_salidas_lote(db, cliente_id, por_tipo, hoy)
+
+    # Acumulado diario: una fila por (cliente, tipo) del lote
+    sumar_salidas_diarias(db, hoy, conteos)
+
+    # Libro de saldos: un movimiento por cliente del lote
+    registrar_movimientos(
+        db,
+        {cliente_id: -sum(por_tipo.values()) for cliente_id, por_tipo in conteos.items()},
+        "salida"
+    )
+
+    # 🔔 Una alerta por cliente con el saldo antes / después del lote
+    for cliente in clientes.values():
+        if cliente.id in conteos and not cliente.bloqueado:
+            verificar_y_encolar_alerta(
+                db,
+                cliente,
+                saldos_iniciales[cliente.id] + reservados[cliente.id],
+                saldos[cliente.id] + reservados[cliente.id],
+                ultimo_mensaje[cliente.id]
+            )
+
+    db.commit()
+
+    return resultados
+
+# ======================================================
+# ⚡ VERSIONES ASYNC (AsyncSession)
+# ======================================================
+async def crear_salida_async(db: AsyncSession, data: SalidaCreate, agrupar: bool = True):
+    """
+    crear_salida con await nativo sobre la AsyncSession: mismas reglas
+    y mismas sentencias (los constructores _sentencia_* / _consulta_*
+    son compartidos), sin ocupar un hilo mientras espera a la BD.
+    """
+    # GROUP_COMMIT=1 → la salida viaja en la transacción compartida del committer
+    # (agrupar=False: debe quedar en la transacción de db, p. ej. idempotencia)
+    if agrupar and group_commit.activo():
+        return await asyncio.wrap_future(group_commit.encolar(data))
+
+    hoy = obtener_fecha_actual()
+    asegurar_periodo(hoy)
+
+    cliente = await cliente_cache.obtener_por_nit_async(db, data.nit)
+
+    if not cliente:
+        return {"estado": "RECHAZADO", "mensaje": "El cliente no existe."}
+
+    if cliente.inactivo:
+        return {
+            "estado": "RECHAZADO",
+            "mensaje": "El cliente está inactivo y no puede emitir documentos."
+        }
+
+    # Una vez por cliente y período: el cierre sigue en el ORM síncrono
+    if not cliente_sincronizado(cliente.id, hoy):
+        await db.run_sync(cierre_mensual_automatico, cliente.id, hoy)
+        marcar_cliente_sincronizado(db.sync_session, cliente.id, hoy)
+    cantidad = 1
+
     nueva_salida = Salida(
         cliente_id=cliente.id,
         tipo_documento=data.tipo_documento,
@@ -161,33 +533,111 @@ def crear_salida(db: Session, data: SalidaCreate):
         cantidad=cantidad
     )
 
-    db.add(nueva_salida)
-    cliente.saldo_actual = saldo_despues
-    # 🔥 Actualizar resumen mensual + anual
-    sumar_salida(db, cliente.id, data.tipo_documento, hoy)
-    
-    db.commit()
-    db.refresh(nueva_salida)
-    db.refresh(cliente)
-
-    verificar_y_enviar_alerta(
-        cliente,
-        saldo_antes,
-        saldo_despues,
-        mensaje
-    )
-# Cambio principal: decidir estado final según si está en o por debajo del mínimo
-    estado_final = "APROBADO"
-    if saldo_despues <= cliente.minimo_alerta:
-        estado_final = "APROBADO/FINALIZANDO"
+    try:
+        async with db.begin_nested():
+            db.add(nueva_salida)
+            await db.flush()
+    except IntegrityError as e:
+        if not es_documento_duplicado(e):
+            raise
+        return {
+            "estado": "APROBADO",
+            "mensaje": "Documento duplicado. No se descontó folio."
+        }
 
-    return {"estado": estado_final, "mensaje": mensaje}
+    debito = await descontar_folios_async(db, cliente.id, cantidad)
+
+    if debito is None:
+        await db.rollback()
+        return await motivo_rechazo_async(db, cliente.id)
 
-def obtener_salidas_por_nit(db: Session, nit: str):
-    cliente = db.query(Cliente).filter(Cliente.nit == nit).first()
+    saldo_antes, saldo_despues, bloqueado = debito
+
+    reservados = await folios_reservados_async(db, cliente.id)
+    saldo_antes += reservados
+    saldo_despues += reservados
+
+    await sumar_salida_async(db, cliente.id, data.tipo_documento, hoy)
+    await sumar_salidas_diarias_async(db, hoy, {cliente.id: {data.tipo_documento.value: cantidad}})
+    await registrar_movimiento_async(db, cliente.id, -cantidad, "salida", nueva_salida.id)
+
+    resultado = resultado_debito(bloqueado, saldo_despues, cliente.minimo_alerta)
+
+    if not bloqueado:
+        verificar_y_encolar_alerta(
+            db,
+            cliente,
+            saldo_antes,
+            saldo_despues,
+            resultado["mensaje"]
+        )
+
+    await db.commit()
+
+    return resultado
+
+
+# El lote sigue en run_sync: una transacción larga por petición, no es
+# el camino de muchas peticiones cortas en vuelo
+async def crear_salidas_lote_async(db: AsyncSession, items: list[SalidaCreate]) -> list[dict]:
+    return await db.run_sync(crear_salidas_lote, items)
+
+
+def obtener_salidas_por_nit(
+    db: Session,
+    nit: str,
+    limit: int,
+    cursor: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    tipo_documento: TipoDocumentoEnum | None = None
+):
+    """
+    Página de salidas del cliente, de la más reciente a la más antigua.
+    Devuelve (filas, siguiente_cursor) o None si el cliente no existe;
+    las filas son tuplas de columnas de SalidaResponse.
+    Los filtros usan ix_salidas_cliente_fecha (cliente_id, fecha_documento, id).
+    """
+    cliente = db.query(Cliente.id).filter(Cliente.nit == nit).first()
 
     if not cliente:
         return None
 
-    salidas = db.query(Salida).filter(Salida.cliente_id == cliente.id).all()
-    return salidas
\ No newline at end of file
+    query = db.query(*columnas(SalidaResponse, Salida)).filter(Salida.cliente_id == cliente.id)
+
+    if desde:
+        query = query.filter(Salida.fecha_documento >= desde)
+    if hasta:
+        query = query.filter(Salida.fecha_documento <= hasta)
+    if tipo_documento:
+        query = query.filter(Salida.tipo_documento == tipo_documento)
+
+    return paginar(query, Salida.id, limit, cursor, descendente=True)
+
+def consulta_exportacion_salidas(
+    cliente_id: int,
+    desde: date | None = None,
+    hasta: date | None = None,
+    tipo_documento: TipoDocumentoEnum | None = None
+):
+    """select() de columnas para services/exportacion (sin objetos ORM)."""
+    consulta = (
+        select(
+            Salida.id,
+            Salida.fecha_documento,
+            Salida.tipo_documento,
+            Salida.numero_documento,
+            Salida.cantidad
+        )
+        .where(Salida.cliente_id == cliente_id)
+        .order_by(Salida.id)
+    )
+
+    if desde:
+        consulta = consulta.where(Salida.fecha_documento >= desde)
+    if hasta:
+        consulta = consulta.where(Salida.fecha_documento <= hasta)
+    if tipo_documento:
+        consulta = consulta.where(Salida.tipo_documento == tipo_documento)
+
+    return consulta
@@ -0,0 +1,57 @@
+# crud/crud_salidas_diarias.py
+# Acumulado diario de salidas (cliente, día, tipo de documento).
+from datetime import date
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.salida_diaria_model import SalidaDiaria
+
+CLAVE_SALIDA_DIARIA = ["cliente_id", "fecha", "tipo_documento"]
+
+
+def _upsert(db: Session | AsyncSession):
+    """INSERT que, si la fila (cliente, día, tipo) ya existe, suma la cantidad."""
+    dialecto = db.get_bind().dialect.name
+
+    if dialecto in ("mysql", "mariadb"):
+        sentencia = mysql.insert(SalidaDiaria)
+        return sentencia.on_duplicate_key_update(
+            cantidad=SalidaDiaria.cantidad + sentencia.inserted.cantidad
+        )
+
+    # SQLite y PostgreSQL: ON CONFLICT sobre uq_salida_diaria
+    modulo = postgresql if dialecto == "postgresql" else sqlite
+    sentencia = modulo.insert(SalidaDiaria)
+    return sentencia.on_conflict_do_update(
+        index_elements=CLAVE_SALIDA_DIARIA,
+        set_={"cantidad": SalidaDiaria.cantidad + sentencia.excluded.cantidad}
+    )
+
+
+def _filas(fecha: date, conteos: dict[int, dict[str, int]]) -> list[dict]:
+    return [
+        {"cliente_id": cliente_id, "fecha": fecha, "tipo_documento": tipo, "cantidad": cantidad}
+        for cliente_id, por_tipo in conteos.items()
+        for tipo, cantidad in por_tipo.items()
+        if cantidad
+    ]
+
+
+def sumar_salidas_diarias(db: Session, fecha: date, conteos: dict[int, dict[str, int]]):
+    """
+    Suma al acumulado del día {cliente_id: {tipo_documento: cantidad}}
+    en un solo executemany (no hace commit).
+    """
+    filas = _filas(fecha, conteos)
+
+    if filas:
+        db.execute(_upsert(db), filas)
+
+
+async def sumar_salidas_diarias_async(db: AsyncSession, fecha: date, conteos: dict[int, dict[str, int]]):
+    filas = _filas(fecha, conteos)
+
+    if filas:
+        await db.execute(_upsert(db), filas)
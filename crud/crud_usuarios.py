@@ -13,6 +13,8 @@ from schemas.usuario_schema import UsuarioCreate, UsuarioLogin, UsuarioResponse
 from security import hash_password, verify_password, create_access_token
 from datetime import timedelta
 from fastapi import HTTPException, status
+from services.paginacion import paginar
+from services.serializacion import columnas
 
 
 # 🧩 Crear usuario
@@ -40,8 +42,9 @@ def create_usuario(db: Session, usuario: UsuarioCreate):
 
 
 # 🧩 Listar todos los usuarios
-def get_usuarios(db: Session):
-    return db.query(Usuario).all()
+def get_usuarios(db: Session, limit: int, cursor: str | None = None):
+    # Tuplas de columnas (sin contrasena); la ruta las serializa con orjson
+    return paginar(db.query(*columnas(UsuarioResponse, Usuario)), Usuario.id, limit, cursor)
 
 
 # 🧩 Buscar usuario por nombre (para login o validaciones)
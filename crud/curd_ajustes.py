@@ -1,3 +1,4 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session 
 from fastapi import HTTPException
 from datetime import date
@@ -6,13 +7,16 @@ from services.time_service import obtener_fecha_actual
 
 from models.ajuste_model import Ajuste
 from models.cliente_model import Cliente
+from services.paginacion import paginar
+from crud.crud_saldos import registrar_movimiento, sumar_saldo
+from services.serializacion import columnas
+from schemas.ajuste_schema import AjusteResponse
 
 
 from crud.crud_resumen import (
     sumar_ajuste,
     validar_mes_abierto,
-    cierre_mensual_automatico,
-    recalcular_saldo_resumenes
+    cierre_mensual_automatico
 )
 
 def validar_mes_actual(fecha: date):
@@ -42,21 +46,15 @@ def create_ajuste(db: Session, data, usuario_id: int):
     )
 
     try:
-        # 🔥 aplicar ajuste (puede ser + o -)
-        cliente.saldo_actual += data.cantidad
+        # 🔥 aplicar ajuste (puede ser + o -), UPDATE atómico
+        saldo_antes, saldo_despues = sumar_saldo(db, cliente.id, data.cantidad)
 
         db.add(ajuste)
         db.flush()
 
-        # 🔥 impacta resúmenes
+        # 🔥 impacta resúmenes (contadores + saldo_final)
         sumar_ajuste(db, cliente.id, data.cantidad, data.fecha)
-
-        recalcular_saldo_resumenes(
-            db,
-            cliente.id,
-            data.fecha.year,
-            data.fecha.month
-        )
+        registrar_movimiento(db, cliente.id, saldo_despues - saldo_antes, "ajuste", ajuste.id)
 
         db.commit()
         db.refresh(ajuste)
@@ -67,16 +65,44 @@ def create_ajuste(db: Session, data, usuario_id: int):
         raise HTTPException(500, f"Error creando ajuste: {e}")
 
 
-def get_ajustes_by_cliente(db: Session, cliente_id: int) -> List[Ajuste]:
-    cliente = db.query(Cliente).filter_by(id=cliente_id).first()
+def get_ajustes_by_cliente(
+    db: Session,
+    cliente_id: int,
+    limit: int,
+    cursor: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None
+) -> tuple[list, str | None]:
+    cliente = db.query(Cliente.id).filter_by(id=cliente_id).first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    return (
-        db.query(Ajuste)
-        .filter(Ajuste.cliente_id == cliente_id)
-        .order_by(Ajuste.id.desc())
-        .all()
+    query = db.query(*columnas(AjusteResponse, Ajuste)).filter(Ajuste.cliente_id == cliente_id)
+
+    if desde:
+        query = query.filter(Ajuste.fecha >= desde)
+    if hasta:
+        query = query.filter(Ajuste.fecha <= hasta)
+
+    return paginar(query, Ajuste.id, limit, cursor, descendente=True)
+
+
+
+def consulta_exportacion_ajustes(
+    cliente_id: int,
+    desde: date | None = None,
+    hasta: date | None = None
+):
+    """select() de columnas para services/exportacion (sin objetos ORM)."""
+    consulta = (
+        select(Ajuste.id, Ajuste.fecha, Ajuste.cantidad, Ajuste.descripcion)
+        .where(Ajuste.cliente_id == cliente_id)
+        .order_by(Ajuste.id)
     )
 
-    return ajustes
+    if desde:
+        consulta = consulta.where(Ajuste.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(Ajuste.fecha <= hasta)
+
+    return consulta
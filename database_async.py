@@ -0,0 +1,36 @@
+# database_async.py
+# Variante asíncrona de database.py para la API:
+# motor aiomysql + AsyncSession, así el event loop atiende muchas
+# salidas en vuelo por worker sin ocupar hilos mientras espera a MySQL.
+# Los scripts (testdb.py, migraciones) siguen usando database.py.
+import os
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database import DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME, SessionLocal
+
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# crea el motor de conexión asíncrono
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    echo=False
+)
+
+# Misma clase de sesión que SessionLocal → mismos eventos (p. ej. write-behind)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=SessionLocal.class_,
+    autoflush=False
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
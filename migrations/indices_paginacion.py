@@ -0,0 +1,46 @@
+# ============================================
+# migrations/indices_paginacion.py
+# Crea los índices compuestos de los listados paginados:
+#   salidas(cliente_id, fecha_documento, id)
+#   entradas(cliente_id, fecha, id)
+#   ajustes(cliente_id, fecha, id)
+#
+# Uso:
+#   python -m migrations.indices_paginacion
+#
+# Es idempotente: los índices que ya existen se omiten.
+# ============================================
+
+from sqlalchemy import inspect
+
+from database import engine
+from models.salida_model import Salida
+from models.entrada_model import Entrada
+from models.ajuste_model import Ajuste
+
+INDICES = [
+    (Salida, "ix_salidas_cliente_fecha"),
+    (Entrada, "ix_entradas_cliente_fecha"),
+    (Ajuste, "ix_ajustes_cliente_fecha"),
+]
+
+
+def migrar():
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+
+        for modelo, nombre in INDICES:
+            tabla = modelo.__table__
+            existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+
+            if nombre in existentes:
+                print(f"✅ El índice {nombre} ya existe")
+                continue
+
+            indice = next(i for i in tabla.indexes if i.name == nombre)
+            indice.create(conn)
+            print(f"✅ Índice {nombre} creado")
+
+
+if __name__ == "__main__":
+    migrar()
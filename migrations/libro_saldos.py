@@ -0,0 +1,142 @@
+# ============================================
+# migrations/libro_saldos.py
+# Crea movimientos_saldo y saldos_diarios y carga el historial:
+#   1. un movimiento por (cliente, día) de salidas, entradas y ajustes
+#   2. un movimiento de apertura por cliente para que la suma del
+#      libro sea el saldo efectivo actual (saldo + folios reservados)
+#   3. los saldos diarios de los días anteriores a hoy, con una
+#      suma acumulada (window function, MySQL 8 / MariaDB 10.2+)
+#
+# Uso:
+#   python -m migrations.libro_saldos
+#
+# Es idempotente: si el libro ya tiene movimientos no se recarga.
+# ============================================
+
+from datetime import datetime
+
+from sqlalchemy import func, insert, literal, select
+
+from database import engine
+from models.ajuste_model import Ajuste
+from models.cliente_model import Cliente
+from models.entrada_model import Entrada
+from models.movimiento_saldo_model import MovimientoSaldo
+from models.reserva_model import ReservaFolios
+from models.saldo_diario_model import SaldoDiario
+from models.salida_model import Salida
+from services.time_service import obtener_fecha_actual
+
+COLUMNAS_MOVIMIENTO = ["cliente_id", "fecha", "cantidad", "origen", "creado"]
+
+
+def _cargar_movimientos(conn, ahora: datetime):
+    for modelo, columna_fecha, signo, origen in (
+        (Salida, Salida.fecha_documento, -1, "salida"),
+        (Entrada, Entrada.fecha, 1, "entrada"),
+        (Ajuste, Ajuste.fecha, 1, "ajuste"),
+    ):
+        resultado = conn.execute(
+            insert(MovimientoSaldo).from_select(
+                COLUMNAS_MOVIMIENTO,
+                select(
+                    modelo.cliente_id,
+                    columna_fecha,
+                    signo * func.sum(modelo.cantidad),
+                    literal(origen),
+                    literal(ahora)
+                )
+                .where(modelo.cliente_id.is_not(None))
+                .group_by(modelo.cliente_id, columna_fecha)
+            )
+        )
+        print(f"✅ {resultado.rowcount} movimientos de {origen}")
+
+
+def _cargar_aperturas(conn, ahora: datetime):
+    hoy = obtener_fecha_actual()
+
+    reservados = (
+        select(func.coalesce(func.sum(ReservaFolios.cantidad - ReservaFolios.consumidos), 0))
+        .where(ReservaFolios.cliente_id == Cliente.id, ReservaFolios.estado == "activa")
+        .scalar_subquery()
+    )
+    movido = (
+        select(func.coalesce(func.sum(MovimientoSaldo.cantidad), 0))
+        .where(MovimientoSaldo.cliente_id == Cliente.id)
+        .scalar_subquery()
+    )
+    primer_dia = (
+        select(func.min(MovimientoSaldo.fecha))
+        .where(MovimientoSaldo.cliente_id == Cliente.id)
+        .scalar_subquery()
+    )
+
+    aperturas = select(
+        Cliente.id.label("cliente_id"),
+        func.coalesce(primer_dia, hoy).label("fecha"),
+        (Cliente.saldo_actual + reservados - movido).label("cantidad")
+    ).subquery()
+
+    resultado = conn.execute(
+        insert(MovimientoSaldo).from_select(
+            COLUMNAS_MOVIMIENTO,
+            select(
+                aperturas.c.cliente_id,
+                aperturas.c.fecha,
+                aperturas.c.cantidad,
+                literal("apertura"),
+                literal(ahora)
+            ).where(aperturas.c.cantidad != 0)
+        )
+    )
+    print(f"✅ {resultado.rowcount} movimientos de apertura")
+
+
+def _cargar_saldos_diarios(conn):
+    por_dia = (
+        select(
+            MovimientoSaldo.cliente_id,
+            MovimientoSaldo.fecha,
+            func.sum(MovimientoSaldo.cantidad).label("delta")
+        )
+        .where(MovimientoSaldo.fecha < obtener_fecha_actual())
+        .group_by(MovimientoSaldo.cliente_id, MovimientoSaldo.fecha)
+        .subquery()
+    )
+
+    resultado = conn.execute(
+        insert(SaldoDiario).from_select(
+            ["cliente_id", "fecha", "saldo"],
+            select(
+                por_dia.c.cliente_id,
+                por_dia.c.fecha,
+                func.sum(por_dia.c.delta).over(
+                    partition_by=por_dia.c.cliente_id,
+                    order_by=por_dia.c.fecha
+                )
+            )
+        )
+    )
+    print(f"✅ {resultado.rowcount} saldos diarios")
+
+
+def migrar():
+    with engine.begin() as conn:
+        for modelo in (MovimientoSaldo, SaldoDiario):
+            modelo.__table__.create(conn, checkfirst=True)
+        print("✅ Tablas movimientos_saldo y saldos_diarios listas")
+
+    with engine.begin() as conn:
+        if conn.execute(select(MovimientoSaldo.id).limit(1)).first() is not None:
+            print("✅ El libro de saldos ya tiene movimientos")
+            return
+
+        ahora = datetime.utcnow()
+        _cargar_movimientos(conn, ahora)
+        _cargar_aperturas(conn, ahora)
+        _cargar_saldos_diarios(conn)
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,93 @@
+# ============================================
+# migrations/salidas_diarias.py
+# Crea salidas_diarias y la carga desde salidas, un mes por
+# transacción: borra el acumulado del mes y lo rehace con
+#   INSERT ... SELECT ... GROUP BY cliente_id, fecha_documento, tipo_documento
+#
+# Uso:
+#   python -m migrations.salidas_diarias             carga inicial (tabla vacía)
+#   python -m migrations.salidas_diarias --desde 2025-01
+#                                                    rehace desde ese mes
+#
+# Sin --desde es idempotente: si la tabla ya tiene filas no hace nada.
+# ⚠️ La carga inicial debe correr antes de desplegar la versión que
+#    suma en salidas_diarias; --desde sobre el mes en curso, con la
+#    app detenida.
+# ============================================
+
+import argparse
+from datetime import date
+
+from sqlalchemy import delete, func, insert, select
+
+from database import engine
+from models.salida_diaria_model import SalidaDiaria
+from models.salida_model import Salida
+
+
+def _meses(desde: date, hasta: date):
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        yield date(anio, mes, 1), date(anio + mes // 12, mes % 12 + 1, 1)
+        anio, mes = anio + mes // 12, mes % 12 + 1
+
+
+def _rehacer_mes(conn, inicio: date, fin: date) -> int:
+    conn.execute(
+        delete(SalidaDiaria).where(SalidaDiaria.fecha >= inicio, SalidaDiaria.fecha < fin)
+    )
+
+    resultado = conn.execute(
+        insert(SalidaDiaria).from_select(
+            ["cliente_id", "fecha", "tipo_documento", "cantidad"],
+            select(
+                Salida.cliente_id,
+                Salida.fecha_documento,
+                Salida.tipo_documento,
+                func.sum(Salida.cantidad)
+            )
+            .where(Salida.fecha_documento >= inicio, Salida.fecha_documento < fin)
+            .group_by(Salida.cliente_id, Salida.fecha_documento, Salida.tipo_documento)
+        )
+    )
+    return resultado.rowcount
+
+
+def migrar(desde: date | None = None):
+    with engine.begin() as conn:
+        SalidaDiaria.__table__.create(conn, checkfirst=True)
+        print("✅ Tabla salidas_diarias lista")
+
+        if desde is None and conn.execute(select(SalidaDiaria.id).limit(1)).first() is not None:
+            print("✅ salidas_diarias ya tiene datos (use --desde para rehacer)")
+            return
+
+        primera, ultima = conn.execute(
+            select(func.min(Salida.fecha_documento), func.max(Salida.fecha_documento))
+        ).one()
+
+    if primera is None:
+        print("✅ No hay salidas para cargar")
+        return
+
+    total = 0
+    for inicio, fin in _meses(max(primera, desde or primera), ultima):
+        with engine.begin() as conn:
+            filas = _rehacer_mes(conn, inicio, fin)
+        total += filas
+        print(f"  {inicio:%Y-%m}: {filas} filas")
+
+    print(f"✅ {total} filas en salidas_diarias")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cargar salidas_diarias desde salidas")
+    parser.add_argument(
+        "--desde",
+        type=lambda valor: date.fromisoformat(f"{valor}-01"),
+        default=None,
+        help="Rehacer desde este mes (YYYY-MM)"
+    )
+    args = parser.parse_args()
+
+    migrar(args.desde)
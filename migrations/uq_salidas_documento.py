@@ -0,0 +1,80 @@
+# ============================================
+# migrations/uq_salidas_documento.py
+# Crea el índice único uq_salida_documento sobre
+# salidas(cliente_id, tipo_documento, numero_documento).
+#
+# Uso:
+#   python -m migrations.uq_salidas_documento
+#
+# Antes de crear el índice reporta los documentos
+# duplicados que ya existan; si hay alguno, no se
+# crea el índice hasta que se depuren a mano.
+# ============================================
+
+from sqlalchemy import Index, func, inspect, select
+
+from database import engine
+from models.salida_model import Salida
+
+NOMBRE_INDICE = "uq_salida_documento"
+
+
+def buscar_duplicados(conn):
+    return conn.execute(
+        select(
+            Salida.cliente_id,
+            Salida.tipo_documento,
+            Salida.numero_documento,
+            func.count(Salida.id).label("veces"),
+            func.min(Salida.id).label("primer_id")
+        )
+        .group_by(
+            Salida.cliente_id,
+            Salida.tipo_documento,
+            Salida.numero_documento
+        )
+        .having(func.count(Salida.id) > 1)
+        .order_by(Salida.cliente_id)
+    ).all()
+
+
+def indice_existe(conn) -> bool:
+    inspector = inspect(conn)
+    nombres = {i["name"] for i in inspector.get_indexes("salidas")}
+    nombres |= {u["name"] for u in inspector.get_unique_constraints("salidas")}
+    return NOMBRE_INDICE in nombres
+
+
+def migrar():
+    with engine.begin() as conn:
+
+        if indice_existe(conn):
+            print(f"✅ El índice {NOMBRE_INDICE} ya existe")
+            return
+
+        duplicados = buscar_duplicados(conn)
+
+        if duplicados:
+            print(f"❌ Hay {len(duplicados)} documentos duplicados en salidas:")
+            for d in duplicados:
+                print(
+                    f"   cliente_id={d.cliente_id} tipo={d.tipo_documento} "
+                    f"numero={d.numero_documento} veces={d.veces} primer_id={d.primer_id}"
+                )
+            print("Depure los duplicados y vuelva a ejecutar la migración.")
+            return
+
+        # MySQL y SQLite implementan la restricción como índice único
+        Index(
+            NOMBRE_INDICE,
+            Salida.cliente_id,
+            Salida.tipo_documento,
+            Salida.numero_documento,
+            unique=True
+        ).create(conn)
+
+        print(f"✅ Índice {NOMBRE_INDICE} creado")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,35 @@
+# ============================================
+# migrations/version_filas.py
+# Agrega la columna version (contador por fila usado por los
+# ETag) a clientes, resumen_mensual y resumen_anual.
+#
+# Uso:
+#   python -m migrations.version_filas
+#
+# Es idempotente: las tablas que ya la tienen se omiten.
+# ============================================
+
+from sqlalchemy import inspect, text
+
+from database import engine
+
+TABLAS = ["clientes", "resumen_mensual", "resumen_anual"]
+
+
+def migrar():
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+
+        for tabla in TABLAS:
+            columnas = {c["name"] for c in inspector.get_columns(tabla)}
+
+            if "version" in columnas:
+                print(f"✅ {tabla}.version ya existe")
+                continue
+
+            conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            print(f"✅ Columna {tabla}.version creada")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -1,5 +1,5 @@
 #models/ajuste_model.py
-from sqlalchemy import Column, Integer, Date, ForeignKey, String
+from sqlalchemy import Column, Integer, Date, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -14,4 +14,9 @@ class Ajuste(Base):
     descripcion = Column(String(255), nullable=False)
 
 
-    cliente = relationship("Cliente")
\ No newline at end of file
+    cliente = relationship("Cliente")
+
+    # Listados por cliente filtrados por fecha (paginación keyset)
+    __table_args__ = (
+        Index("ix_ajustes_cliente_fecha", "cliente_id", "fecha", "id"),
+    )
\ No newline at end of file
@@ -0,0 +1,34 @@
+# models/alerta_model.py
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from database import Base
+
+
+class AlertaOutbox(Base):
+    """
+    Alertas de folios pendientes de envío por correo.
+    Se escriben en la misma transacción que el débito y un
+    worker en segundo plano las despacha (services/alerta_worker.py).
+    """
+    __tablename__ = "alertas_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=True)
+
+    cliente_nombre = Column(String(255), nullable=False)
+    nit = Column(String(50), nullable=False)
+    mensaje = Column(String(500), nullable=False)
+    saldo = Column(Integer, nullable=False)
+
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente | enviando | enviado | fallido
+    intentos = Column(Integer, nullable=False, default=0)
+    proximo_intento = Column(DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_error = Column(String(500), nullable=True)
+
+    creado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    enviado = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_alertas_outbox_estado", "estado", "proximo_intento"),
+    )
@@ -2,7 +2,7 @@
 from typing import Optional
 
 from pydantic import EmailStr
-from sqlalchemy import Column, Float, Integer, String, Boolean
+from sqlalchemy import Column, Float, Integer, String, Boolean, literal_column
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -20,6 +20,10 @@ class Cliente(Base):
     valor_folio = Column(Float, nullable=False, default=150)
     correo_electronico = Column(String(120), nullable=True, index=True)
 
+    # Sube en cada UPDATE (ORM o Core): base de los ETag de lectura
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+
 
  # Relación con Entradas
     entradas = relationship(
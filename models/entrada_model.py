@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -31,3 +31,8 @@ class Entrada(Base):
     )
 
     usuario = relationship("Usuario", back_populates="entradas_realizadas")
+
+    # Listados por cliente filtrados por fecha (paginación keyset)
+    __table_args__ = (
+        Index("ix_entradas_cliente_fecha", "cliente_id", "fecha", "id"),
+    )
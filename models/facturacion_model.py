@@ -0,0 +1,35 @@
+# models/facturacion_model.py
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, UniqueConstraint, Index
+from database import Base
+
+
+class Facturacion(Base):
+    """
+    Cobro de un cliente por los folios consumidos en un mes cerrado.
+    Una fila por (cliente, período): volver a correr la facturación
+    del mismo mes no duplica cobros, solo termina los pendientes.
+    """
+    __tablename__ = "facturacion"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+
+    folios = Column(Integer, nullable=False, default=0)
+    valor_folio = Column(Float, nullable=False)
+    total = Column(Float, nullable=False, default=0)
+
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente | generada
+    archivo = Column(String(500), nullable=True)
+    ultimo_error = Column(String(500), nullable=True)
+
+    creado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    generado = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("cliente_id", "anio", "mes", name="uq_facturacion_periodo"),
+        Index("ix_facturacion_periodo_estado", "anio", "mes", "estado"),
+    )
@@ -0,0 +1,35 @@
+# models/idempotencia_model.py
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from database import Base
+
+
+class RespuestaIdempotente(Base):
+    """
+    Clave Idempotency-Key de un POST, por usuario.
+    - en_vuelo: una petición la reclamó y está ejecutando la operación
+      (token identifica a quien la reclamó)
+    - completa: la respuesta se guardó en la misma transacción que la
+      operación; un reintento se contesta desde aquí
+    """
+    __tablename__ = "idempotencia"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, nullable=False)
+    clave = Column(String(255), nullable=False)
+    ruta = Column(String(100), nullable=False)
+
+    estado = Column(String(20), nullable=False, default="en_vuelo")  # en_vuelo | completa
+    token = Column(String(32), nullable=False)
+    reclamado = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    status_code = Column(Integer, nullable=True)
+    cuerpo = Column(Text, nullable=True)
+
+    creado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expira = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "clave", name="uq_idempotencia"),
+    )
@@ -0,0 +1,32 @@
+# models/movimiento_saldo_model.py
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+from database import Base
+
+
+class MovimientoSaldo(Base):
+    """
+    Libro de movimientos del saldo (solo inserciones).
+    Cada operación que cambia el saldo efectivo del cliente
+    (saldo_actual + folios reservados sin usar) escribe aquí su delta
+    en la misma transacción. fecha = día en que cambió el saldo.
+    """
+    __tablename__ = "movimientos_saldo"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    cantidad = Column(Integer, nullable=False)  # + suma al saldo, - resta
+
+    # apertura | salida | entrada | ajuste | edicion
+    origen = Column(String(20), nullable=False)
+    referencia_id = Column(Integer, nullable=True)  # id de la entrada / salida / ajuste
+    creado = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Suma de deltas de un cliente entre dos fechas
+        Index("ix_movimientos_saldo_cliente_fecha", "cliente_id", "fecha"),
+        # Consolidación diaria (todos los clientes de un día)
+        Index("ix_movimientos_saldo_fecha", "fecha"),
+    )
@@ -0,0 +1,28 @@
+# models/proceso_cierre_model.py
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime
+from database import Base
+
+
+class ProcesoCierre(Base):
+    """
+    Avance del cierre anual de un año.
+    Se procesa por bloques de clientes (por id); cada bloque se
+    confirma junto con ultimo_cliente_id, así que un cierre cortado
+    sigue desde el último bloque confirmado.
+    """
+    __tablename__ = "procesos_cierre"
+
+    id = Column(Integer, primary_key=True, index=True)
+    anio = Column(Integer, nullable=False, unique=True)
+
+    estado = Column(String(20), nullable=False, default="en_curso")  # en_curso | terminado | error
+    ultimo_cliente_id = Column(Integer, nullable=False, default=0)
+    clientes_total = Column(Integer, nullable=False, default=0)
+    clientes_procesados = Column(Integer, nullable=False, default=0)
+    error = Column(String(500), nullable=True)
+
+    iniciado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    actualizado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    terminado = Column(DateTime, nullable=True)
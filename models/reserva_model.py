@@ -0,0 +1,35 @@
+# models/reserva_model.py
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from database import Base
+
+
+class ReservaFolios(Base):
+    """
+    Bloque de folios apartado del saldo del cliente para un emisor.
+    Las salidas lo consumen sin tocar clientes.saldo_actual; lo no
+    usado vuelve al saldo al liberar o vencer la reserva.
+    """
+    __tablename__ = "reservas_folios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
+    usuario_id = Column(Integer, nullable=True)
+
+    cantidad = Column(Integer, nullable=False)
+    consumidos = Column(Integer, nullable=False, default=0)
+
+    estado = Column(String(20), nullable=False, default="activa")  # activa | liberada | vencida
+    creada = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expira = Column(DateTime, nullable=False)
+    cerrada = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reservas_folios_cliente", "cliente_id", "estado"),
+        Index("ix_reservas_folios_expira", "estado", "expira"),
+    )
+
+    @property
+    def disponibles(self) -> int:
+        return self.cantidad - self.consumidos
@@ -1,5 +1,5 @@
 # models/resumen_anual_model.py
-from sqlalchemy import Column, Integer, ForeignKey, String, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, String, UniqueConstraint, literal_column
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -25,6 +25,10 @@ class ResumenAnual(Base):
     saldo_inicial = Column(Integer, default=0)
     saldo_final = Column(Integer, default=0)
     estado = Column(String(20), default="abierto") # abierto | cerrado
+
+    # Sube en cada UPDATE (ORM o Core): base de los ETag de lectura
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
     cliente = relationship("Cliente")
 
     __table_args__ = (
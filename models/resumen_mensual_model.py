@@ -1,5 +1,5 @@
 # models/resumen_mensual_model.py
-from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint, String
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint, String, literal_column
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -27,6 +27,10 @@ class ResumenMensual(Base):
     saldo_final = Column(Integer, default=0)
     estado = Column(String(20), default="abierto")  # abierto | cerrado
 
+    # Sube en cada UPDATE (ORM o Core): base de los ETag de lectura
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+
     cliente = relationship("Cliente")
 
     __table_args__ = (
@@ -0,0 +1,22 @@
+# models/saldo_diario_model.py
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint
+from database import Base
+
+
+class SaldoDiario(Base):
+    """
+    Saldo efectivo del cliente al cierre de un día.
+    Solo se guarda para los días con movimientos: el último registro
+    con fecha <= F es el saldo al cierre de F (más los movimientos
+    aún no consolidados).
+    """
+    __tablename__ = "saldos_diarios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    saldo = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("cliente_id", "fecha", name="uq_saldo_diario"),
+    )
@@ -0,0 +1,26 @@
+# models/salida_diaria_model.py
+from sqlalchemy import Column, Integer, Date, Enum, ForeignKey, UniqueConstraint, Index
+from database import Base
+from models.salida_model import TipoDocumentoEnum
+
+
+class SalidaDiaria(Base):
+    """
+    Folios consumidos por cliente, día y tipo de documento.
+    Se suma en la misma transacción que cada salida; los reportes
+    por día leen esta tabla en lugar de salidas.
+    """
+    __tablename__ = "salidas_diarias"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    tipo_documento = Column(Enum(TipoDocumentoEnum), nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Clave del upsert y consultas de un cliente por rango de fechas
+        UniqueConstraint("cliente_id", "fecha", "tipo_documento", name="uq_salida_diaria"),
+        # Reportes de todos los clientes por rango de fechas
+        Index("ix_salidas_diarias_fecha", "fecha", "cliente_id"),
+    )
@@ -1,5 +1,5 @@
 # models/salida_model.py
-from sqlalchemy import Column, Integer, String, Enum, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, Date, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -33,4 +33,14 @@ class Salida(Base):
     cantidad = Column(Integer, nullable=False, default=1)
 
     # Relación con Cliente
-    cliente = relationship("Cliente", back_populates="salidas")
\ No newline at end of file
+    cliente = relationship("Cliente", back_populates="salidas")
+
+    # 🔒 Idempotencia: un documento solo se registra una vez por cliente
+    __table_args__ = (
+        UniqueConstraint(
+            "cliente_id", "tipo_documento", "numero_documento",
+            name="uq_salida_documento"
+        ),
+        # Listados por cliente filtrados por fecha (paginación keyset)
+        Index("ix_salidas_cliente_fecha", "cliente_id", "fecha_documento", "id"),
+    )
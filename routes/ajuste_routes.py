@@ -1,11 +1,17 @@
 #
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import date
 
 from database import get_db
 from security import get_current_user
 from models.usuario_model import RolEnum, Usuario
+from services import idempotencia
+from services.paginacion import LIMITE_DEFECTO, LIMITE_MAXIMO
+from services.serializacion import respuesta_filas
+from services.exportacion import respuesta_exportacion
+from services import cliente_cache
 
 from schemas.ajuste_schema import (
     AjusteCreate,
@@ -14,7 +20,8 @@ from schemas.ajuste_schema import (
 
 from crud.curd_ajustes import (
     create_ajuste,
-    get_ajustes_by_cliente
+    get_ajustes_by_cliente,
+    consulta_exportacion_ajustes
 )
 
 router = APIRouter(
@@ -44,9 +51,20 @@ def require_admin(usuario: Usuario = Depends(get_current_user)):
 )
 def crear_ajuste(
     data: AjusteCreate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(require_admin)
 ):
+    if idempotency_key:
+        return idempotencia.ejecutar(
+            usuario.id,
+            idempotency_key,
+            "POST /ajustes/",
+            AjusteResponse,
+            status.HTTP_201_CREATED,
+            lambda sesion: create_ajuste(sesion, data, usuario.id)
+        )
+
     return create_ajuste(db, data, usuario.id)
 
 
@@ -59,6 +77,36 @@ def crear_ajuste(
 )
 def listar_ajustes_por_cliente(
     cliente_id: int,
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    desde: date | None = None,
+    hasta: date | None = None,
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(
+            status_code=403,
+            detail="No autorizado para ver ajustes de este cliente"
+        )
+
+    ajustes, siguiente = get_ajustes_by_cliente(db, cliente_id, limit, cursor, desde, hasta)
+
+    return respuesta_filas(ajustes, AjusteResponse, siguiente)
+
+
+
+# ======================================================
+# ⬇️ EXPORTAR AJUSTES (CSV / NDJSON en streaming)
+# ======================================================
+@router.get("/cliente/{cliente_id}/export")
+def exportar_ajustes(
+    cliente_id: int,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    desde: date | None = None,
+    hasta: date | None = None,
+    gzip: bool = Query(False, description="Comprimir la descarga"),
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(get_current_user)
 ):
@@ -69,4 +117,12 @@ def listar_ajustes_por_cliente(
             detail="No autorizado para ver ajustes de este cliente"
         )
 
-    return get_ajustes_by_cliente(db, cliente_id)
+    if not cliente_cache.obtener_por_id(db, cliente_id):
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+    return respuesta_exportacion(
+        consulta_exportacion_ajustes(cliente_id, desde, hasta),
+        f"ajustes_{cliente_id}",
+        formato,
+        gzip
+    )
@@ -1,16 +1,35 @@
 # routes/clientes_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Union
 
 from database import get_db
-from schemas.cliente_schema import ClienteCreate, ClienteUpdate, ClienteResponse, ClienteUsuarioResponse
-from crud import crud_clientes
+from schemas.cliente_schema import (
+    ClienteCreate,
+    ClienteImportacionResultado,
+    ClienteUpdate,
+    ClienteResponse,
+    ClienteUsuarioResponse,
+    ClienteOverviewResponse,
+    SaldoFechaResponse,
+    SaldoSerieResponse,
+    PronosticoResponse
+)
+from crud import crud_clientes, crud_pronostico, crud_saldos
 from security import get_current_user  # tu función que devuelve Usuario ORM
 from models.usuario_model import RolEnum, Usuario
+from services.paginacion import LIMITE_DEFECTO, LIMITE_MAXIMO
+from services.serializacion import respuesta_filas
+from services import etag, importacion
 
 router = APIRouter(prefix="/clientes", tags=["Clientes"])
 
+# Máximo de clientes aceptados por importación
+MAX_CLIENTES_IMPORTACION = 10000
+
 #============================
 # Función de dependencia para verificar rol admin
 #============================
@@ -33,36 +52,191 @@ def crear_cliente(cliente: ClienteCreate, db: Session = Depends(get_db), _ = Dep
     """Crear cliente - solo admin"""
     return crud_clientes.create_cliente(db, cliente)
 
+#============================
+# Importar clientes (CSV o JSON) - solo admin
+#============================
+
+@router.post("/importar", response_model=List[ClienteImportacionResultado])
+async def importar_clientes(
+    request: Request,
+    db: Session = Depends(get_db),
+    _ = Depends(require_admin)
+):
+    """
+    Carga masiva de clientes con los campos de ClienteCreate.
+    - Content-Type: text/csv → CSV con encabezado (separador "," o ";")
+    - Content-Type: application/json → arreglo de objetos
+    Se crean los registros válidos en una sola transacción; el resultado
+    indica, por registro, si se creó o por qué no.
+    """
+    registros = importacion.leer_registros(await request.body(), request.headers.get("content-type"))
+
+    if len(registros) > MAX_CLIENTES_IMPORTACION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La importación supera el máximo de {MAX_CLIENTES_IMPORTACION} clientes."
+        )
+
+    validos, errores = importacion.validar_registros(registros, ClienteCreate)
+    resultados = await run_in_threadpool(crud_clientes.importar_clientes, db, validos)
+
+    def nit(indice):
+        registro = registros[indice]
+        return str(registro["nit"]) if isinstance(registro, dict) and registro.get("nit") is not None else None
+
+    return [
+        {"indice": indice, "nit": nit(indice), "estado": "error", "mensaje": errores[indice], "cliente_id": None}
+        if indice in errores else
+        {"indice": indice, "nit": nit(indice), **resultados[indice]}
+        for indice in range(len(registros))
+    ]
+
 #============================
 # Listar clientes
 #============================
 
 @router.get("/", response_model=List[Union[ClienteResponse, ClienteUsuarioResponse]])
-def listar_clientes(db: Session = Depends(get_db), usuario: Usuario = Depends(get_current_user)):
-    """Listar clientes - admin ve todo, usuario normal solo su cliente"""
+def listar_clientes(
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    """Listar clientes - admin ve todo (paginado), usuario normal solo su cliente"""
     if usuario.rol == RolEnum.admin:
-        return crud_clientes.get_clientes(db)
+        clientes, siguiente = crud_clientes.get_clientes(db, limit, cursor)
+        return respuesta_filas(clientes, ClienteResponse, siguiente)
     cliente = crud_clientes.get_cliente_by_id(db, usuario.cliente_id)
     return [cliente]
 
+#============================
+# Panel admin: saldo + consumo del mes de todos los clientes
+# (declarada antes de /{cliente_id})
+#============================
+
+@router.get("/overview", response_model=List[ClienteOverviewResponse])
+def overview_clientes(
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    orden: str = Query(
+        "id",
+        pattern="^-?(id|saldo|consumo)$",
+        description="id | saldo | consumo; con '-' delante es descendente"
+    ),
+    bajo_alerta: bool = Query(False, description="Solo clientes con saldo <= mínimo de alerta"),
+    saldo_negativo: bool = Query(False, description="Solo clientes con saldo negativo"),
+    db: Session = Depends(get_db),
+    _ = Depends(require_admin)
+):
+    """
+    Saldo, estado y contadores del mes en curso de cada cliente,
+    en una sola consulta. El cursor depende del orden: al cambiar
+    orden o filtros se empieza sin cursor.
+    """
+    filas, siguiente = crud_clientes.get_clientes_overview(
+        db, limit, cursor, orden, bajo_alerta, saldo_negativo
+    )
+    return respuesta_filas(filas, ClienteOverviewResponse, siguiente)
+
+#============================
+# Pronóstico de consumo de todos los clientes
+# (declarada antes de /{cliente_id})
+#============================
+
+@router.get("/pronostico", response_model=List[PronosticoResponse])
+def pronostico_clientes(
+    dias: int = Query(crud_pronostico.PRONOSTICO_DIAS, ge=7, le=365, description="Ventana de consumo en días"),
+    dias_max: int | None = Query(None, ge=0, description="Solo clientes que se agotan en estos días o menos"),
+    incluir_inactivos: bool = Query(False),
+    db: Session = Depends(get_db),
+    _ = Depends(require_admin)
+):
+    """
+    Ritmo diario de consumo y fecha estimada de agotamiento de cada
+    cliente, los más urgentes primero. Los que no consumen van al final.
+    """
+    filas = crud_pronostico.pronostico_clientes(db, dias, dias_max, incluir_inactivos)
+    return respuesta_filas(filas, PronosticoResponse)
+
 #============================
 # obtener cliente por id
 #============================
 
 @router.get("/{cliente_id}", response_model=Union[ClienteResponse, ClienteUsuarioResponse])
-def obtener_cliente(cliente_id: int, db: Session = Depends(get_db), usuario: Usuario = Depends(get_current_user)):
+def obtener_cliente(
+    cliente_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
     """Obtener cliente por ID - admin ve todo, usuario normal solo su cliente"""
-    cliente = crud_clientes.get_cliente_by_id(db, cliente_id)
-    if not cliente:
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+
+    # 🏷️ ETag por versión de la fila: 304 sin cargar el cliente
+    version = crud_clientes.version_cliente(db, cliente_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    if usuario.rol == RolEnum.admin:
-        return cliente
-    elif usuario.cliente_id == cliente_id:
-        return cliente
-    else:
-        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+    etiqueta = etag.construir("c", cliente_id, version)
+    if etag.coincide(if_none_match, etiqueta):
+        return etag.no_modificado(etiqueta, etag.CACHE_ABIERTO)
+
+    cliente = crud_clientes.get_cliente_by_id(db, cliente_id)
+    etag.publicar(response, etiqueta, etag.CACHE_ABIERTO)
+
+    return cliente
     
+#============================
+# Saldo a una fecha / serie diaria (libro de saldos)
+#============================
+
+@router.get("/{cliente_id}/saldo", response_model=SaldoFechaResponse)
+def obtener_saldo_en_fecha(
+    cliente_id: int,
+    fecha: date | None = Query(None, description="Saldo al cierre de este día (por defecto hoy)"),
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    """Saldo efectivo del cliente a una fecha - admin o usuario del cliente"""
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+
+    return crud_saldos.saldo_en_fecha(db, cliente_id, fecha)
+
+
+@router.get("/{cliente_id}/saldo/serie", response_model=SaldoSerieResponse)
+def obtener_serie_saldo(
+    cliente_id: int,
+    desde: date,
+    hasta: date | None = Query(None, description="Por defecto hoy"),
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    """Saldo al cierre de cada día del rango - admin o usuario del cliente"""
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+
+    return crud_saldos.serie_saldo(db, cliente_id, desde, hasta)
+
+#============================
+# Pronóstico de consumo de un cliente
+#============================
+
+@router.get("/{cliente_id}/pronostico", response_model=PronosticoResponse)
+def pronostico_cliente(
+    cliente_id: int,
+    dias: int = Query(crud_pronostico.PRONOSTICO_DIAS, ge=7, le=365, description="Ventana de consumo en días"),
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    """Ritmo diario y fecha estimada de agotamiento - admin o usuario del cliente"""
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+
+    return crud_pronostico.pronostico_cliente(db, cliente_id, dias)
+
 #============================
 # Actualizar cliente
 #============================
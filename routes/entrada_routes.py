@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import date
 
 from database import get_db
 from schemas.entrada_schema import EntradaCreate, EntradaUpdate, EntradaResponse
 from crud import crud_entradas
 from security import get_current_user
 from models.usuario_model import Usuario, RolEnum
+from services import idempotencia
+from services.paginacion import LIMITE_DEFECTO, LIMITE_MAXIMO
+from services.serializacion import respuesta_filas
+from services.exportacion import respuesta_exportacion
+from services import cliente_cache
 
 router = APIRouter(
     prefix="/entradas",
@@ -38,6 +44,7 @@ def require_admin(usuario: Usuario = Depends(get_current_user)):
 )
 def crear_entrada(
     entrada: EntradaCreate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(require_admin)
 ):
@@ -46,8 +53,19 @@ def crear_entrada(
 
     • Solo administradores
     • Actualiza el saldo del cliente
+    • Con Idempotency-Key un reintento devuelve la respuesta original
     """
 
+    if idempotency_key:
+        return idempotencia.ejecutar(
+            usuario.id,
+            idempotency_key,
+            "POST /entradas/",
+            EntradaResponse,
+            status.HTTP_201_CREATED,
+            lambda sesion: crud_entradas.create_entrada(sesion, entrada, usuario.id)
+        )
+
     return crud_entradas.create_entrada(db, entrada, usuario.id)
 
 
@@ -59,16 +77,23 @@ def crear_entrada(
     response_model=List[EntradaResponse]
 )
 def listar_entradas(
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    desde: date | None = None,
+    hasta: date | None = None,
     db: Session = Depends(get_db),
     _: Usuario = Depends(require_admin)
 ):
     """
-    Obtener todas las entradas registradas.
+    Obtener las entradas registradas, de la más reciente a la más antigua.
 
     • Solo administradores
+    • Paginado: la siguiente página viene en X-Siguiente-Cursor
     """
 
-    return crud_entradas.get_entradas(db)
+    entradas, siguiente = crud_entradas.get_entradas(db, limit, cursor, desde, hasta)
+
+    return respuesta_filas(entradas, EntradaResponse, siguiente)
 
 
 # ======================================================
@@ -109,6 +134,10 @@ def obtener_entrada(
 )
 def get_entradas_by_cliente(
     cliente_id: int,
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    desde: date | None = None,
+    hasta: date | None = None,
     db: Session = Depends(get_db),
     usuario: Usuario = Depends(get_current_user)
 ):
@@ -125,7 +154,49 @@ def get_entradas_by_cliente(
             detail="No autorizado para ver entradas de este cliente"
         )
 
-    return crud_entradas.get_entradas_by_cliente(db, cliente_id)
+    entradas, siguiente = crud_entradas.get_entradas_by_cliente(
+        db, cliente_id, limit, cursor, desde, hasta
+    )
+
+    return respuesta_filas(entradas, EntradaResponse, siguiente)
+
+
+# ======================================================
+# ⬇️ EXPORTAR ENTRADAS DE UN CLIENTE (CSV / NDJSON en streaming)
+# ======================================================
+@router.get("/cliente/{cliente_id}/export")
+def exportar_entradas(
+    cliente_id: int,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    desde: date | None = None,
+    hasta: date | None = None,
+    gzip: bool = Query(False, description="Comprimir la descarga"),
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    """
+    Descarga el historial de entradas del cliente.
+
+    • Admin → cualquier cliente
+    • Usuario → solo su cliente
+    • Memoria constante sin importar el tamaño del historial
+    """
+
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(
+            status_code=403,
+            detail="No autorizado para ver entradas de este cliente"
+        )
+
+    if not cliente_cache.obtener_por_id(db, cliente_id):
+        raise HTTPException(404, "Cliente no encontrado")
+
+    return respuesta_exportacion(
+        crud_entradas.consulta_exportacion_entradas(cliente_id, desde, hasta),
+        f"entradas_{cliente_id}",
+        formato,
+        gzip
+    )
 
 
 # ======================================================
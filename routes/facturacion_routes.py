@@ -0,0 +1,122 @@
+# routes/facturacion_routes.py
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import List
+
+from database import get_db
+from crud import crud_facturacion
+from models.usuario_model import RolEnum, Usuario
+from schemas.facturacion_schema import FacturacionResponse, FacturacionPeriodoResponse
+from security import get_current_user
+from services import facturacion
+from services.paginacion import LIMITE_DEFECTO, LIMITE_MAXIMO
+from services.serializacion import respuesta_filas
+
+router = APIRouter(prefix="/facturacion", tags=["Facturación"])
+
+
+def require_admin(usuario: Usuario = Depends(get_current_user)):
+
+    if usuario.rol != RolEnum.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acceso solo para administradores"
+        )
+
+    return usuario
+
+# ======================================================
+# ▶️ FACTURAR UN MES (segundo plano)
+# ======================================================
+@router.post(
+    "/{anio}/{mes}",
+    response_model=FacturacionPeriodoResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+def facturar_periodo(
+    anio: int,
+    mes: int,
+    db: Session = Depends(get_db),
+    _ = Depends(require_admin)
+):
+    """
+    Calcula el cobro de cada cliente (folios consumidos × valor_folio)
+    y genera los estados de cuenta. Se puede repetir: los clientes ya
+    facturados no se duplican y solo se terminan los pendientes.
+    El avance se consulta con GET /facturacion/{anio}/{mes}.
+    """
+    if not facturacion.iniciar_en_segundo_plano(anio, mes):
+        raise HTTPException(409, "La facturación de este período ya está en curso")
+
+    return facturacion.resumen_periodo(db, anio, mes)
+
+# ======================================================
+# 📊 ESTADO DE LA FACTURACIÓN DEL MES
+# ======================================================
+@router.get("/{anio}/{mes}", response_model=FacturacionPeriodoResponse)
+def estado_periodo(
+    anio: int,
+    mes: int,
+    db: Session = Depends(get_db),
+    _ = Depends(require_admin)
+):
+    return facturacion.resumen_periodo(db, anio, mes)
+
+# ======================================================
+# 📋 COBROS DEL MES (paginado)
+# ======================================================
+@router.get("/{anio}/{mes}/clientes", response_model=List[FacturacionResponse])
+def listar_facturas(
+    anio: int,
+    mes: int,
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    estado: str | None = Query(None, pattern="^(pendiente|generada)$"),
+    db: Session = Depends(get_db),
+    _ = Depends(require_admin)
+):
+    filas, siguiente = crud_facturacion.get_facturas_periodo(db, anio, mes, limit, cursor, estado)
+    return respuesta_filas(filas, FacturacionResponse, siguiente)
+
+# ======================================================
+# 🧾 COBRO Y ESTADO DE CUENTA DE UN CLIENTE
+# ======================================================
+@router.get("/{anio}/{mes}/clientes/{cliente_id}", response_model=FacturacionResponse)
+def obtener_factura(
+    anio: int,
+    mes: int,
+    cliente_id: int,
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    """Admin ve cualquier cliente; usuario normal solo el suyo"""
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+
+    return crud_facturacion.get_factura_cliente(db, cliente_id, anio, mes)
+
+
+@router.get("/{anio}/{mes}/clientes/{cliente_id}/estado-cuenta")
+def descargar_estado_cuenta(
+    anio: int,
+    mes: int,
+    cliente_id: int,
+    db: Session = Depends(get_db),
+    usuario: Usuario = Depends(get_current_user)
+):
+    if usuario.rol != RolEnum.admin and usuario.cliente_id != cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este cliente")
+
+    factura = crud_facturacion.get_factura_cliente(db, cliente_id, anio, mes)
+
+    if factura.estado != "generada" or not factura.archivo or not os.path.exists(factura.archivo):
+        raise HTTPException(404, "El estado de cuenta aún no está generado")
+
+    return FileResponse(
+        factura.archivo,
+        media_type="text/html",
+        filename=f"estado_cuenta_{cliente_id}_{anio}-{mes:02d}.html"
+    )
@@ -1,21 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
-from models.cliente_model import Cliente
+from database_async import get_async_db
+from services import cierre_anual, cliente_cache, etag, resumen_buffer
+from schemas.resumen_schema import ProcesoCierreResponse
+from services.exportacion import respuesta_exportacion
 from models.usuario_model import RolEnum, Usuario
-from security import get_current_user
+from security import get_current_user, get_current_user_async
 
 from crud.crud_resumen import (
-    resumen_mensual_por_nit,
-    resumen_anual_por_nit,
-    cierre_anual_manual,
-    resumenes_mensuales_anio_por_nit
+    resumen_mensual_por_nit_async,
+    resumen_anual_por_nit_async,
+    consulta_reporte,
+    resumenes_mensuales_anio_por_nit_async,
+    version_resumen_async,
+    version_resumenes_mensuales_async
 )
 
 from fastapi import HTTPException, status
 
 def require_admin(usuario = Depends(get_current_user)):
-    if usuario.rol != "admin":
+    if usuario.rol != RolEnum.admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Acceso denegado: solo administradores"
@@ -28,32 +34,53 @@ router = APIRouter(
     tags=["Resúmenes"]
 )
 
+
+async def _cliente_consultado(db: AsyncSession, nit: str, usuario: Usuario):
+    """Cliente del resumen: el del usuario normal, o el NIT pedido (admin)."""
+    if usuario.rol != RolEnum.admin:
+        cliente = await db.run_sync(cliente_cache.obtener_por_id, usuario.cliente_id)
+    else:
+        cliente = await db.run_sync(cliente_cache.obtener_por_nit, nit)
+
+    if not cliente:
+        raise HTTPException(404, "Cliente no encontrado")
+
+    return cliente
+
 # ======================================================
 # 📌 RESUMEN MENSUAL POR NIT
 # ======================================================
 @router.get("/mensual/{nit}")
-def get_resumen_mensual(
+async def get_resumen_mensual(
     nit: str,
     anio: int,
     mes: int,
-    db: Session = Depends(get_db),
-    usuario: Usuario = Depends(get_current_user)
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
 ):
-  # 🔒 Usuario normal solo puede ver su cliente
-    if usuario.rol != RolEnum.admin:
+    # 🔒 Usuario normal solo puede ver su cliente
+    cliente = await _cliente_consultado(db, nit, usuario)
 
-        cliente = db.query(Cliente).filter_by(id=usuario.cliente_id).first()
+    # 🏷️ Sin cambios desde la última lectura → 304 sin armar la respuesta
+    version = await version_resumen_async(db, cliente.id, anio, mes)
 
-        if not cliente:
-            raise HTTPException(404, "Cliente no encontrado")
+    if version:
+        etiqueta, definitivo = version
+        cache = etag.CACHE_CERRADO if definitivo else etag.CACHE_ABIERTO
 
-        nit = cliente.nit
+        if etag.coincide(if_none_match, etiqueta):
+            return etag.no_modificado(etiqueta, cache)
 
-    resumen = resumen_mensual_por_nit(db, nit, anio, mes)
+    resumen = await resumen_mensual_por_nit_async(db, cliente.nit, anio, mes)
 
     if not resumen:
         raise HTTPException(404, "No existe resumen mensual")
 
+    if version:
+        etag.publicar(response, etiqueta, cache)
+
     return resumen
 
 
@@ -61,26 +88,33 @@ def get_resumen_mensual(
 # 📌 RESUMEN ANUAL POR NIT
 # ======================================================
 @router.get("/anual/{nit}")
-def get_resumen_anual(
+async def get_resumen_anual(
     nit: str,
     anio: int,
-    db: Session = Depends(get_db),
-    usuario: Usuario = Depends(get_current_user)
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
 ):
-    if usuario.rol != RolEnum.admin:
+    cliente = await _cliente_consultado(db, nit, usuario)
 
-        cliente = db.query(Cliente).filter_by(id=usuario.cliente_id).first()
+    version = await version_resumen_async(db, cliente.id, anio)
 
-        if not cliente:
-            raise HTTPException(404, "Cliente no encontrado")
+    if version:
+        etiqueta, definitivo = version
+        cache = etag.CACHE_CERRADO if definitivo else etag.CACHE_ABIERTO
 
-        nit = cliente.nit
+        if etag.coincide(if_none_match, etiqueta):
+            return etag.no_modificado(etiqueta, cache)
 
-    resumen = resumen_anual_por_nit(db, nit, anio)
+    resumen = await resumen_anual_por_nit_async(db, cliente.nit, anio)
 
     if not resumen:
         raise HTTPException(404, "No existe resumen anual")
 
+    if version:
+        etag.publicar(response, etiqueta, cache)
+
     return resumen
 
 
@@ -89,33 +123,86 @@ def get_resumen_anual(
 # 📊 RESÚMENES MENSUALES DEL AÑO
 # ======================================================
 @router.get("/mensuales/{nit}")
-def get_resumenes_mensuales_anio(
+async def get_resumenes_mensuales_anio(
     nit: str,
     anio: int,
-    db: Session = Depends(get_db),
-    usuario: Usuario = Depends(get_current_user)
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
 ):
+    cliente = await _cliente_consultado(db, nit, usuario)
 
-    if usuario.rol != RolEnum.admin:
+    version = await version_resumenes_mensuales_async(db, cliente.id, anio)
 
-        cliente = db.query(Cliente).filter_by(id=usuario.cliente_id).first()
+    if version:
+        etiqueta, definitivo = version
+        cache = etag.CACHE_CERRADO if definitivo else etag.CACHE_ABIERTO
 
-        if not cliente:
-            raise HTTPException(404, "Cliente no encontrado")
+        if etag.coincide(if_none_match, etiqueta):
+            return etag.no_modificado(etiqueta, cache)
 
-        nit = cliente.nit
+    resumenes = await resumenes_mensuales_anio_por_nit_async(db, cliente.nit, anio)
 
-    return resumenes_mensuales_anio_por_nit(db, nit, anio)
+    if version:
+        etag.publicar(response, etiqueta, cache)
+
+    return resumenes
 
 
 
 # ======================================================
-# 🔒 CIERRE ANUAL GLOBAL
+# 📑 REPORTE DE TODOS LOS CLIENTES (CSV / XLSX / NDJSON en streaming)
 # ======================================================
-@router.post("/cerrar-anio")
+@router.get("/reporte")
+def reporte_periodo(
+    anio: int,
+    mes: int | None = Query(None, ge=1, le=12, description="Sin mes → resumen anual"),
+    formato: str = Query("csv", pattern="^(csv|xlsx|ndjson)$"),
+    gzip: bool = Query(False, description="Comprimir la descarga"),
+    _ = Depends(require_admin)
+):
+    """
+    Contadores por tipo de documento, entradas, ajustes y saldos del
+    período para todos los clientes, en una sola consulta.
+    Memoria constante sin importar la cantidad de clientes.
+    """
+    # El generador lee con su propia sesión: volcar antes lo pendiente
+    if resumen_buffer.activo():
+        resumen_buffer.flush()
+
+    nombre = f"reporte_{anio}" + (f"_{mes:02d}" if mes else "")
+
+    return respuesta_exportacion(consulta_reporte(anio, mes), nombre, formato, gzip)
+
+
+# ======================================================
+# 🔒 CIERRE ANUAL GLOBAL (segundo plano)
+# ======================================================
+@router.post("/cerrar-anio", response_model=ProcesoCierreResponse, status_code=status.HTTP_202_ACCEPTED)
 def cerrar_anio_global(
+    anio: int,
+    _ = Depends(require_admin)
+):
+    """
+    Lanza (o reanuda) el cierre del año por bloques de clientes.
+    El avance se consulta con GET /resumenes/cerrar-anio/{anio}.
+    """
+    proceso = cierre_anual.iniciar(anio)
+    if proceso is None:
+        raise HTTPException(409, "El año no tiene resúmenes abiertos; no hay nada que cerrar")
+
+    return proceso
+
+
+@router.get("/cerrar-anio/{anio}", response_model=ProcesoCierreResponse)
+def estado_cierre_anio(
     anio: int,
     db: Session = Depends(get_db),
     _ = Depends(require_admin)
 ):
-    return cierre_anual_manual(db, anio)
+    proceso = cierre_anual.estado(db, anio)
+    if not proceso:
+        raise HTTPException(404, "No hay cierre registrado para ese año")
+
+    return proceso
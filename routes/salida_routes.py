@@ -1,20 +1,35 @@
 # routes/salida_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from datetime import date
+
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
+from database_async import get_async_db
 from schemas.salida_schema import SalidaCreate, SalidaResponse
-from crud import crud_salidas
+from crud import crud_salidas, crud_reservas
 
-from security import get_current_user
+from security import get_current_user, get_current_user_async
 from models.usuario_model import Usuario, RolEnum
-from models.cliente_model import Cliente
+from models.salida_model import TipoDocumentoEnum
+from services import cliente_cache, idempotencia
+from services.paginacion import LIMITE_DEFECTO, LIMITE_MAXIMO
+from services.serializacion import respuesta_filas
+from services.exportacion import respuesta_exportacion
 
 from schemas.salida_schema import (
     SalidaCreate,
     SalidaResponse,
-    SalidaOperacionResponse
+    SalidaOperacionResponse,
+    SalidaLoteResultado,
+    ReservaCreate,
+    ReservaResponse
 )
+
+# Máximo de documentos aceptados por lote
+MAX_SALIDAS_LOTE = 10000
+
 router = APIRouter(
     prefix="/salidas",
     tags=["Salidas"]
@@ -36,24 +51,39 @@ def require_admin(usuario: Usuario = Depends(get_current_user)):
 # ➖ Crear salida (ADMIN + usuario normal con cliente activo)
 # ======================================================
 @router.post("/", response_model=SalidaOperacionResponse)
-def crear_salida(
+async def crear_salida(
     data: SalidaCreate,
-    db: Session = Depends(get_db),
-    usuario: Usuario = Depends(get_current_user)
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
 ):
+    # Con Idempotency-Key un reintento se contesta con la respuesta guardada;
+    # la salida va en la misma transacción que la respuesta (sin group commit)
+    if idempotency_key:
+        return await idempotencia.ejecutar_async(
+            usuario.id,
+            idempotency_key,
+            "POST /salidas/",
+            SalidaOperacionResponse,
+            status.HTTP_200_OK,
+            lambda sesion: _crear_salida(data, sesion, usuario, agrupar=False)
+        )
+
+    return await _crear_salida(data, db, usuario)
+
+
+async def _crear_salida(data: SalidaCreate, db: AsyncSession, usuario: Usuario, agrupar: bool = True):
     # ADMIN → puede usar cualquier NIT
     if usuario.rol == RolEnum.admin:
 
-        return crud_salidas.crear_salida(db, data)
+        return await crud_salidas.crear_salida_async(db, data, agrupar)
 
     # ======================================
     # USUARIO NORMAL
     # ======================================
 
     # obtener su cliente
-    cliente = db.query(Cliente).filter(
-        Cliente.id == usuario.cliente_id
-    ).first()
+    cliente = await cliente_cache.obtener_por_id_async(db, usuario.cliente_id)
 
     if not cliente:
 
@@ -65,8 +95,138 @@ def crear_salida(
     # ⚡ FORZAR NIT
     data.nit = cliente.nit
 
-    return crud_salidas.crear_salida(db, data)
+    return await crud_salidas.crear_salida_async(db, data, agrupar)
+
+
+
+# ======================================================
+# 📦 Crear salidas por lote (una transacción por lote)
+# ======================================================
+@router.post("/lote", response_model=list[SalidaLoteResultado])
+async def crear_salidas_lote(
+    data: list[SalidaCreate],
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
+):
+    if len(data) > MAX_SALIDAS_LOTE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote supera el máximo de {MAX_SALIDAS_LOTE} documentos."
+        )
+
+    # USUARIO NORMAL → todos los documentos van a su cliente
+    if usuario.rol != RolEnum.admin:
+
+        cliente = await cliente_cache.obtener_por_id_async(db, usuario.cliente_id)
+
+        if not cliente:
+
+            raise HTTPException(
+                status_code=404,
+                detail="Cliente del usuario no encontrado"
+            )
+
+        for item in data:
+            item.nit = cliente.nit
+
+    resultados = await crud_salidas.crear_salidas_lote_async(db, data)
+
+    return [
+        {
+            "indice": indice,
+            "nit": item.nit,
+            "tipo_documento": item.tipo_documento,
+            "numero_documento": item.numero_documento,
+            **resultado
+        }
+        for indice, (item, resultado) in enumerate(zip(data, resultados))
+    ]
+
+
+# ======================================================
+# 🎟️ Reservas de folios (emisores de alto volumen)
+# ======================================================
+async def _reserva_del_usuario(db: AsyncSession, reserva_id: int, usuario: Usuario):
+    reserva = await crud_reservas.obtener_reserva_async(db, reserva_id)
+
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+
+    if usuario.rol != RolEnum.admin and reserva.cliente_id != usuario.cliente_id:
+        raise HTTPException(status_code=403, detail="No autorizado para esta reserva")
+
+    return reserva
+
+
+@router.post("/reservas", response_model=ReservaResponse, status_code=status.HTTP_201_CREATED)
+async def crear_reserva(
+    data: ReservaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
+):
+    """
+    Aparta un bloque de folios del saldo del cliente.
+    Las salidas enviadas a /salidas/reservas/{id} lo consumen
+    y lo no usado vuelve al saldo al liberar o vencer la reserva.
+    """
+    if usuario.rol == RolEnum.admin:
+
+        if not data.nit:
+            raise HTTPException(status_code=400, detail="Debe indicar el NIT del cliente.")
+
+        nit = data.nit
+
+    else:
+
+        cliente = await cliente_cache.obtener_por_id_async(db, usuario.cliente_id)
+
+        if not cliente:
+            raise HTTPException(
+                status_code=404,
+                detail="Cliente del usuario no encontrado"
+            )
+
+        nit = cliente.nit
+
+    return await crud_reservas.crear_reserva_async(
+        db, nit, data.cantidad, data.duracion_segundos, usuario.id
+    )
+
+
+@router.get("/reservas/{reserva_id}", response_model=ReservaResponse)
+async def obtener_reserva(
+    reserva_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
+):
+    return await _reserva_del_usuario(db, reserva_id, usuario)
+
+
+@router.post("/reservas/{reserva_id}", response_model=SalidaOperacionResponse)
+async def crear_salida_con_reserva(
+    reserva_id: int,
+    data: SalidaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
+):
+    # El cliente siempre es el de la reserva; data.nit se ignora
+    return await crud_reservas.consumir_reserva_async(
+        db,
+        reserva_id,
+        data,
+        None if usuario.rol == RolEnum.admin else usuario.cliente_id
+    )
+
+
+@router.delete("/reservas/{reserva_id}", response_model=ReservaResponse)
+async def liberar_reserva(
+    reserva_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Usuario = Depends(get_current_user_async)
+):
+    await _reserva_del_usuario(db, reserva_id, usuario)
 
+    return await crud_reservas.liberar_reserva_async(db, reserva_id)
 
 
 # ======================================================
@@ -75,16 +235,55 @@ def crear_salida(
 @router.get("/{nit}", response_model=list[SalidaResponse])
 def listar_salidas_por_nit(
     nit: str,
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    desde: date | None = None,
+    hasta: date | None = None,
+    tipo_documento: TipoDocumentoEnum | None = None,
     db: Session = Depends(get_db),
     _: Usuario = Depends(require_admin)
 ):
-    salidas = crud_salidas.obtener_salidas_por_nit(db, nit)
+    pagina = crud_salidas.obtener_salidas_por_nit(
+        db, nit, limit, cursor, desde, hasta, tipo_documento
+    )
 
-    if salidas is None:
+    if pagina is None:
         raise HTTPException(
             status_code=404,
             detail="El cliente no existe."
         )
 
-    return salidas
+    salidas, siguiente = pagina
+
+    return respuesta_filas(salidas, SalidaResponse, siguiente)
+
+
+
+# ======================================================
+# ⬇️ Exportar salidas por NIT (ADMIN, CSV / NDJSON en streaming)
+# ======================================================
+@router.get("/{nit}/export")
+def exportar_salidas_por_nit(
+    nit: str,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    desde: date | None = None,
+    hasta: date | None = None,
+    gzip: bool = Query(False, description="Comprimir la descarga"),
+    tipo_documento: TipoDocumentoEnum | None = None,
+    db: Session = Depends(get_db),
+    _: Usuario = Depends(require_admin)
+):
+    cliente = cliente_cache.obtener_por_nit(db, nit)
+
+    if not cliente:
+        raise HTTPException(
+            status_code=404,
+            detail="El cliente no existe."
+        )
 
+    return respuesta_exportacion(
+        crud_salidas.consulta_exportacion_salidas(cliente.id, desde, hasta, tipo_documento),
+        f"salidas_{nit}",
+        formato,
+        gzip
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from database import get_db
 
@@ -7,6 +7,8 @@ from schemas.usuario_schema import UsuarioCreate, UsuarioLogin, UsuarioResponse
 
 from security import get_current_user
 from models.usuario_model import Usuario, RolEnum
+from services.paginacion import LIMITE_DEFECTO, LIMITE_MAXIMO
+from services.serializacion import respuesta_filas
 
 
 router = APIRouter(
@@ -46,10 +48,14 @@ def crear_usuario(
 # ======================================================
 @router.get("/", response_model=list[UsuarioResponse])
 def listar_usuarios(
+    limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    cursor: str | None = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
     db: Session = Depends(get_db),
     _ = Depends(require_admin)
 ):
-    return crud_usuarios.get_usuarios(db)
+    usuarios, siguiente = crud_usuarios.get_usuarios(db, limit, cursor)
+
+    return respuesta_filas(usuarios, UsuarioResponse, siguiente)
 
 
 # ======================================================
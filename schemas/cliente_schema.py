@@ -1,6 +1,7 @@
 # schemas/cliente_schema.py
+from datetime import date
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 # ======================================================
@@ -28,6 +29,19 @@ class ClienteCreate(ClienteBase):
     pass
 
 
+# ======================================================
+# IMPORTAR CLIENTES (resultado por registro)
+# ======================================================
+
+class ClienteImportacionResultado(BaseModel):
+
+    indice: int
+    nit: Optional[str] = None
+    estado: str                      # creado | error
+    mensaje: str
+    cliente_id: Optional[int] = None
+
+
 # ======================================================
 # ACTUALIZAR CLIENTE
 # ======================================================
@@ -76,4 +90,73 @@ class ClienteUsuarioResponse(BaseModel):
     correo_electronico: Optional[str]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# ======================================================
+# RESUMEN PARA EL PANEL ADMIN (saldo + consumo del mes)
+# ======================================================
+
+class ClienteOverviewResponse(BaseModel):
+
+    id: int
+    nombre: str
+    nit: str
+    saldo_actual: int
+    minimo_alerta: int
+    bloqueado: bool
+    inactivo: bool
+
+    # Contadores del mes en curso (0 si aún no tiene movimientos)
+    total_facturas: int
+    total_notas_credito: int
+    total_notas_debito: int
+    total_documentos_soporte: int
+    total_ajuste_documentos_soporte: int
+    total_nomina_electronica: int
+    total_ajuste_nomina: int
+    total_nota_ajuste: int
+    total_entradas: int
+    total_ajustes: int
+    consumo_mes: int
+
+
+# ======================================================
+# SALDO A UNA FECHA / SERIE DIARIA (libro de saldos)
+# ======================================================
+
+class SaldoFechaResponse(BaseModel):
+
+    cliente_id: int
+    fecha: date
+    saldo: int
+
+
+class SaldoSerieResponse(BaseModel):
+
+    cliente_id: int
+    desde: date
+    hasta: date
+    # Saldo al cierre de cada día, de desde a hasta
+    saldos: List[int]
+
+
+# ======================================================
+# PRONÓSTICO DE CONSUMO
+# ======================================================
+
+class PronosticoResponse(BaseModel):
+
+    cliente_id: int
+    nombre: str
+    # Saldo efectivo: saldo_actual + folios reservados sin usar
+    saldo_actual: int
+    minimo_alerta: int
+
+    # Folios consumidos en la ventana del pronóstico
+    consumo_periodo: int
+    # Ritmo diario estimado (media ponderada, días recientes pesan más)
+    consumo_diario: float
+    # None si el cliente no consume o, al ritmo actual, no se agota
+    # dentro del horizonte (PRONOSTICO_HORIZONTE días)
+    dias_restantes: Optional[int] = None
+    fecha_agotamiento: Optional[date] = None
@@ -0,0 +1,29 @@
+#schemas/facturacion_schema.py
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class FacturacionResponse(BaseModel):
+    id: int
+    cliente_id: int
+    anio: int
+    mes: int
+    folios: int
+    valor_folio: float
+    total: float
+    estado: str
+    ultimo_error: Optional[str] = None
+    generado: Optional[datetime] = None
+
+
+class FacturacionPeriodoResponse(BaseModel):
+    anio: int
+    mes: int
+    en_curso: bool
+    clientes: int
+    generadas: int
+    pendientes: int
+    con_error: int
+    folios: int
+    total: float
@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -46,3 +48,19 @@ class ResumenAnualResponse(ResumenBase):
 
     class Config:
         orm_mode = True
+
+
+# --------------------------------
+#     AVANCE DEL CIERRE ANUAL
+# --------------------------------
+class ProcesoCierreResponse(BaseModel):
+    anio: int
+    estado: str                 # en_curso | terminado | error
+    en_curso: bool              # corriendo en este proceso de la app
+    clientes_total: int
+    clientes_procesados: int
+    ultimo_cliente_id: int
+    error: Optional[str] = None
+    iniciado: datetime
+    actualizado: datetime
+    terminado: Optional[datetime] = None
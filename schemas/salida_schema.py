@@ -1,7 +1,8 @@
 #schemas/salida_schema.py
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, Field
 from models.salida_model import TipoDocumentoEnum
-from datetime import date
+from datetime import date, datetime
 
 class SalidaCreate(BaseModel):
     nit: str
@@ -23,4 +24,33 @@ class SalidaOperacionResponse(BaseModel):
     
     class Config:
         orm_mode = True
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SalidaLoteResultado(BaseModel):
+    indice: int
+    nit: str
+    tipo_documento: TipoDocumentoEnum
+    numero_documento: str
+    estado: str
+    mensaje: str
+
+
+class ReservaCreate(BaseModel):
+    cantidad: int = Field(..., gt=0, le=100000, description="Folios a reservar")
+    duracion_segundos: int = Field(300, ge=10, le=3600, description="Vigencia de la reserva")
+    nit: Optional[str] = Field(None, description="Solo admin: cliente de la reserva")
+
+class ReservaResponse(BaseModel):
+    id: int
+    cliente_id: int
+    cantidad: int
+    consumidos: int
+    disponibles: int
+    estado: str
+    creada: datetime
+    expira: datetime
+    cerrada: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
@@ -12,11 +12,14 @@ from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 from dotenv import load_dotenv
 
 from database import get_db
+from database_async import get_async_db
 from models.usuario_model import Usuario, RolEnum
 
 # Cargar variables de entorno
@@ -75,10 +78,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 # GET CURRENT USER
 # ============================================
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+def _leer_token(token: str) -> tuple[str, str, int | None]:
+    """Valida el JWT y devuelve (usuario, rol, cliente_id)."""
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -104,12 +105,17 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    usuario = db.query(Usuario).filter(
-        Usuario.nombre_usuario == username
-    ).first()
+    return username, rol, cliente_id
+
+
+def _completar_usuario(usuario: Usuario | None, rol: str, cliente_id: int | None) -> Usuario:
 
     if usuario is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudieron validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     # 👇 convertir rol string a Enum
     usuario.rol = RolEnum(rol)
@@ -120,6 +126,38 @@ def get_current_user(
     return usuario
 
 
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+
+    username, rol, cliente_id = _leer_token(token)
+
+    usuario = db.query(Usuario).filter(
+        Usuario.nombre_usuario == username
+    ).first()
+
+    return _completar_usuario(usuario, rol, cliente_id)
+
+
+# ============================================
+# GET CURRENT USER (ASYNC)
+# ============================================
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    username, rol, cliente_id = _leer_token(token)
+
+    usuario = (await db.execute(
+        select(Usuario).where(Usuario.nombre_usuario == username)
+    )).scalars().first()
+
+    return _completar_usuario(usuario, rol, cliente_id)
+
+
 # ============================================
 # SOLO ADMIN
 # ============================================
@@ -0,0 +1,193 @@
+# ============================================
+# services/alerta_worker.py
+# Despacho en segundo plano de la tabla alertas_outbox.
+#
+# - Pool de hilos (ALERTAS_WORKERS), cada uno con su propia
+#   sesión SMTP reutilizada entre envíos
+# - Cada alerta se reclama con un "lease" (estado enviando +
+#   proximo_intento) para que dos workers no la envíen dos veces;
+#   si un proceso muere, el lease vence y otra la retoma
+# - Reintentos con backoff exponencial hasta ALERTAS_MAX_INTENTOS
+# ============================================
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models.alerta_model import AlertaOutbox
+from services import email_service
+
+ALERTAS_WORKERS = int(os.getenv("ALERTAS_WORKERS", "2"))
+ALERTAS_LOTE = int(os.getenv("ALERTAS_LOTE", "20"))
+ALERTAS_INTERVALO = float(os.getenv("ALERTAS_INTERVALO", "2"))
+ALERTAS_MAX_INTENTOS = int(os.getenv("ALERTAS_MAX_INTENTOS", "8"))
+ALERTAS_BACKOFF_BASE = float(os.getenv("ALERTAS_BACKOFF_BASE", "30"))
+ALERTAS_BACKOFF_MAX = float(os.getenv("ALERTAS_BACKOFF_MAX", "3600"))
+
+# Tiempo que una alerta queda reservada por el worker que la envía
+LEASE_ENVIO = timedelta(minutes=5)
+
+# Una sesión SMTP inactiva más de esto se verifica con NOOP
+SMTP_INACTIVIDAD = 60
+
+_detener = threading.Event()
+_hilos: list[threading.Thread] = []
+
+
+# ======================================================
+# SESIÓN SMTP REUTILIZABLE
+# ======================================================
+class SesionSMTP:
+
+    def __init__(self):
+        self._server = None
+        self._ultimo_uso = 0.0
+
+    def enviar(self, msg):
+        server = self._conexion()
+        try:
+            email_service.enviar_mensaje(server, msg)
+        except Exception:
+            self.cerrar()
+            raise
+        self._ultimo_uso = time.monotonic()
+
+    def _conexion(self):
+        if self._server is not None and time.monotonic() - self._ultimo_uso > SMTP_INACTIVIDAD:
+            try:
+                if self._server.noop()[0] != 250:
+                    self.cerrar()
+            except Exception:
+                self.cerrar()
+
+        if self._server is None:
+            self._server = email_service.abrir_conexion_smtp()
+            self._ultimo_uso = time.monotonic()
+
+        return self._server
+
+    def cerrar(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+
+# ======================================================
+# PROCESAMIENTO
+# ======================================================
+def backoff(intentos: int) -> timedelta:
+    return timedelta(seconds=min(ALERTAS_BACKOFF_BASE * 2 ** (intentos - 1), ALERTAS_BACKOFF_MAX))
+
+
+def _reclamar(db, limite: int) -> list[AlertaOutbox]:
+    ahora = datetime.utcnow()
+
+    candidatas = db.execute(
+        select(AlertaOutbox.id, AlertaOutbox.proximo_intento)
+        .where(
+            AlertaOutbox.estado.in_(("pendiente", "enviando")),
+            AlertaOutbox.proximo_intento <= ahora
+        )
+        .order_by(AlertaOutbox.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    reclamadas = []
+    for alerta_id, proximo in candidatas:
+        # Condicional: solo gana un worker aunque la BD no soporte SKIP LOCKED
+        resultado = db.execute(
+            update(AlertaOutbox)
+            .where(AlertaOutbox.id == alerta_id, AlertaOutbox.proximo_intento == proximo)
+            .values(estado="enviando", proximo_intento=ahora + LEASE_ENVIO)
+        )
+        if resultado.rowcount == 1:
+            reclamadas.append(alerta_id)
+
+    db.commit()
+
+    if not reclamadas:
+        return []
+
+    return db.query(AlertaOutbox).filter(AlertaOutbox.id.in_(reclamadas)).all()
+
+
+def procesar_pendientes(sesion: SesionSMTP, limite: int = ALERTAS_LOTE) -> int:
+    """Reclama y envía un lote de alertas. Devuelve cuántas se procesaron."""
+    db = SessionLocal()
+    try:
+        alertas = _reclamar(db, limite)
+
+        for alerta in alertas:
+            try:
+                if email_service.hay_destinatarios():
+                    sesion.enviar(email_service.construir_alerta_folios(
+                        cliente_nombre=alerta.cliente_nombre,
+                        nit=alerta.nit,
+                        mensaje=alerta.mensaje,
+                        saldo=alerta.saldo
+                    ))
+                alerta.estado = "enviado"
+                alerta.enviado = datetime.utcnow()
+                alerta.ultimo_error = None
+
+            except Exception as e:
+                alerta.intentos += 1
+                alerta.ultimo_error = str(e)[:500]
+
+                if alerta.intentos >= ALERTAS_MAX_INTENTOS:
+                    alerta.estado = "fallido"
+                    print(f"❌ Alerta {alerta.id} descartada tras {alerta.intentos} intentos: {e}")
+                else:
+                    alerta.estado = "pendiente"
+                    alerta.proximo_intento = datetime.utcnow() + backoff(alerta.intentos)
+
+            db.commit()
+
+        return len(alertas)
+
+    finally:
+        db.close()
+
+
+def _worker():
+    sesion = SesionSMTP()
+    try:
+        while not _detener.is_set():
+            try:
+                procesadas = procesar_pendientes(sesion)
+            except Exception as e:
+                print(f"❌ Error en worker de alertas: {e}")
+                procesadas = 0
+
+            # Si el lote vino lleno puede haber más pendientes
+            if procesadas < ALERTAS_LOTE:
+                _detener.wait(ALERTAS_INTERVALO)
+    finally:
+        sesion.cerrar()
+
+
+# ======================================================
+# ARRANQUE / PARADA
+# ======================================================
+def iniciar(workers: int = ALERTAS_WORKERS):
+    _detener.clear()
+    for i in range(workers):
+        hilo = threading.Thread(target=_worker, name=f"alertas-{i}", daemon=True)
+        hilo.start()
+        _hilos.append(hilo)
+
+
+def detener(timeout: float = 10):
+    _detener.set()
+    for hilo in _hilos:
+        hilo.join(timeout)
+    _hilos.clear()
@@ -0,0 +1,129 @@
+# ============================================
+# services/cierre_anual.py
+# Cierre anual en segundo plano.
+#
+# - POST /resumenes/cerrar-anio lanza el cierre en un hilo y
+#   responde de inmediato; GET /resumenes/cerrar-anio/{anio}
+#   muestra el avance (procesos_cierre)
+# - El rollover de enero lo lanza solo para el año anterior
+# - Al arrancar la app se reanudan los cierres que quedaron
+#   en curso o con error
+# - Cada bloque es set-based y se confirma con su avance
+#   (crud_resumen.cierre_anual_manual)
+# - Un bloque que falla (p. ej. un deadlock con el cierre de enero
+#   de un cliente) se reintenta desde el último avance confirmado;
+#   solo tras CIERRE_ANUAL_REINTENTOS fallos seguidos queda en
+#   "error", y se retoma al arrancar o al volver a pedir el cierre
+# ============================================
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from database import SessionLocal
+from models.proceso_cierre_model import ProcesoCierre
+from crud.crud_resumen import cierre_anual_manual, preparar_cierre_anual
+
+CIERRE_ANUAL_REINTENTOS = int(os.getenv("CIERRE_ANUAL_REINTENTOS", "5"))
+CIERRE_ANUAL_ESPERA = float(os.getenv("CIERRE_ANUAL_ESPERA", "1"))
+
+_lock = threading.Lock()
+_en_curso: set[int] = set()
+
+
+def _ejecutar(anio: int):
+    db = SessionLocal()
+    try:
+        for intento in range(1, CIERRE_ANUAL_REINTENTOS + 1):
+            try:
+                proceso = cierre_anual_manual(db, anio)
+                if proceso is not None:
+                    print(f"✅ Cierre anual {anio}: {proceso.clientes_procesados} clientes")
+                return
+
+            except Exception as e:
+                db.rollback()
+
+                if intento < CIERRE_ANUAL_REINTENTOS:
+                    # Sigue desde el último bloque confirmado
+                    print(f"⚠️ Cierre anual {anio}, intento {intento} falló, se reintenta: {e}")
+                    time.sleep(CIERRE_ANUAL_ESPERA * intento)
+                    continue
+
+                print(f"❌ Error en el cierre anual {anio}: {e}")
+
+                db.query(ProcesoCierre).filter(ProcesoCierre.anio == anio).update(
+                    {"estado": "error", "error": str(e)[:500], "actualizado": datetime.utcnow()},
+                    synchronize_session=False
+                )
+                db.commit()
+
+    finally:
+        db.close()
+        with _lock:
+            _en_curso.discard(anio)
+
+
+def iniciar(anio: int) -> dict | None:
+    """
+    Crea (o retoma) el proceso del año y lo corre en un hilo si hace falta.
+    None si el año no tiene resúmenes abiertos (no se registra nada).
+    """
+    db = SessionLocal()
+    try:
+        proceso = preparar_cierre_anual(db, anio)
+        if proceso is None:
+            return None
+
+        if proceso.estado != "terminado":
+            with _lock:
+                lanzar = anio not in _en_curso
+                _en_curso.add(anio)
+
+            if lanzar:
+                threading.Thread(
+                    target=_ejecutar, args=(anio,), name=f"cierre-anual-{anio}", daemon=True
+                ).start()
+
+        return estado(db, anio)
+    finally:
+        db.close()
+
+
+def estado(db, anio: int) -> dict | None:
+    proceso = db.query(ProcesoCierre).filter(ProcesoCierre.anio == anio).first()
+    if not proceso:
+        return None
+
+    with _lock:
+        corriendo = anio in _en_curso
+
+    return {
+        "anio": proceso.anio,
+        "estado": proceso.estado,
+        "en_curso": corriendo,
+        "clientes_total": proceso.clientes_total,
+        "clientes_procesados": proceso.clientes_procesados,
+        "ultimo_cliente_id": proceso.ultimo_cliente_id,
+        "error": proceso.error,
+        "iniciado": proceso.iniciado,
+        "actualizado": proceso.actualizado,
+        "terminado": proceso.terminado,
+    }
+
+
+def reanudar_pendientes():
+    """Arranque de la app: sigue los cierres que no terminaron."""
+    db = SessionLocal()
+    try:
+        anios = [
+            anio for (anio,) in db.query(ProcesoCierre.anio)
+            .filter(ProcesoCierre.estado != "terminado")
+        ]
+    finally:
+        db.close()
+
+    for anio in anios:
+        print(f"🔁 Reanudando cierre anual {anio}")
+        iniciar(anio)
@@ -0,0 +1,190 @@
+# ============================================
+# services/cliente_cache.py
+# Caché en proceso de los datos lentos de cambiar
+# del cliente, indexada por NIT y por id.
+#
+# - LRU acotada (CLIENTE_CACHE_MAX) con TTL (CLIENTE_CACHE_TTL)
+# - crud_clientes la invalida en cada modificación
+# - saldo_actual NO se guarda: la BD es la fuente de verdad
+# ============================================
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.cliente_model import Cliente
+
+CLIENTE_CACHE_MAX = int(os.getenv("CLIENTE_CACHE_MAX", "10000"))
+CLIENTE_CACHE_TTL = float(os.getenv("CLIENTE_CACHE_TTL", "300"))
+
+
+class ClienteCacheado(NamedTuple):
+    id: int
+    nit: str
+    nombre: str
+    minimo_alerta: int
+    bloqueado: bool
+    inactivo: bool
+    valor_folio: float
+    correo_electronico: Optional[str]
+
+
+_COLUMNAS = (
+    Cliente.id,
+    Cliente.nit,
+    Cliente.nombre,
+    Cliente.minimo_alerta,
+    Cliente.bloqueado,
+    Cliente.inactivo,
+    Cliente.valor_folio,
+    Cliente.correo_electronico,
+)
+
+_lock = threading.Lock()
+
+# id → (cliente, expira_en)
+_por_id: "OrderedDict[int, tuple[ClienteCacheado, float]]" = OrderedDict()
+# nit → id
+_por_nit: dict[str, int] = {}
+
+_estadisticas = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Cambia en cada invalidación: evita guardar una lectura hecha antes de ella
+_generacion = 0
+
+
+# ======================================================
+# LECTURA
+# ======================================================
+def obtener_por_nit(db: Session, nit: str) -> ClienteCacheado | None:
+    with _lock:
+        cliente = _leer(_por_nit.get(nit))
+
+    if cliente is not None:
+        return cliente
+
+    return _cargar(db, Cliente.nit == nit)
+
+
+def obtener_por_id(db: Session, cliente_id: int) -> ClienteCacheado | None:
+    with _lock:
+        cliente = _leer(cliente_id)
+
+    if cliente is not None:
+        return cliente
+
+    return _cargar(db, Cliente.id == cliente_id)
+
+
+async def obtener_por_nit_async(db: AsyncSession, nit: str) -> ClienteCacheado | None:
+    with _lock:
+        cliente = _leer(_por_nit.get(nit))
+
+    if cliente is not None:
+        return cliente
+
+    generacion = _generacion
+    fila = (await db.execute(select(*_COLUMNAS).where(Cliente.nit == nit))).first()
+    return _guardar(fila, generacion)
+
+
+async def obtener_por_id_async(db: AsyncSession, cliente_id: int) -> ClienteCacheado | None:
+    with _lock:
+        cliente = _leer(cliente_id)
+
+    if cliente is not None:
+        return cliente
+
+    generacion = _generacion
+    fila = (await db.execute(select(*_COLUMNAS).where(Cliente.id == cliente_id))).first()
+    return _guardar(fila, generacion)
+
+
+def _leer(cliente_id: int | None) -> ClienteCacheado | None:
+    entrada = _por_id.get(cliente_id) if cliente_id is not None else None
+
+    if entrada is None or entrada[1] < time.monotonic():
+        _estadisticas["misses"] += 1
+        return None
+
+    _por_id.move_to_end(cliente_id)
+    _estadisticas["hits"] += 1
+    return entrada[0]
+
+
+def _cargar(db: Session, condicion) -> ClienteCacheado | None:
+    generacion = _generacion
+    fila = db.execute(select(*_COLUMNAS).where(condicion)).first()
+    return _guardar(fila, generacion)
+
+
+def _guardar(fila, generacion: int) -> ClienteCacheado | None:
+    """Guarda la fila leída, salvo que hubo una invalidación durante la lectura."""
+    if fila is None:
+        return None
+
+    cliente = ClienteCacheado(
+        id=fila.id,
+        nit=fila.nit,
+        nombre=fila.nombre,
+        minimo_alerta=fila.minimo_alerta,
+        bloqueado=bool(fila.bloqueado),
+        inactivo=bool(fila.inactivo),
+        valor_folio=fila.valor_folio,
+        correo_electronico=fila.correo_electronico,
+    )
+
+    with _lock:
+        if generacion != _generacion:
+            return cliente
+
+        _quitar(cliente.id)
+        _por_id[cliente.id] = (cliente, time.monotonic() + CLIENTE_CACHE_TTL)
+        _por_nit[cliente.nit] = cliente.id
+
+        while len(_por_id) > CLIENTE_CACHE_MAX:
+            viejo_id, (viejo, _) = _por_id.popitem(last=False)
+            if _por_nit.get(viejo.nit) == viejo_id:
+                del _por_nit[viejo.nit]
+            _estadisticas["evictions"] += 1
+
+    return cliente
+
+
+# ======================================================
+# INVALIDACIÓN
+# ======================================================
+def invalidar(cliente_id: int):
+    """Descarta el cliente (por id y por NIT). Llamar tras cada cambio."""
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _quitar(cliente_id)
+
+
+def limpiar():
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _por_id.clear()
+        _por_nit.clear()
+
+
+def _quitar(cliente_id: int):
+    entrada = _por_id.pop(cliente_id, None)
+    if entrada is not None and _por_nit.get(entrada[0].nit) == cliente_id:
+        del _por_nit[entrada[0].nit]
+
+
+# ======================================================
+# MÉTRICAS
+# ======================================================
+def estadisticas() -> dict:
+    with _lock:
+        return {**_estadisticas, "tamano": len(_por_id), "maximo": CLIENTE_CACHE_MAX}
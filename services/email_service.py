@@ -4,16 +4,21 @@ from email.mime.multipart import MIMEMultipart
 import os
 
 EMAIL_HOST = os.getenv("EMAIL_HOST")
-EMAIL_PORT = int(os.getenv("EMAIL_PORT"))
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
+# STARTTLS activo por defecto; 0 para servidores locales de prueba
+EMAIL_STARTTLS = os.getenv("EMAIL_STARTTLS", "1") == "1"
+
 DESTINATARIOS_ALERTA = os.getenv("EMAIL_ALERTAS", "").split(",")
 
-def enviar_alerta_folios(cliente_nombre: str, nit: str, mensaje: str, saldo: int):
-    if not DESTINATARIOS_ALERTA or DESTINATARIOS_ALERTA == [""]:
-        print("⚠️ No hay destinatarios configurados para alertas")
-        return
+
+def hay_destinatarios() -> bool:
+    return bool(DESTINATARIOS_ALERTA) and DESTINATARIOS_ALERTA != [""]
+
+
+def construir_alerta_folios(cliente_nombre: str, nit: str, mensaje: str, saldo: int) -> MIMEMultipart:
 
     asunto = f"⚠️ ALERTA FOLIOS CLIENTE {cliente_nombre}"
 
@@ -32,16 +37,41 @@ def enviar_alerta_folios(cliente_nombre: str, nit: str, mensaje: str, saldo: int
     """
 
     msg = MIMEMultipart()
-    msg["From"] = EMAIL_USER
+    msg["From"] = EMAIL_USER or ""
     msg["To"] = ", ".join(DESTINATARIOS_ALERTA)
     msg["Subject"] = asunto
     msg.attach(MIMEText(cuerpo, "plain"))
 
-    try:
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
+    return msg
+
+
+def abrir_conexion_smtp() -> smtplib.SMTP:
+    """Abre una sesión SMTP lista para enviar (STARTTLS + login si aplica)."""
+    server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=30)
+
+    if EMAIL_STARTTLS:
         server.starttls()
+
+    if EMAIL_USER and EMAIL_PASSWORD:
         server.login(EMAIL_USER, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_USER, DESTINATARIOS_ALERTA, msg.as_string())
+
+    return server
+
+
+def enviar_mensaje(server: smtplib.SMTP, msg: MIMEMultipart):
+    server.sendmail(EMAIL_USER or "", DESTINATARIOS_ALERTA, msg.as_string())
+
+
+def enviar_alerta_folios(cliente_nombre: str, nit: str, mensaje: str, saldo: int):
+    if not hay_destinatarios():
+        print("⚠️ No hay destinatarios configurados para alertas")
+        return
+
+    msg = construir_alerta_folios(cliente_nombre, nit, mensaje, saldo)
+
+    try:
+        server = abrir_conexion_smtp()
+        enviar_mensaje(server, msg)
         server.quit()
         print("📧 Correo de alerta enviado")
     except Exception as e:
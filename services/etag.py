@@ -0,0 +1,41 @@
+# ============================================
+# services/etag.py
+# GET condicionales (ETag / If-None-Match) de lecturas
+# muy consultadas por el frontend.
+#
+# - El ETag sale de la columna version de la fila (sube en
+#   cada UPDATE), así la comprobación es una consulta mínima
+#   y no hace falta armar la respuesta
+# - Los períodos ya pasados y cerrados cambian muy poco
+#   (conciliación, lotes no estrictos): se guardan un rato
+#   y luego se revalidan con el ETag; nunca "immutable"
+# - Un mes futuro también está "cerrado" hasta que se abre:
+#   solo cuenta como pasado si es anterior al período vigente
+# ============================================
+
+from fastapi import Response
+
+# Datos por usuario: nunca en cachés compartidas
+CACHE_CERRADO = "private, max-age=3600, must-revalidate"
+CACHE_ABIERTO = "private, no-cache"
+
+
+def construir(*partes) -> str:
+    return '"' + "-".join(str(p) for p in partes) + '"'
+
+
+def coincide(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    candidatos = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+    return "*" in candidatos or etag in candidatos
+
+
+def no_modificado(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def publicar(response: Response, etag: str, cache_control: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
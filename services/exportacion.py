@@ -0,0 +1,235 @@
+# ============================================
+# services/exportacion.py
+# Exportación en streaming (CSV / NDJSON / XLSX) de movimientos
+# y reportes.
+#
+# - Las filas salen de un cursor del lado del servidor
+#   (stream_results + yield_per): la memoria no crece con
+#   el tamaño del historial
+# - Se leen tuplas de columnas, no objetos ORM
+# - gzip opcional, comprimiendo por bloques
+# - XLSX escrito a mano: la hoja se genera fila a fila dentro de
+#   un ZIP que se va enviando (sin openpyxl ni archivo temporal)
+# - El generador abre su propia sesión: la de la petición ya
+#   se cerró cuando empieza a enviarse la respuesta
+# ============================================
+
+import csv
+import enum
+import io
+import json
+import os
+import re
+import zipfile
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator
+from xml.sax.saxutils import escape
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from database import SessionLocal
+
+EXPORTACION_LOTE = int(os.getenv("EXPORTACION_LOTE", "2000"))
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+def _valor(v):
+    if isinstance(v, enum.Enum):
+        return v.value
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+
+# ======================================================
+# LECTURA POR BLOQUES
+# ======================================================
+def _bloques(consulta) -> Iterator[list]:
+    db = SessionLocal()
+    try:
+        # Core sobre la conexión de la sesión: sin la capa de carga del ORM
+        resultado = db.connection().execute(
+            consulta.execution_options(stream_results=True, yield_per=EXPORTACION_LOTE)
+        )
+        for particion in resultado.partitions():
+            yield particion
+    finally:
+        db.close()
+
+
+# ======================================================
+# FORMATOS
+# ======================================================
+def _csv(bloques: Iterable[list], columnas: list[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    escritor.writerow(columnas)
+
+    for filas in bloques:
+        escritor.writerows([_valor(v) for v in fila] for fila in filas)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson(bloques: Iterable[list], columnas: list[str]) -> Iterator[bytes]:
+    for filas in bloques:
+        yield "".join(
+            json.dumps({c: _valor(v) for c, v in zip(columnas, fila)}, ensure_ascii=False) + "\n"
+            for fila in filas
+        ).encode("utf-8")
+
+
+# ---------- XLSX ----------
+_XLSX_FIJOS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Caracteres de control que XML no admite
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _Partes:
+    """Destino del ZIP: guarda lo escrito hasta que el generador lo entrega."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos: bytes) -> int:
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def tomar(self) -> bytes:
+        datos = b"".join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def _celda(valor) -> str:
+    valor = _valor(valor)
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f"<c><v>{valor}</v></c>"
+    texto = escape(_NO_XML.sub("", str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xlsx(valores) -> str:
+    return "<row>" + "".join(_celda(v) for v in valores) + "</row>"
+
+
+def _xlsx(bloques: Iterable[list], columnas: list[str]) -> Iterator[bytes]:
+    destino = _Partes()
+
+    # Destino sin seek: zipfile escribe descriptores de datos
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, contenido in _XLSX_FIJOS.items():
+            archivo.writestr(nombre, contenido)
+
+        # Tamaño desconocido al abrir: sin force_zip64 una hoja de más de
+        # 2 GiB sin comprimir falla al cerrarse ("File size too large")
+        with archivo.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            hoja.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _fila_xlsx(columnas)
+            ).encode("utf-8"))
+
+            for filas in bloques:
+                hoja.write("".join(_fila_xlsx(fila) for fila in filas).encode("utf-8"))
+                # El deflate retiene datos: solo se envía cuando hay algo
+                datos = destino.tomar()
+                if datos:
+                    yield datos
+
+            hoja.write(b"</sheetData></worksheet>")
+
+    yield destino.tomar()
+
+
+def _gzip(partes: Iterable[bytes]) -> Iterator[bytes]:
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 → cabecera gzip
+
+    for parte in partes:
+        comprimido = compresor.compress(parte)
+        if comprimido:
+            yield comprimido
+
+    yield compresor.flush()
+
+
+# ======================================================
+# RESPUESTA
+# ======================================================
+def respuesta_exportacion(
+    consulta,
+    nombre: str,
+    formato: str = "csv",
+    comprimir: bool = False
+) -> StreamingResponse:
+    """
+    consulta: select() de columnas; sus nombres son los encabezados.
+    nombre: nombre base del archivo descargado.
+    """
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato no soportado. Use csv, ndjson o xlsx.")
+
+    tipo, extension = FORMATOS[formato]
+    columnas = [c.name for c in consulta.selected_columns]
+
+    generar = {"csv": _csv, "ndjson": _ndjson, "xlsx": _xlsx}[formato]
+    cuerpo = generar(_bloques(consulta), columnas)
+
+    archivo = f"{nombre}.{extension}"
+    if comprimir:
+        cuerpo = _gzip(cuerpo)
+        tipo = "application/gzip"
+        archivo += ".gz"
+
+    return StreamingResponse(
+        cuerpo,
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{archivo}"'}
+    )
@@ -0,0 +1,355 @@
+# ============================================
+# services/facturacion.py
+# Facturación mensual: folios consumidos × valor_folio.
+#
+# - Cálculo en la BD: un INSERT ... SELECT desde resumen_mensual
+#   JOIN clientes crea una fila "pendiente" por cliente con
+#   consumo; los clientes ya facturados del período se omiten
+#   (uq_facturacion_periodo), así que repetir no duplica cobros
+# - Solo se factura un mes cerrado: mientras quede algún resumen
+#   del período abierto (rollover aún no corrido) se responde 409,
+#   y el cálculo solo lee resúmenes cerrados
+# - Estados de cuenta: un HTML por cliente, renderizados en
+#   paralelo en un pool de procesos, por bloques de
+#   FACTURACION_LOTE. Cada bloque se confirma al terminar; si
+#   el proceso se corta, la siguiente corrida sigue con los
+#   pendientes
+#
+# Uso:
+#   python -m services.facturacion 2026 9 [--procesos 8]
+#   POST /facturacion/{anio}/{mes} (segundo plano)
+# ============================================
+
+import argparse
+import html
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from crud.crud_resumen import COLUMNAS_SALIDA
+from database import SessionLocal
+from models.cliente_model import Cliente
+from models.facturacion_model import Facturacion
+from models.resumen_mensual_model import ResumenMensual
+from services import resumen_buffer
+from services.time_service import obtener_fecha_actual
+
+FACTURACION_DIR = os.getenv("FACTURACION_DIR", "facturas")
+FACTURACION_LOTE = int(os.getenv("FACTURACION_LOTE", "1000"))
+FACTURACION_PROCESOS = int(os.getenv("FACTURACION_PROCESOS", "0")) or os.cpu_count() or 1
+
+_lock = threading.Lock()
+_en_curso: set[tuple[int, int]] = set()
+
+
+# ======================================================
+# 🔎 VALIDACIÓN
+# ======================================================
+def validar_periodo(anio: int, mes: int):
+    if not 1 <= mes <= 12:
+        raise HTTPException(400, "Mes inválido")
+
+    hoy = obtener_fecha_actual()
+    if (anio, mes) >= (hoy.year, hoy.month):
+        raise HTTPException(400, "Solo se puede facturar un mes ya terminado")
+
+    # Un mes terminado sigue abierto hasta que corre el rollover
+    db = SessionLocal()
+    try:
+        abiertos = db.execute(
+            select(func.count()).select_from(ResumenMensual).where(
+                ResumenMensual.anio == anio,
+                ResumenMensual.mes == mes,
+                ResumenMensual.estado != "cerrado"
+            )
+        ).scalar()
+    finally:
+        db.close()
+
+    if abiertos:
+        raise HTTPException(409, "El período aún no está cerrado; reintente tras el cierre mensual")
+
+
+# ======================================================
+# 🧮 CÁLCULO (una sentencia para todos los clientes)
+# ======================================================
+def calcular(db: Session, anio: int, mes: int) -> int:
+    """Crea las filas pendientes que falten. Devuelve cuántas creó."""
+    consumo = None
+    for columna in COLUMNAS_SALIDA.values():
+        valor = func.coalesce(getattr(ResumenMensual, columna), 0)
+        consumo = valor if consumo is None else consumo + valor
+
+    ya_facturado = exists().where(
+        Facturacion.cliente_id == ResumenMensual.cliente_id,
+        Facturacion.anio == anio,
+        Facturacion.mes == mes
+    )
+
+    resultado = db.execute(
+        insert(Facturacion).from_select(
+            ["cliente_id", "anio", "mes", "folios", "valor_folio", "total", "estado", "creado"],
+            select(
+                ResumenMensual.cliente_id,
+                literal(anio),
+                literal(mes),
+                consumo,
+                Cliente.valor_folio,
+                func.round(consumo * Cliente.valor_folio, 2),
+                literal("pendiente"),
+                literal(datetime.utcnow())
+            )
+            .join(Cliente, Cliente.id == ResumenMensual.cliente_id)
+            .where(
+                ResumenMensual.anio == anio,
+                ResumenMensual.mes == mes,
+                ResumenMensual.estado == "cerrado",
+                consumo > 0,
+                ~ya_facturado
+            )
+        )
+    )
+    db.commit()
+
+    return resultado.rowcount
+
+
+# ======================================================
+# 🖨️ ESTADOS DE CUENTA (pool de procesos)
+# ======================================================
+def _pesos(valor: float) -> str:
+    return "$ " + f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def renderizar(datos: dict) -> tuple[int, str | None, str | None]:
+    """
+    Corre en los procesos del pool: escribe el HTML del cliente y
+    devuelve (id, archivo, error). La escritura es atómica
+    (archivo temporal + os.replace) para que un corte no deje
+    archivos a medias.
+    """
+    try:
+        carpeta = os.path.join(datos["directorio"], f"{datos['anio']}-{datos['mes']:02d}")
+        os.makedirs(carpeta, exist_ok=True)
+        archivo = os.path.join(carpeta, f"cliente_{datos['cliente_id']}.html")
+
+        filas = "".join(
+            f"<tr><td>{html.escape(tipo)}</td><td>{cantidad}</td></tr>"
+            for tipo, cantidad in datos["documentos"].items()
+            if cantidad
+        )
+        contenido = (
+            "<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\">"
+            f"<title>Estado de cuenta {datos['anio']}-{datos['mes']:02d}</title></head><body>"
+            f"<h1>Estado de cuenta {datos['anio']}-{datos['mes']:02d}</h1>"
+            f"<p><strong>{html.escape(datos['nombre'])}</strong><br>NIT {html.escape(datos['nit'])}</p>"
+            "<table border=\"1\" cellpadding=\"4\"><tr><th>Documento</th><th>Folios</th></tr>"
+            f"{filas}"
+            f"<tr><th>Total folios</th><th>{datos['folios']}</th></tr></table>"
+            f"<p>Valor por folio: {_pesos(datos['valor_folio'])}<br>"
+            f"<strong>Total a pagar: {_pesos(datos['total'])}</strong></p>"
+            f"<p>Saldo inicial: {datos['saldo_inicial']} · Saldo final: {datos['saldo_final']}</p>"
+            "</body></html>"
+        )
+
+        temporal = archivo + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(temporal, archivo)
+
+        return datos["id"], archivo, None
+
+    except Exception as e:
+        return datos["id"], None, str(e)[:500]
+
+
+def _pendientes(db: Session, anio: int, mes: int, despues_de: int) -> list[dict]:
+    """Siguiente bloque de pendientes con lo necesario para el estado de cuenta."""
+    columnas = COLUMNAS_SALIDA
+
+    filas = db.execute(
+        select(
+            Facturacion.id,
+            Facturacion.cliente_id,
+            Facturacion.folios,
+            Facturacion.valor_folio,
+            Facturacion.total,
+            Cliente.nombre,
+            Cliente.nit,
+            ResumenMensual.saldo_inicial,
+            ResumenMensual.saldo_final,
+            *(getattr(ResumenMensual, columna) for columna in columnas.values())
+        )
+        .join(Cliente, Cliente.id == Facturacion.cliente_id)
+        .join(ResumenMensual, (ResumenMensual.cliente_id == Facturacion.cliente_id)
+              & (ResumenMensual.anio == anio) & (ResumenMensual.mes == mes))
+        .where(
+            Facturacion.anio == anio,
+            Facturacion.mes == mes,
+            Facturacion.estado == "pendiente",
+            Facturacion.id > despues_de
+        )
+        .order_by(Facturacion.id)
+        .limit(FACTURACION_LOTE)
+    ).all()
+
+    return [
+        {
+            "id": fila[0],
+            "cliente_id": fila[1],
+            "folios": fila[2],
+            "valor_folio": fila[3],
+            "total": fila[4],
+            "nombre": fila[5],
+            "nit": fila[6],
+            "saldo_inicial": fila[7] or 0,
+            "saldo_final": fila[8] or 0,
+            "documentos": dict(zip(columnas, (v or 0 for v in fila[9:]))),
+            "anio": anio,
+            "mes": mes,
+            "directorio": FACTURACION_DIR,
+        }
+        for fila in filas
+    ]
+
+
+def generar(db: Session, anio: int, mes: int, procesos: int | None = None) -> tuple[int, int]:
+    """Renderiza los pendientes del período. Devuelve (generadas, con error)."""
+    procesos = procesos or FACTURACION_PROCESOS
+    generadas = errores = 0
+    ultimo = 0
+
+    # spawn: los procesos no heredan hilos ni conexiones de la app
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(procesos, mp_context=contexto) as pool:
+        while True:
+            bloque = _pendientes(db, anio, mes, ultimo)
+            if not bloque:
+                break
+            ultimo = bloque[-1]["id"]
+
+            trozo = max(1, len(bloque) // (procesos * 4))
+            resultados = list(pool.map(renderizar, bloque, chunksize=trozo))
+
+            # Core sobre la tabla: executemany, no el bulk UPDATE del ORM
+            ahora = datetime.utcnow()
+            tabla = Facturacion.__table__
+            db.execute(
+                update(tabla)
+                .where(tabla.c.id == bindparam("b_id"))
+                .values(
+                    estado=case((bindparam("b_archivo").is_(None), "pendiente"), else_="generada"),
+                    archivo=bindparam("b_archivo"),
+                    ultimo_error=bindparam("b_error"),
+                    generado=bindparam("b_generado")
+                ),
+                [
+                    {
+                        "b_id": id_,
+                        "b_archivo": archivo,
+                        "b_error": error,
+                        "b_generado": ahora if archivo else None,
+                    }
+                    for id_, archivo, error in resultados
+                ]
+            )
+            db.commit()
+
+            fallidas = sum(1 for _, archivo, _ in resultados if archivo is None)
+            errores += fallidas
+            generadas += len(resultados) - fallidas
+
+    return generadas, errores
+
+
+# ======================================================
+# ▶️ CORRIDA COMPLETA
+# ======================================================
+def facturar(anio: int, mes: int, procesos: int | None = None) -> dict:
+    validar_periodo(anio, mes)
+
+    # Los contadores del mes deben estar completos
+    if resumen_buffer.activo():
+        resumen_buffer.flush()
+
+    db = SessionLocal()
+    try:
+        creadas = calcular(db, anio, mes)
+        generadas, errores = generar(db, anio, mes, procesos)
+        return {"creadas": creadas, "generadas": generadas, "errores": errores}
+    finally:
+        db.close()
+
+
+def en_curso(anio: int, mes: int) -> bool:
+    with _lock:
+        return (anio, mes) in _en_curso
+
+
+def iniciar_en_segundo_plano(anio: int, mes: int) -> bool:
+    """Lanza facturar() en un hilo. False si el período ya se está facturando."""
+    validar_periodo(anio, mes)
+
+    with _lock:
+        if (anio, mes) in _en_curso:
+            return False
+        _en_curso.add((anio, mes))
+
+    def tarea():
+        try:
+            resultado = facturar(anio, mes)
+            print(f"✅ Facturación {anio}-{mes:02d}: {resultado}")
+        except Exception as e:
+            print(f"❌ Error en la facturación {anio}-{mes:02d}: {e}")
+        finally:
+            with _lock:
+                _en_curso.discard((anio, mes))
+
+    threading.Thread(target=tarea, name=f"facturacion-{anio}-{mes:02d}", daemon=True).start()
+    return True
+
+
+# ======================================================
+# 📊 ESTADO DEL PERÍODO
+# ======================================================
+def resumen_periodo(db: Session, anio: int, mes: int) -> dict:
+    fila = db.execute(
+        select(
+            func.count(Facturacion.id),
+            func.coalesce(func.sum(case((Facturacion.estado == "generada", 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Facturacion.ultimo_error.is_not(None), 1), else_=0)), 0),
+            func.coalesce(func.sum(Facturacion.folios), 0),
+            func.coalesce(func.sum(Facturacion.total), 0)
+        )
+        .where(Facturacion.anio == anio, Facturacion.mes == mes)
+    ).one()
+
+    clientes, generadas, con_error, folios, total = fila
+
+    return {
+        "anio": anio,
+        "mes": mes,
+        "en_curso": en_curso(anio, mes),
+        "clientes": clientes,
+        "generadas": generadas,
+        "pendientes": clientes - generadas,
+        "con_error": con_error,
+        "folios": folios,
+        "total": round(total, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Facturar un mes terminado")
+    parser.add_argument("anio", type=int)
+    parser.add_argument("mes", type=int)
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para los estados de cuenta")
+    args = parser.parse_args()
+
+    print(f"✅ {facturar(args.anio, args.mes, args.procesos)}")
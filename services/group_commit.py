@@ -0,0 +1,172 @@
+# ============================================
+# services/group_commit.py
+# Group commit (opcional) de las salidas individuales.
+#
+# Con GROUP_COMMIT=1 las salidas que llegan a POST /salidas/
+# con pocos milisegundos de diferencia se encolan a un único
+# hilo committer que las aplica en UNA transacción
+# (crear_salidas_lote: un UPDATE de saldo por cliente y uno
+# por período) y resuelve el future de cada petición con su
+# resultado APROBADO / RECHAZADO individual.
+#
+# - GROUP_COMMIT_VENTANA_MS: cuánto espera el committer a que
+#   lleguen más salidas después de la primera
+# - GROUP_COMMIT_MAX_LOTE: máximo de salidas por transacción
+# ============================================
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from fastapi import HTTPException
+
+from database import SessionLocal
+from schemas.salida_schema import SalidaCreate
+
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_VENTANA_MS = float(os.getenv("GROUP_COMMIT_VENTANA_MS", "5"))
+GROUP_COMMIT_MAX_LOTE = int(os.getenv("GROUP_COMMIT_MAX_LOTE", "500"))
+
+_cola: "queue.Queue[tuple[SalidaCreate, Future]]" = queue.Queue()
+
+_lock = threading.Lock()
+_estadisticas = {"commits": 0, "documentos": 0, "lotes_reintentados": 0, "max_lote": 0}
+
+_detener = threading.Event()
+_hilo: threading.Thread | None = None
+
+
+def activo() -> bool:
+    """True si el modo está habilitado y el committer está corriendo."""
+    return GROUP_COMMIT and _hilo is not None
+
+
+# ======================================================
+# ENCOLAR
+# ======================================================
+def encolar(data: SalidaCreate) -> Future:
+    """Encola una salida; el future se resuelve con el dict de resultado."""
+    futuro: Future = Future()
+    _cola.put((data, futuro))
+    return futuro
+
+
+# ======================================================
+# COMMITTER
+# ======================================================
+def _tomar_lote(espera: float) -> list[tuple[SalidaCreate, Future]]:
+    try:
+        lote = [_cola.get(timeout=espera)]
+    except queue.Empty:
+        return []
+
+    limite = time.monotonic() + GROUP_COMMIT_VENTANA_MS / 1000
+
+    while len(lote) < GROUP_COMMIT_MAX_LOTE:
+        restante = limite - time.monotonic()
+        try:
+            lote.append(_cola.get(timeout=restante) if restante > 0 else _cola.get_nowait())
+        except queue.Empty:
+            break
+
+    return lote
+
+
+def aplicar_lote(lote: list[tuple[SalidaCreate, Future]]):
+    """Aplica el lote en una transacción y resuelve los futures."""
+    from crud.crud_salidas import crear_salida, crear_salidas_lote
+
+    items = [data for data, _ in lote]
+
+    db = SessionLocal()
+    try:
+        try:
+            resultados = crear_salidas_lote(db, items)
+            _contar(commits=1, documentos=len(items), max_lote=len(items))
+
+        except HTTPException:
+            # Otro proceso registró alguno de los documentos en paralelo:
+            # se aplican uno por uno, donde el duplicado se resuelve solo
+            db.rollback()
+            _contar(lotes_reintentados=1)
+
+            for data, futuro in lote:
+                try:
+                    futuro.set_result(crear_salida(db, data))
+                    _contar(commits=1, documentos=1)
+                except Exception as e:
+                    db.rollback()
+                    futuro.set_exception(e)
+            return
+
+        for (_, futuro), resultado in zip(lote, resultados):
+            futuro.set_result(resultado)
+
+    except Exception as e:
+        db.rollback()
+        for _, futuro in lote:
+            if not futuro.done():
+                futuro.set_exception(e)
+
+    finally:
+        db.close()
+
+
+def _contar(commits=0, documentos=0, lotes_reintentados=0, max_lote=0):
+    with _lock:
+        _estadisticas["commits"] += commits
+        _estadisticas["documentos"] += documentos
+        _estadisticas["lotes_reintentados"] += lotes_reintentados
+        _estadisticas["max_lote"] = max(_estadisticas["max_lote"], max_lote)
+
+
+def _ciclo():
+    while not _detener.is_set():
+        lote = _tomar_lote(espera=0.5)
+        if lote:
+            aplicar_lote(lote)
+
+    # Vaciar lo que quedó en la cola al apagar
+    while lote := _tomar_lote(espera=0):
+        aplicar_lote(lote)
+
+
+# ======================================================
+# ARRANQUE / PARADA
+# ======================================================
+def iniciar():
+    global _hilo
+
+    if not GROUP_COMMIT or _hilo is not None:
+        return
+
+    _detener.clear()
+    _hilo = threading.Thread(target=_ciclo, name="group-commit", daemon=True)
+    _hilo.start()
+
+
+def detener():
+    global _hilo
+
+    # Las peticiones nuevas vuelven al camino directo
+    hilo, _hilo = _hilo, None
+
+    _detener.set()
+    if hilo is not None:
+        hilo.join()
+
+
+# ======================================================
+# MÉTRICAS
+# ======================================================
+def estadisticas() -> dict:
+    with _lock:
+        datos = dict(_estadisticas)
+
+    datos["documentos_por_commit"] = (
+        round(datos["documentos"] / datos["commits"], 2) if datos["commits"] else 0
+    )
+    datos["en_cola"] = _cola.qsize()
+    return datos
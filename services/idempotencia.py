@@ -0,0 +1,347 @@
+# ============================================
+# services/idempotencia.py
+# Soporte de la cabecera Idempotency-Key en los POST.
+#
+# - La clave (usuario, clave) se reclama en la tabla idempotencia
+#   ANTES de ejecutar la operación (estado en_vuelo): el índice
+#   único decide quién ejecuta, en cualquier worker
+# - La operación corre dentro de una transacción externa (sus
+#   commit son savepoints) y la respuesta se guarda en esa misma
+#   transacción: o quedan las dos, o ninguna
+# - Solo quien tiene el token del reclamo puede completarlo;
+#   un reclamo abandonado (proceso caído) se retoma pasado
+#   IDEMPOTENCIA_EN_VUELO_MAX segundos
+# - Los duplicados concurrentes consultan la tabla hasta ver la
+#   respuesta; las completas se recuerdan en una LRU en proceso
+# ============================================
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, NamedTuple
+
+import anyio
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from database_async import AsyncSessionLocal
+from models.idempotencia_model import RespuestaIdempotente
+from services.resumen_buffer import SESION_EXTERNA
+
+IDEMPOTENCIA_TTL = int(os.getenv("IDEMPOTENCIA_TTL", "86400"))
+IDEMPOTENCIA_LRU_MAX = int(os.getenv("IDEMPOTENCIA_LRU_MAX", "10000"))
+IDEMPOTENCIA_EN_VUELO_MAX = int(os.getenv("IDEMPOTENCIA_EN_VUELO_MAX", "120"))
+
+# Tiempo máximo que un duplicado espera a la petición original
+ESPERA_EN_VUELO = 30
+# Intervalo de consulta mientras espera
+SONDEO = 0.05
+
+
+class RespuestaGuardada(NamedTuple):
+    ruta: str
+    status_code: int
+    cuerpo: str
+    expira: datetime
+
+
+class Reclamo(NamedTuple):
+    id: int
+    token: str
+
+
+_lock = threading.Lock()
+_cache: "OrderedDict[tuple[int, str], RespuestaGuardada]" = OrderedDict()
+
+
+# ======================================================
+# LRU (solo respuestas completas)
+# ======================================================
+def _desde_cache(llave: tuple[int, str]) -> RespuestaGuardada | None:
+    with _lock:
+        guardada = _cache.get(llave)
+        if guardada is None:
+            return None
+        if guardada.expira > datetime.utcnow():
+            _cache.move_to_end(llave)
+            return guardada
+        del _cache[llave]
+        return None
+
+
+def _recordar(llave: tuple[int, str], guardada: RespuestaGuardada):
+    with _lock:
+        _cache[llave] = guardada
+        _cache.move_to_end(llave)
+        while len(_cache) > IDEMPOTENCIA_LRU_MAX:
+            _cache.popitem(last=False)
+
+
+# ======================================================
+# RECLAMO (transacción propia, confirmada antes de ejecutar)
+# ======================================================
+def reclamar(usuario_id: int, clave: str, ruta: str) -> RespuestaGuardada | Reclamo | None:
+    """
+    Un intento de tomar la clave:
+    - RespuestaGuardada si ya está completa
+    - Reclamo si esta petición debe ejecutar la operación
+    - None si otra petición la tiene en vuelo
+    """
+    llave = (usuario_id, clave)
+
+    guardada = _desde_cache(llave)
+    if guardada is not None:
+        return guardada
+
+    ahora = datetime.utcnow()
+    token = uuid.uuid4().hex
+
+    db = SessionLocal()
+    try:
+        fila = db.execute(
+            select(RespuestaIdempotente).where(
+                RespuestaIdempotente.usuario_id == usuario_id,
+                RespuestaIdempotente.clave == clave
+            )
+        ).scalars().first()
+
+        if fila is not None and fila.expira <= ahora:
+            # Una clave vencida puede reutilizarse
+            db.execute(
+                delete(RespuestaIdempotente).where(
+                    RespuestaIdempotente.id == fila.id,
+                    RespuestaIdempotente.expira <= ahora
+                )
+            )
+            db.commit()
+            fila = None
+
+        if fila is not None:
+            if fila.estado == "completa":
+                guardada = RespuestaGuardada(fila.ruta, fila.status_code, fila.cuerpo, fila.expira)
+                _recordar(llave, guardada)
+                return guardada
+
+            if fila.reclamado > ahora - timedelta(seconds=IDEMPOTENCIA_EN_VUELO_MAX):
+                return None
+
+            # Reclamo abandonado: se retoma solo si nadie lo hizo antes
+            retomado = db.execute(
+                update(RespuestaIdempotente)
+                .where(
+                    RespuestaIdempotente.id == fila.id,
+                    RespuestaIdempotente.token == fila.token,
+                    RespuestaIdempotente.estado == "en_vuelo"
+                )
+                .values(token=token, reclamado=ahora)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return Reclamo(fila.id, token) if retomado.rowcount else None
+
+        nueva = RespuestaIdempotente(
+            usuario_id=usuario_id,
+            clave=clave,
+            ruta=ruta,
+            estado="en_vuelo",
+            token=token,
+            reclamado=ahora,
+            expira=ahora + timedelta(seconds=IDEMPOTENCIA_TTL)
+        )
+        db.add(nueva)
+        db.commit()
+        return Reclamo(nueva.id, token)
+
+    except IntegrityError:
+        # Otra petición la reclamó primero
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def soltar(reclamo: Reclamo):
+    """La operación falló: la clave queda libre para el siguiente intento."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            delete(RespuestaIdempotente).where(
+                RespuestaIdempotente.id == reclamo.id,
+                RespuestaIdempotente.token == reclamo.token,
+                RespuestaIdempotente.estado == "en_vuelo"
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _esperar_turno(usuario_id: int, clave: str, ruta: str) -> RespuestaGuardada | Reclamo:
+    limite = time.monotonic() + ESPERA_EN_VUELO
+
+    while True:
+        resultado = reclamar(usuario_id, clave, ruta)
+        if resultado is not None:
+            return resultado
+
+        if time.monotonic() >= limite:
+            raise HTTPException(
+                status_code=409,
+                detail="Hay una petición en curso con esta Idempotency-Key."
+            )
+        time.sleep(SONDEO)
+
+
+# ======================================================
+# COMPLETAR (dentro de la transacción de la operación)
+# ======================================================
+def _completar(reclamo: Reclamo, ruta: str, status_code: int, contenido: Any):
+    guardada = RespuestaGuardada(
+        ruta=ruta,
+        status_code=status_code,
+        cuerpo=json.dumps(contenido),
+        expira=datetime.utcnow() + timedelta(seconds=IDEMPOTENCIA_TTL)
+    )
+
+    sentencia = (
+        update(RespuestaIdempotente)
+        .where(
+            RespuestaIdempotente.id == reclamo.id,
+            RespuestaIdempotente.token == reclamo.token,
+            RespuestaIdempotente.estado == "en_vuelo"
+        )
+        .values(
+            estado="completa",
+            status_code=status_code,
+            cuerpo=guardada.cuerpo,
+            expira=guardada.expira
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return guardada, sentencia
+
+
+def _sin_reclamo():
+    # Otro proceso retomó la clave: esta operación no debe quedar
+    raise HTTPException(
+        status_code=409,
+        detail="Otra petición tomó esta Idempotency-Key; se deshizo la operación."
+    )
+
+
+def _responder(guardada: RespuestaGuardada, ruta: str, repetida: bool) -> JSONResponse:
+    if guardada.ruta != ruta:
+        raise HTTPException(
+            status_code=422,
+            detail="La Idempotency-Key ya se usó en otra operación."
+        )
+
+    return JSONResponse(
+        content=json.loads(guardada.cuerpo),
+        status_code=guardada.status_code,
+        headers={"Idempotent-Replayed": "true"} if repetida else None
+    )
+
+
+def _serializar(resultado: Any, modelo) -> Any:
+    return jsonable_encoder(modelo.model_validate(resultado, from_attributes=True))
+
+
+# ======================================================
+# EJECUCIÓN
+# ======================================================
+def ejecutar(
+    usuario_id: int,
+    clave: str,
+    ruta: str,
+    modelo,
+    status_code: int,
+    operacion: Callable[[Session], Any]
+) -> JSONResponse:
+    """
+    Versión para rutas sync (corren en el threadpool).
+    operacion recibe la sesión unida a la transacción externa.
+    """
+    turno = _esperar_turno(usuario_id, clave, ruta)
+    if isinstance(turno, RespuestaGuardada):
+        return _responder(turno, ruta, repetida=True)
+
+    externa = SessionLocal()
+    try:
+        db = SessionLocal(
+            bind=externa.connection(),
+            join_transaction_mode="create_savepoint",
+            info={SESION_EXTERNA: externa}
+        )
+        try:
+            contenido = _serializar(operacion(db), modelo)
+        finally:
+            db.close()
+
+        guardada, sentencia = _completar(turno, ruta, status_code, contenido)
+        if externa.execute(sentencia).rowcount == 0:
+            _sin_reclamo()
+
+        externa.commit()
+
+    except BaseException:
+        externa.rollback()
+        soltar(turno)
+        raise
+    finally:
+        externa.close()
+
+    _recordar((usuario_id, clave), guardada)
+    return _responder(guardada, ruta, repetida=False)
+
+
+async def ejecutar_async(
+    usuario_id: int,
+    clave: str,
+    ruta: str,
+    modelo,
+    status_code: int,
+    operacion: Callable[[AsyncSession], Awaitable[Any]]
+) -> JSONResponse:
+    """Versión para rutas async: el reclamo y las esperas van a un hilo."""
+    turno = await anyio.to_thread.run_sync(_esperar_turno, usuario_id, clave, ruta)
+    if isinstance(turno, RespuestaGuardada):
+        return _responder(turno, ruta, repetida=True)
+
+    externa = AsyncSessionLocal()
+    try:
+        db = AsyncSessionLocal(
+            bind=await externa.connection(),
+            join_transaction_mode="create_savepoint",
+            info={SESION_EXTERNA: externa.sync_session}
+        )
+        try:
+            contenido = _serializar(await operacion(db), modelo)
+        finally:
+            await db.close()
+
+        guardada, sentencia = _completar(turno, ruta, status_code, contenido)
+        if (await externa.execute(sentencia)).rowcount == 0:
+            _sin_reclamo()
+
+        await externa.commit()
+
+    except BaseException:
+        await externa.rollback()
+        await anyio.to_thread.run_sync(soltar, turno)
+        raise
+    finally:
+        await externa.close()
+
+    _recordar((usuario_id, clave), guardada)
+    return _responder(guardada, ruta, repetida=False)
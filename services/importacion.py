@@ -0,0 +1,84 @@
+# ============================================
+# services/importacion.py
+# Lectura de archivos de importación (CSV o JSON).
+#
+# - JSON: un arreglo de objetos
+# - CSV: primera fila con los nombres de los campos,
+#   separador "," o ";" (Excel en español), BOM opcional
+# - Las celdas vacías del CSV se omiten: aplica el valor
+#   por defecto del esquema
+# - Cada registro se valida por separado; los errores se
+#   devuelven por fila, no abortan el archivo
+# ============================================
+
+import csv
+import io
+from typing import Type
+
+import orjson
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+
+def _leer_csv(cuerpo: bytes) -> list[dict]:
+    try:
+        texto = cuerpo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(400, "El CSV debe estar en UTF-8")
+
+    encabezado = texto.split("\n", 1)[0]
+    separador = ";" if encabezado.count(";") > encabezado.count(",") else ","
+
+    lector = csv.DictReader(io.StringIO(texto, newline=""), delimiter=separador)
+
+    return [
+        {
+            campo.strip(): valor.strip()
+            for campo, valor in fila.items()
+            if campo and valor is not None and valor.strip() != ""
+        }
+        for fila in lector
+    ]
+
+
+def _leer_json(cuerpo: bytes) -> list:
+    try:
+        datos = orjson.loads(cuerpo)
+    except orjson.JSONDecodeError:
+        raise HTTPException(400, "JSON inválido")
+
+    if not isinstance(datos, list):
+        raise HTTPException(400, "Se esperaba un arreglo JSON de registros")
+
+    return datos
+
+
+def leer_registros(cuerpo: bytes, content_type: str | None) -> list:
+    """Registros crudos del archivo según el Content-Type (text/csv o JSON)."""
+    tipo = (content_type or "").split(";")[0].strip().lower()
+
+    if tipo in ("text/csv", "application/csv"):
+        return _leer_csv(cuerpo)
+
+    return _leer_json(cuerpo)
+
+
+def validar_registros(
+    registros: list, esquema: Type[BaseModel]
+) -> tuple[list[tuple[int, BaseModel]], dict[int, str]]:
+    """
+    Valida cada registro con el esquema.
+    Devuelve ([(indice, modelo)], {indice: mensaje de error}).
+    """
+    validos, errores = [], {}
+
+    for indice, registro in enumerate(registros):
+        try:
+            validos.append((indice, esquema.model_validate(registro)))
+        except ValidationError as e:
+            errores[indice] = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc']) or 'registro'}: {err['msg']}"
+                for err in e.errors()
+            )
+
+    return validos, errores
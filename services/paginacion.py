@@ -0,0 +1,115 @@
+# ============================================
+# services/paginacion.py
+# Paginación por keyset (sobre id) de los listados.
+#
+# - limit / cursor en la query string
+# - El cursor es opaco (base64 del último id entregado)
+# - El siguiente cursor viaja en la cabecera X-Siguiente-Cursor;
+#   si no viene, no hay más páginas
+# - Listados ordenados por otra columna: keyset sobre (valor, id)
+#   con paginar_por; el cursor lleva los dos
+# ============================================
+
+import base64
+import binascii
+import json
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+LIMITE_DEFECTO = int(os.getenv("PAGINA_LIMITE_DEFECTO", "100"))
+LIMITE_MAXIMO = int(os.getenv("PAGINA_LIMITE_MAXIMO", "1000"))
+
+CABECERA_CURSOR = "X-Siguiente-Cursor"
+
+
+def codificar_cursor(ultimo_id: int, valor=None) -> str:
+    datos = {"id": ultimo_id} if valor is None else {"id": ultimo_id, "v": valor}
+    crudo = json.dumps(datos, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def _leer_cursor(cursor: str, con_valor: bool = False) -> dict:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+
+        posicion = {"id": int(datos["id"])}
+        if con_valor:
+            posicion["v"] = int(datos["v"])
+        return posicion
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido.")
+
+
+def decodificar_cursor(cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+
+    return _leer_cursor(cursor)["id"]
+
+
+def paginar(query, columna_id, limit: int, cursor: str | None, descendente: bool = False):
+    """
+    Aplica el keyset a la consulta y trae limit + 1 filas para saber
+    si hay otra página. Devuelve (items, siguiente_cursor | None).
+    """
+    ultimo_id = decodificar_cursor(cursor)
+
+    if ultimo_id is not None:
+        query = query.filter(columna_id < ultimo_id if descendente else columna_id > ultimo_id)
+
+    orden = columna_id.desc() if descendente else columna_id.asc()
+    filas = query.order_by(orden).limit(limit + 1).all()
+
+    if len(filas) <= limit:
+        return filas, None
+
+    filas = filas[:limit]
+    return filas, codificar_cursor(filas[-1].id)
+
+
+def paginar_por(
+    query,
+    expresion,
+    campo: str,
+    columna_id,
+    limit: int,
+    cursor: str | None,
+    descendente: bool = False
+):
+    """
+    Keyset sobre (expresion, id) para listados ordenados por una
+    columna entera no única. campo es el nombre con que la expresión viene
+    en cada fila; su valor de la última fila viaja en el cursor.
+    Devuelve (items, siguiente_cursor | None).
+    """
+    if cursor:
+        posicion = _leer_cursor(cursor, con_valor=True)
+        valor, ultimo_id = posicion["v"], posicion["id"]
+
+        if descendente:
+            query = query.filter(or_(
+                expresion < valor,
+                and_(expresion == valor, columna_id < ultimo_id)
+            ))
+        else:
+            query = query.filter(or_(
+                expresion > valor,
+                and_(expresion == valor, columna_id > ultimo_id)
+            ))
+
+    if descendente:
+        query = query.order_by(expresion.desc(), columna_id.desc())
+    else:
+        query = query.order_by(expresion.asc(), columna_id.asc())
+
+    filas = query.limit(limit + 1).all()
+
+    if len(filas) <= limit:
+        return filas, None
+
+    filas = filas[:limit]
+    ultima = filas[-1]
+    return filas, codificar_cursor(ultima.id, getattr(ultima, campo))
@@ -0,0 +1,145 @@
+# ============================================
+# services/periodo_service.py
+# Caché de proceso del período (anio, mes) vigente.
+#
+# - El estado abierto / cerrado de cada período vive en memoria
+# - Solo se refresca cuando obtener_fecha_actual() cruza de mes
+# - El rollover (sincronizar_mes_actual) corre UNA vez, en segundo
+#   plano, y no dentro de la petición que llega primero
+# - Cada cliente pasa por cierre_mensual_automatico una sola vez
+#   por período y por proceso; la marca se pone cuando la
+#   transacción que hizo el cierre confirma (un rollback lo repite)
+# - En enero el rollover lanza el cierre anual del año anterior
+#   (services/cierre_anual.py)
+# ============================================
+
+import threading
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from crud.crud_resumen import sincronizar_mes_actual
+from services import cierre_anual
+from services.resumen_buffer import SESION_EXTERNA
+
+# Clave en session.info con los clientes cerrados en la transacción
+_CLAVE_SESION = "clientes_sincronizados"
+
+_lock = threading.Lock()
+
+_periodo_actual: tuple[int, int] | None = None
+_estados: dict[tuple[int, int], str] = {}
+_clientes_sincronizados: set[tuple[int, int, int]] = set()
+_rollover: threading.Thread | None = None
+
+
+# ======================================================
+# PERÍODO VIGENTE
+# ======================================================
+def asegurar_periodo(fecha: date) -> tuple[int, int]:
+    """
+    Devuelve (anio, mes) de la fecha. Sin consultas a la BD mientras el
+    período no cambie; al cruzar de mes lanza el rollover en segundo plano.
+    """
+    periodo = (fecha.year, fecha.month)
+
+    if periodo == _periodo_actual:
+        return periodo
+
+    with _lock:
+        if periodo != _periodo_actual:
+            _cambiar_periodo(periodo)
+
+    return periodo
+
+
+def _cambiar_periodo(periodo: tuple[int, int]):
+    global _periodo_actual, _rollover
+
+    if _periodo_actual is not None:
+        _estados[_periodo_actual] = "cerrado"
+
+    _estados[periodo] = "abierto"
+    _periodo_actual = periodo
+
+    # Los clientes deben volver a pasar por el cierre mensual
+    _clientes_sincronizados.clear()
+
+    _rollover = threading.Thread(
+        target=_ejecutar_rollover,
+        args=(periodo,),
+        name=f"rollover-{periodo[0]}-{periodo[1]:02d}",
+        daemon=True
+    )
+    _rollover.start()
+
+
+def _ejecutar_rollover(periodo: tuple[int, int]):
+    global _periodo_actual
+
+    db = SessionLocal()
+    try:
+        sincronizar_mes_actual(db)
+
+        # Enero: cierre anual del año anterior, por bloques en segundo plano
+        if periodo[1] == 1:
+            cierre_anual.iniciar(periodo[0] - 1)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en rollover del período {periodo}: {e}")
+
+        # La próxima petición vuelve a intentarlo
+        with _lock:
+            if _periodo_actual == periodo:
+                _periodo_actual = None
+    finally:
+        db.close()
+
+
+def esperar_rollover(timeout: float | None = None):
+    """Espera a que termine el rollover en curso (scripts y apagado)."""
+    hilo = _rollover
+    if hilo is not None:
+        hilo.join(timeout)
+
+
+def estado_periodo(anio: int, mes: int) -> str | None:
+    """Estado en caché del período, o None si este proceso no lo conoce."""
+    return _estados.get((anio, mes))
+
+
+# ======================================================
+# CIERRE MENSUAL POR CLIENTE
+# ======================================================
+def cliente_sincronizado(cliente_id: int, fecha: date) -> bool:
+    return (cliente_id, fecha.year, fecha.month) in _clientes_sincronizados
+
+
+def marcar_cliente_sincronizado(db: Session, cliente_id: int, fecha: date):
+    """
+    cierre_mensual_automatico no hace commit: la marca queda en la
+    sesión y se publica cuando su transacción confirma.
+    """
+    db.info.setdefault(_CLAVE_SESION, set()).add((cliente_id, fecha.year, fecha.month))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _confirmar(session: Session):
+    marcas = session.info.pop(_CLAVE_SESION, None)
+    if not marcas:
+        return
+
+    # Su commit fue un savepoint: se publican con la transacción externa
+    externa = session.info.get(SESION_EXTERNA)
+    if externa is not None:
+        externa.info.setdefault(_CLAVE_SESION, set()).update(marcas)
+        return
+
+    _clientes_sincronizados.update(marcas)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar(session: Session):
+    session.info.pop(_CLAVE_SESION, None)
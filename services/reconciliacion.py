@@ -0,0 +1,430 @@
+# ============================================
+# services/reconciliacion.py
+# Reconstrucción / reconciliación de resúmenes a partir de
+# los movimientos (salidas, entradas, ajustes).
+#
+# - Los contadores se recalculan con GROUP BY en la BD
+#   (cliente, año, mes) por bloques de clientes; solo viajan
+#   agregados y tuplas de columnas, nunca objetos ORM por fila
+# - Los saldos se rehacen hacia atrás desde el saldo vivo del
+#   cliente: saldo_final(mes) = saldo efectivo - neto de los meses
+#   posteriores. Los meses de relleno (antes del primer período
+#   con actividad y los futuros) no se tocan
+# - Modo reporte (por defecto) o reparación (--reparar): un
+#   UPDATE por fila distinta, un commit por bloque
+#
+# Uso:
+#   python -m services.reconciliacion
+#   python -m services.reconciliacion --reparar [--lote 500] [--cliente ID]
+#
+# ⚠️ Con RESUMEN_WRITE_BEHIND=1 la reparación debe correr con la
+#    app detenida: los deltas sin volcar de otro proceso no se ven.
+#    La excepción es reparar_cerrados (meses ya cerrados), que usa el
+#    volcado del buffer con la app en marcha.
+# ============================================
+
+import argparse
+import os
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.ajuste_model import Ajuste
+from models.cliente_model import Cliente
+from models.entrada_model import Entrada
+from models.reserva_model import ReservaFolios
+from models.resumen_anual_model import ResumenAnual
+from models.resumen_mensual_model import ResumenMensual
+from models.salida_model import Salida
+from crud.crud_resumen import COLUMNAS_SALIDA
+from services import resumen_buffer
+from services.time_service import obtener_fecha_actual
+
+RECONCILIACION_LOTE = int(os.getenv("RECONCILIACION_LOTE", "500"))
+
+# Máximo de diferencias que se guardan como muestra en el informe
+MUESTRA_DIFERENCIAS = 200
+
+CONTADORES = (*COLUMNAS_SALIDA.values(), "total_entradas", "total_ajustes")
+SALDOS = ("saldo_inicial", "saldo_final")
+COLUMNAS = (*CONTADORES, *SALDOS)
+
+
+# ======================================================
+# AGREGADOS DE MOVIMIENTOS (GROUP BY en la BD)
+# ======================================================
+def _por_mes(columna_fecha):
+    return func.extract("year", columna_fecha), func.extract("month", columna_fecha)
+
+
+def _movimientos(db: Session, desde_id: int, hasta_id: int):
+    """
+    contadores: (cliente_id, anio, mes) → {columna: total}
+    netos:      cliente_id → {(anio, mes): efecto en el saldo}
+    """
+    contadores = defaultdict(lambda: dict.fromkeys(CONTADORES, 0))
+    netos = defaultdict(lambda: defaultdict(int))
+
+    anio, mes = _por_mes(Salida.fecha_documento)
+    salidas = db.execute(
+        select(Salida.cliente_id, anio, mes, Salida.tipo_documento, func.sum(Salida.cantidad))
+        .where(Salida.cliente_id.between(desde_id, hasta_id))
+        .group_by(Salida.cliente_id, anio, mes, Salida.tipo_documento)
+    )
+    for cliente_id, a, m, tipo, total in salidas:
+        clave = (int(a), int(m))
+        contadores[(cliente_id, *clave)][COLUMNAS_SALIDA[tipo.value]] += int(total)
+        netos[cliente_id][clave] -= int(total)
+
+    for modelo, columna in ((Entrada, "total_entradas"), (Ajuste, "total_ajustes")):
+        anio, mes = _por_mes(modelo.fecha)
+        filas = db.execute(
+            select(modelo.cliente_id, anio, mes, func.sum(modelo.cantidad))
+            .where(modelo.cliente_id.between(desde_id, hasta_id))
+            .group_by(modelo.cliente_id, anio, mes)
+        )
+        for cliente_id, a, m, total in filas:
+            clave = (int(a), int(m))
+            contadores[(cliente_id, *clave)][columna] += int(total)
+            netos[cliente_id][clave] += int(total)
+
+    return contadores, netos
+
+
+def _saldos(db: Session, desde_id: int, hasta_id: int) -> dict[int, tuple[int, int]]:
+    """cliente_id → (saldo_actual, saldo efectivo con folios reservados sin usar)."""
+    reservados = (
+        select(func.coalesce(func.sum(ReservaFolios.cantidad - ReservaFolios.consumidos), 0))
+        .where(ReservaFolios.cliente_id == Cliente.id, ReservaFolios.estado == "activa")
+        .scalar_subquery()
+    )
+
+    return {
+        cliente_id: (saldo, saldo + reserva)
+        for cliente_id, saldo, reserva in db.execute(
+            select(Cliente.id, Cliente.saldo_actual, reservados)
+            .where(Cliente.id.between(desde_id, hasta_id))
+        )
+    }
+
+
+# ======================================================
+# FILAS GUARDADAS
+# ======================================================
+def _guardadas(db: Session, modelo, desde_id: int, hasta_id: int, bloquear: bool):
+    columnas = [modelo.id, modelo.cliente_id, modelo.anio, modelo.estado]
+    if modelo is ResumenMensual:
+        columnas.append(ResumenMensual.mes)
+
+    consulta = (
+        select(*columnas, *(getattr(modelo, c) for c in COLUMNAS))
+        .where(modelo.cliente_id.between(desde_id, hasta_id))
+    )
+    # Reparación: las salidas concurrentes esperan a que termine el bloque
+    # y suman sobre el valor reconstruido
+    if bloquear:
+        consulta = consulta.with_for_update()
+
+    return db.execute(consulta).all()
+
+
+# ======================================================
+# VALORES ESPERADOS
+# ======================================================
+def _saldos_esperados(mensuales, netos: dict, saldo_actual: int, efectivo: int, actual: tuple[int, int]):
+    """
+    (anio, mes) → (saldo_inicial, saldo_final) de los meses vividos del
+    cliente: desde el primero con movimientos o saldo hasta el actual.
+    None = ese saldo no se revisa.
+    """
+    vividos = [(f.anio, f.mes) for f in mensuales if f.saldo_inicial or f.saldo_final]
+    vividos += list(netos)
+    if not vividos:
+        return {}
+
+    primero = min(vividos)
+    meses = sorted(
+        {(f.anio, f.mes) for f in mensuales} | set(netos),
+        reverse=True
+    )
+
+    esperados = {}
+    posteriores = 0  # neto de los meses ya recorridos (posteriores)
+
+    for clave in meses:
+        if clave > actual:
+            continue
+        if clave < primero:
+            break
+
+        saldo_final = efectivo - posteriores
+        neto = netos.get(clave, 0)
+        esperados[clave] = (saldo_final - neto, saldo_final)
+        posteriores += neto
+
+    # El mes en curso sigue la convención de la app: saldo_final = saldo_actual.
+    # Con folios reservados depende de la última operación (reserva o
+    # consumo): mientras la reserva siga activa no se revisa
+    if actual in esperados:
+        final = saldo_actual if efectivo == saldo_actual else None
+        esperados[actual] = (esperados[actual][0], final)
+
+    return esperados
+
+
+def _agregar_saldos(esperado: dict, inicial: int | None, final: int | None):
+    if inicial is not None:
+        esperado["saldo_inicial"] = inicial
+    if final is not None:
+        esperado["saldo_final"] = final
+
+
+def _comparar(tabla: str, fila, esperado: dict, informe: dict) -> bool:
+    distinta = False
+
+    for columna, valor in esperado.items():
+        guardado = getattr(fila, columna) or 0
+        if guardado == valor:
+            continue
+
+        distinta = True
+        informe["diferencias"] += 1
+        if len(informe["muestra"]) < MUESTRA_DIFERENCIAS:
+            informe["muestra"].append({
+                "tabla": tabla,
+                "cliente_id": fila.cliente_id,
+                "anio": fila.anio,
+                "mes": getattr(fila, "mes", None),
+                "columna": columna,
+                "guardado": guardado,
+                "esperado": valor,
+            })
+
+    return distinta
+
+
+# ======================================================
+# UN BLOQUE DE CLIENTES
+# ======================================================
+def _reconciliar_bloque(
+    db: Session,
+    desde_id: int,
+    hasta_id: int,
+    actual: tuple[int, int],
+    reparar: bool,
+    informe: dict,
+    cerrados: set[tuple[int, int]] | None = None
+):
+    """cerrados: solo se revisan esos meses (y su año) si están cerrados."""
+    anios_cerrados = {anio for anio, _ in cerrados} if cerrados is not None else None
+
+    mensuales = _guardadas(db, ResumenMensual, desde_id, hasta_id, reparar)
+    anuales = _guardadas(db, ResumenAnual, desde_id, hasta_id, reparar)
+    contadores, netos = _movimientos(db, desde_id, hasta_id)
+    saldos = _saldos(db, desde_id, hasta_id)
+
+    mensuales_por_cliente = defaultdict(list)
+    for fila in mensuales:
+        mensuales_por_cliente[fila.cliente_id].append(fila)
+
+    correcciones_mes = []
+    saldos_anio = {}  # (cliente_id, anio) → (saldo_inicial, saldo_final)
+
+    for cliente_id, filas in mensuales_por_cliente.items():
+        saldo_actual, efectivo = saldos.get(cliente_id, (0, 0))
+        esperados_saldo = _saldos_esperados(filas, netos.get(cliente_id, {}), saldo_actual, efectivo, actual)
+
+        for fila in filas:
+            clave = (fila.anio, fila.mes)
+            if cerrados is not None and (fila.estado != "cerrado" or clave not in cerrados):
+                continue
+
+            esperado = dict(contadores.get((cliente_id, *clave)) or dict.fromkeys(CONTADORES, 0))
+
+            if clave in esperados_saldo:
+                _agregar_saldos(esperado, *esperados_saldo[clave])
+
+            if _comparar("resumen_mensual", fila, esperado, informe):
+                correcciones_mes.append({"_id": fila.id, **esperado})
+
+        for (anio, mes), (inicial, final) in sorted(esperados_saldo.items()):
+            previo = saldos_anio.get((cliente_id, anio))
+            saldos_anio[(cliente_id, anio)] = (previo[0] if previo else inicial, final)
+
+    # Anual = suma de los meses del año
+    totales_anio = defaultdict(lambda: dict.fromkeys(CONTADORES, 0))
+    for (cliente_id, anio, _), valores in contadores.items():
+        for columna, total in valores.items():
+            totales_anio[(cliente_id, anio)][columna] += total
+
+    correcciones_anio = []
+    for fila in anuales:
+        if anios_cerrados is not None and (fila.estado != "cerrado" or fila.anio not in anios_cerrados):
+            continue
+
+        clave = (fila.cliente_id, fila.anio)
+        esperado = dict(totales_anio.get(clave) or dict.fromkeys(CONTADORES, 0))
+
+        if clave in saldos_anio:
+            _agregar_saldos(esperado, *saldos_anio[clave])
+
+        if _comparar("resumen_anual", fila, esperado, informe):
+            correcciones_anio.append({"_id": fila.id, **esperado})
+
+    # Movimientos en períodos sin fila de resumen: se informan, no se crean
+    con_fila = {(f.cliente_id, f.anio, f.mes) for f in mensuales}
+    for clave in contadores:
+        if clave not in con_fila and len(informe["sin_resumen"]) < MUESTRA_DIFERENCIAS:
+            informe["sin_resumen"].append(clave)
+
+    informe["clientes"] += len(saldos)
+    informe["filas_revisadas"] += len(mensuales) + len(anuales)
+    informe["filas_distintas"] += len(correcciones_mes) + len(correcciones_anio)
+
+    if reparar:
+        for modelo, correcciones in ((ResumenMensual, correcciones_mes), (ResumenAnual, correcciones_anio)):
+            _aplicar(db, modelo, correcciones)
+        informe["filas_reparadas"] += len(correcciones_mes) + len(correcciones_anio)
+        db.commit()
+    else:
+        db.rollback()
+
+
+def _aplicar(db: Session, modelo, correcciones: list[dict]):
+    """Un executemany por juego de columnas; version sube por el onupdate."""
+    # executemany necesita las mismas claves en cada fila
+    grupos = defaultdict(list)
+    for correccion in correcciones:
+        grupos[tuple(correccion)].append(correccion)
+
+    tabla = modelo.__table__
+
+    for claves, grupo in grupos.items():
+        db.execute(
+            update(tabla)
+            .where(tabla.c.id == bindparam("_id"))
+            .values({c: bindparam(c) for c in claves if c != "_id"}),
+            grupo
+        )
+
+
+def _informe(reparar: bool) -> dict:
+    return {
+        "modo": "reparar" if reparar else "reporte",
+        "clientes": 0,
+        "filas_revisadas": 0,
+        "filas_distintas": 0,
+        "filas_reparadas": 0,
+        "diferencias": 0,
+        "muestra": [],
+        "sin_resumen": [],
+    }
+
+
+# ======================================================
+# RECONCILIACIÓN COMPLETA
+# ======================================================
+def reconciliar(
+    reparar: bool = False,
+    lote: int = RECONCILIACION_LOTE,
+    cliente_id: int | None = None,
+    hoy: date | None = None
+) -> dict:
+    """
+    Recorre los clientes por bloques de `lote` ids, compara los resúmenes
+    con lo que dicen los movimientos y, con reparar=True, los corrige.
+    Devuelve el informe (conteos + muestra de diferencias).
+    """
+    hoy = hoy or obtener_fecha_actual()
+    actual = (hoy.year, hoy.month)
+
+    # Los deltas write-behind de este proceso deben estar en la BD
+    if resumen_buffer.activo():
+        resumen_buffer.flush()
+
+    informe = _informe(reparar)
+
+    db = SessionLocal()
+    try:
+        ultimo_id = 0
+
+        while True:
+            consulta = select(Cliente.id).where(Cliente.id > ultimo_id).order_by(Cliente.id).limit(lote)
+            if cliente_id is not None:
+                consulta = consulta.where(Cliente.id == cliente_id)
+
+            ids = db.execute(consulta).scalars().all()
+            db.rollback()
+
+            if not ids:
+                break
+
+            _reconciliar_bloque(db, ids[0], ids[-1], actual, reparar, informe)
+            ultimo_id = ids[-1]
+
+        return informe
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+
+# ======================================================
+# MESES CERRADOS (deltas write-behind tardíos)
+# ======================================================
+def reparar_cerrados(cliente_id: int, periodos: set[tuple[int, int]], hoy: date | None = None) -> dict:
+    """
+    Rehace desde los movimientos solo los resúmenes cerrados de `periodos`
+    ({(anio, mes)}) del cliente, y su año si también está cerrado.
+    Lo llama resumen_buffer.flush() cuando un delta llega a un mes que
+    se cerró antes del volcado. Una fila cerrada ya no recibe
+    movimientos ni deltas: se puede reparar con la app en marcha y
+    repetirlo desde otro worker da el mismo resultado.
+    """
+    hoy = hoy or obtener_fecha_actual()
+    informe = _informe(True)
+
+    db = SessionLocal()
+    try:
+        _reconciliar_bloque(db, cliente_id, cliente_id, (hoy.year, hoy.month), True, informe, periodos)
+        return informe
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconciliar resúmenes con los movimientos")
+    parser.add_argument("--reparar", action="store_true", help="Corregir las diferencias (por defecto solo informa)")
+    parser.add_argument("--lote", type=int, default=RECONCILIACION_LOTE, help="Clientes por bloque")
+    parser.add_argument("--cliente", type=int, default=None, help="Solo este cliente_id")
+    args = parser.parse_args()
+
+    resultado = reconciliar(args.reparar, args.lote, args.cliente)
+
+    for diferencia in resultado["muestra"]:
+        print(
+            f"  {diferencia['tabla']} cliente={diferencia['cliente_id']} "
+            f"{diferencia['anio']}/{diferencia['mes'] or '-'} {diferencia['columna']}: "
+            f"{diferencia['guardado']} → {diferencia['esperado']}"
+        )
+
+    for cliente, anio, mes in resultado["sin_resumen"]:
+        print(f"  ⚠️ cliente={cliente} {anio}/{mes}: movimientos sin resumen mensual")
+
+    print(
+        f"✅ {resultado['modo']}: {resultado['clientes']} clientes, "
+        f"{resultado['filas_revisadas']} filas revisadas, "
+        f"{resultado['filas_distintas']} distintas ({resultado['diferencias']} valores), "
+        f"{resultado['filas_reparadas']} reparadas"
+    )
@@ -0,0 +1,287 @@
+# ============================================
+# services/reserva_service.py
+# Consumo en memoria de las reservas de folios.
+#
+# - Una salida contra una reserva solo descuenta un contador en
+#   memoria; no toca clientes.saldo_actual ni bloquea filas
+# - Un hilo vuelca las salidas pendientes de cada reserva cada
+#   RESERVA_VENTANA_MS en UNA transacción (crud_reservas.registrar_consumos)
+#   y recién entonces responde a cada petición
+# - Las reservas vencidas se cierran cada RESERVA_REVISION segundos
+#   y sus folios no usados vuelven al saldo
+# - El contador en memoria es solo un filtro rápido: se fija desde la
+#   BD (cantidad - consumidos) al cargar la reserva y tras cada
+#   volcado, porque otro worker puede consumir la misma reserva
+# ============================================
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from schemas.salida_schema import SalidaCreate
+
+RESERVA_VENTANA_MS = float(os.getenv("RESERVA_VENTANA_MS", "10"))
+RESERVA_REVISION = float(os.getenv("RESERVA_REVISION", "5"))
+
+
+class _Reserva:
+
+    def __init__(self, reserva_id: int, cliente_id: int, restante: int, expira: datetime):
+        self.id = reserva_id
+        self.cliente_id = cliente_id
+        self.restante = restante
+        self.expira = expira
+        self.cerrada = False
+        self.pendientes: list[tuple[SalidaCreate, Future]] = []
+        self.claves: set[tuple] = set()
+        # Serializa los volcados de la reserva con su cierre
+        self.volcado = threading.Lock()
+
+
+_lock = threading.Lock()
+_reservas: dict[int, _Reserva] = {}
+
+_hay_trabajo = threading.Event()
+_detener = threading.Event()
+_arranque = threading.Lock()
+_hilo: threading.Thread | None = None
+
+
+# ======================================================
+# REGISTRO EN MEMORIA
+# ======================================================
+def registrar(reserva) -> None:
+    """Publica en memoria una reserva recién creada o cargada de la BD."""
+    with _lock:
+        if reserva.id not in _reservas:
+            _reservas[reserva.id] = _Reserva(
+                reserva.id, reserva.cliente_id, reserva.cantidad - reserva.consumidos, reserva.expira
+            )
+
+
+def _obtener(db: Session, reserva_id: int) -> _Reserva | None:
+    from crud.crud_reservas import obtener_reserva
+
+    with _lock:
+        reserva = _reservas.get(reserva_id)
+    if reserva is not None:
+        return reserva
+
+    fila = obtener_reserva(db, reserva_id)
+    if fila is None or fila.estado != "activa":
+        return None
+
+    registrar(fila)
+    with _lock:
+        return _reservas.get(reserva_id)
+
+
+# ======================================================
+# CONSUMO
+# ======================================================
+def consumir(db: Session, reserva_id: int, data: SalidaCreate, cliente_id: int | None = None) -> Future:
+    """
+    Aparta un folio de la reserva para la salida. El future se resuelve
+    con el resultado cuando el lote se escribe en la BD.
+    cliente_id (usuarios no admin) limita la reserva a ese cliente.
+    """
+    futuro: Future = Future()
+    reserva = _obtener(db, reserva_id)
+
+    if reserva is None or (cliente_id is not None and reserva.cliente_id != cliente_id):
+        futuro.set_result({"estado": "RECHAZADO", "mensaje": "La reserva no existe o no está activa."})
+        return futuro
+
+    clave = (data.tipo_documento, data.numero_documento)
+
+    with _lock:
+        if reserva.cerrada or reserva.expira <= datetime.utcnow():
+            futuro.set_result({"estado": "RECHAZADO", "mensaje": "La reserva venció."})
+            return futuro
+
+        if clave in reserva.claves:
+            futuro.set_result({
+                "estado": "APROBADO",
+                "mensaje": "Documento duplicado. No se descontó folio."
+            })
+            return futuro
+
+        if reserva.restante <= 0:
+            futuro.set_result({"estado": "RECHAZADO", "mensaje": "La reserva no tiene folios disponibles."})
+            return futuro
+
+        reserva.restante -= 1
+        reserva.claves.add(clave)
+        reserva.pendientes.append((data, futuro))
+
+    # Siempre por el hilo de volcado: consumir corre en el event loop
+    # (run_sync) y un volcado aquí lo bloquearía. Sin app (scripts)
+    # el hilo se arranca en el primer consumo
+    if _hilo is None:
+        _arrancar()
+    _hay_trabajo.set()
+
+    return futuro
+
+
+# ======================================================
+# VOLCADO
+# ======================================================
+def _volcar(reserva: _Reserva):
+    from crud.crud_reservas import registrar_consumos
+
+    with reserva.volcado:
+        with _lock:
+            lote, reserva.pendientes = reserva.pendientes, []
+            reserva.claves = set()
+
+        if not lote:
+            return
+
+        items = [data for data, _ in lote]
+
+        db = SessionLocal()
+        try:
+            try:
+                resultados, restante = registrar_consumos(db, reserva.id, items)
+            except IntegrityError:
+                # Documento registrado en paralelo por otra vía: se reintenta
+                # una vez y la consulta de duplicados lo detecta
+                db.rollback()
+                resultados, restante = registrar_consumos(db, reserva.id, items)
+
+            # La BD manda: lo que le queda a la reserva menos lo apartado
+            # mientras se escribía este lote
+            with _lock:
+                if restante is None:
+                    reserva.cerrada = True
+                    reserva.restante = 0
+                else:
+                    reserva.restante = restante - len(reserva.pendientes)
+
+            for (_, futuro), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
+
+        except Exception as e:
+            db.rollback()
+            with _lock:
+                reserva.restante += len(lote)
+            for _, futuro in lote:
+                futuro.set_exception(e)
+
+        finally:
+            db.close()
+
+
+def volcar_todo():
+    with _lock:
+        reservas = [r for r in _reservas.values() if r.pendientes]
+
+    for reserva in reservas:
+        _volcar(reserva)
+
+
+# ======================================================
+# LIBERAR / VENCER
+# ======================================================
+def liberar(db: Session, reserva_id: int, estado: str = "liberada"):
+    """Vuelca lo pendiente, cierra la reserva y devuelve lo no usado."""
+    from crud.crud_reservas import cerrar_reserva
+
+    with _lock:
+        reserva = _reservas.get(reserva_id)
+        if reserva is not None:
+            reserva.cerrada = True
+
+    if reserva is not None:
+        _volcar(reserva)
+
+    fila = cerrar_reserva(db, reserva_id, estado)
+
+    with _lock:
+        _reservas.pop(reserva_id, None)
+
+    return fila
+
+
+def vencer_reservas() -> int:
+    from crud.crud_reservas import reservas_vencidas
+
+    db = SessionLocal()
+    try:
+        vencidas = reservas_vencidas(db)
+        for reserva_id in vencidas:
+            liberar(db, reserva_id, estado="vencida")
+        return len(vencidas)
+    finally:
+        db.close()
+
+
+def _ciclo():
+    ultima_revision = 0.0
+
+    while not _detener.is_set():
+        if _hay_trabajo.wait(RESERVA_REVISION):
+            # Ventana para juntar más salidas en el mismo lote
+            time.sleep(RESERVA_VENTANA_MS / 1000)
+        _hay_trabajo.clear()
+
+        try:
+            volcar_todo()
+
+            if time.monotonic() - ultima_revision >= RESERVA_REVISION:
+                vencer_reservas()
+                ultima_revision = time.monotonic()
+
+        except Exception as e:
+            print(f"❌ Error en reservas de folios: {e}")
+
+    volcar_todo()
+
+
+# ======================================================
+# ARRANQUE / PARADA
+# ======================================================
+def iniciar():
+    """Carga las reservas activas y arranca el hilo de volcado."""
+    from crud.crud_reservas import reservas_activas
+
+    if _hilo is not None:
+        return
+
+    db = SessionLocal()
+    try:
+        for reserva in reservas_activas(db):
+            registrar(reserva)
+    finally:
+        db.close()
+
+    _arrancar()
+
+
+def _arrancar():
+    global _hilo
+
+    with _arranque:
+        if _hilo is not None:
+            return
+
+        _detener.clear()
+        _hilo = threading.Thread(target=_ciclo, name="reservas-folios", daemon=True)
+        _hilo.start()
+
+
+def detener():
+    global _hilo
+
+    _detener.set()
+    _hay_trabajo.set()
+    if _hilo is not None:
+        _hilo.join()
+        _hilo = None
@@ -0,0 +1,329 @@
+# ============================================
+# services/resumen_buffer.py
+# Modo write-behind (opcional) de los contadores de resúmenes.
+#
+# Con RESUMEN_WRITE_BEHIND=1 los incrementos de sumar_salida,
+# sumar_entrada y sumar_ajuste no tocan resumen_mensual /
+# resumen_anual en la petición: se acumulan por
+# (cliente_id, anio, mes, columna) y se vuelcan con UPDATEs
+# "col = col + delta" cada RESUMEN_FLUSH_INTERVALO segundos
+# y al apagar la app.
+#
+# - Los deltas de una sesión solo pasan al buffer global
+#   cuando su transacción hace commit (un rollback los descarta)
+# - Una sesión unida a una transacción externa (idempotencia)
+#   los pasa a la sesión dueña: llegan al buffer con su commit
+# - Las lecturas de resúmenes suman los deltas no volcados de
+#   ESTE proceso: con varios workers (uvicorn --workers N) los
+#   totales fusionados son exactos solo dentro de un worker; los
+#   deltas de los otros aparecen tras su volcado
+#   (≤ RESUMEN_FLUSH_INTERVALO)
+# - El volcado nunca escribe en un mes cerrado: si el mes se
+#   cerró antes del volcado, el delta va al año (si sigue
+#   abierto) y el mes se rehace desde los movimientos
+#   (reconciliacion.reparar_cerrados)
+# ============================================
+
+import os
+import threading
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.cliente_model import Cliente
+
+RESUMEN_WRITE_BEHIND = os.getenv("RESUMEN_WRITE_BEHIND", "0") == "1"
+RESUMEN_FLUSH_INTERVALO = float(os.getenv("RESUMEN_FLUSH_INTERVALO", "1"))
+
+# Clave en session.info con los deltas aún no confirmados
+_CLAVE_SESION = "resumen_deltas"
+# Clave en session.info con los deltas sacados del buffer y aplicados
+# en la transacción de la sesión (volcar_cliente)
+_CLAVE_TOMADOS = "resumen_tomados"
+# Clave en session.info con la sesión dueña de la transacción real
+SESION_EXTERNA = "sesion_externa"
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+# (cliente_id, anio, mes) → {columna: delta}
+_pendientes: dict[tuple[int, int, int], dict[str, int]] = {}
+
+_detener = threading.Event()
+_hilo: threading.Thread | None = None
+
+
+def activo() -> bool:
+    return RESUMEN_WRITE_BEHIND
+
+
+# ======================================================
+# ACUMULAR
+# ======================================================
+def acumular(db: Session, cliente_id: int, fecha: date, deltas: dict[str, int]):
+    """
+    Registra deltas en la sesión; pasan al buffer al hacer commit.
+    El llamador ya comprobó el período (crud_resumen.exigir_periodo_abierto).
+    """
+    locales = db.info.setdefault(_CLAVE_SESION, {})
+    _sumar(locales, (cliente_id, fecha.year, fecha.month), deltas)
+
+
+def _sumar(destino: dict, clave: tuple[int, int, int], deltas: dict[str, int]):
+    actuales = destino.setdefault(clave, {})
+    for columna, delta in deltas.items():
+        actuales[columna] = actuales.get(columna, 0) + delta
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _confirmar(session: Session):
+    locales = session.info.pop(_CLAVE_SESION, None)
+    tomados = session.info.pop(_CLAVE_TOMADOS, None)
+
+    # Su commit fue un savepoint: se confirman con la transacción externa
+    externa = session.info.get(SESION_EXTERNA)
+    if externa is not None:
+        for clave_info, origen in ((_CLAVE_SESION, locales), (_CLAVE_TOMADOS, tomados)):
+            destino = externa.info.setdefault(clave_info, {})
+            for clave, deltas in (origen or {}).items():
+                _sumar(destino, clave, deltas)
+        return
+
+    # Los tomados ya están escritos: solo los locales pasan al buffer
+    if not locales:
+        return
+
+    with _lock:
+        for clave, deltas in locales.items():
+            _sumar(_pendientes, clave, deltas)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar(session: Session):
+    session.info.pop(_CLAVE_SESION, None)
+
+    # Lo que se sacó del buffer y no llegó a la BD vuelve al buffer
+    tomados = session.info.pop(_CLAVE_TOMADOS, None)
+    if tomados:
+        with _lock:
+            for clave, deltas in tomados.items():
+                _sumar(_pendientes, clave, deltas)
+
+
+# ======================================================
+# LECTURA (deltas aún no volcados)
+# ======================================================
+def pendientes(cliente_id: int, anio: int, mes: int | None = None) -> dict[str, int]:
+    """Deltas pendientes del mes, o de todo el año si mes es None."""
+    resultado: dict[str, int] = {}
+
+    with _lock:
+        for (cid, a, m), deltas in _pendientes.items():
+            if cid == cliente_id and a == anio and (mes is None or m == mes):
+                for columna, delta in deltas.items():
+                    resultado[columna] = resultado.get(columna, 0) + delta
+
+    return resultado
+
+
+def fusionar(resumen, cliente_id: int, anio: int, mes: int | None = None):
+    """
+    Devuelve el resumen con los deltas pendientes sumados.
+    La fila se relee en una sesión aparte (fuera del snapshot de la
+    transacción del llamador, que no se toca) y se devuelve separada
+    de ella para que el ajuste nunca se escriba.
+    """
+    if resumen is None or not _pendientes:
+        return resumen
+
+    # Mientras no haya un volcado en curso, fila + deltas son consistentes
+    with _flush_lock:
+        deltas = pendientes(cliente_id, anio, mes)
+        if not deltas:
+            return resumen
+
+        lectura = SessionLocal()
+        try:
+            fresco = lectura.get(type(resumen), resumen.id)
+            saldo = lectura.execute(
+                select(Cliente.saldo_actual).where(Cliente.id == cliente_id)
+            ).scalar()
+            lectura.expunge(fresco)
+        finally:
+            lectura.close()
+
+    for columna, delta in deltas.items():
+        setattr(fresco, columna, (getattr(fresco, columna) or 0) + delta)
+
+    if fresco.estado != "cerrado":
+        fresco.saldo_final = saldo
+
+    return fresco
+
+
+# ======================================================
+# VOLCADO
+# ======================================================
+def volcar_cliente(db: Session, cliente_id: int):
+    """
+    Aplica en la transacción de `db` los deltas pendientes de un solo
+    cliente (restar_entrada necesita sus totales reales). No toca el
+    resto del buffer ni abre otra conexión: si `db` hace rollback,
+    los deltas vuelven al buffer.
+    """
+    from crud.crud_resumen import aplicar_deltas_resumen
+
+    with _lock:
+        propios = {
+            clave: _pendientes.pop(clave)
+            for clave in [c for c in _pendientes if c[0] == cliente_id]
+        }
+
+    if not propios:
+        return
+
+    # Registrados antes de escribir: un error a medias los devuelve con el rollback
+    tomados = db.info.setdefault(_CLAVE_TOMADOS, {})
+    for clave, deltas in propios.items():
+        _sumar(tomados, clave, deltas)
+
+    for clave, deltas in propios.items():
+        if aplicar_deltas_resumen(db, *clave, deltas):
+            continue
+
+        # Mes cerrado o sin fila: lo resuelve el volcado general
+        _sumar(tomados, clave, {columna: -delta for columna, delta in deltas.items()})
+        with _lock:
+            _sumar(_pendientes, clave, deltas)
+
+
+def flush() -> int:
+    """Vuelca el buffer a la BD. Devuelve cuántos períodos se actualizaron."""
+    from crud.crud_resumen import aplicar_deltas_anual, aplicar_deltas_resumen, estado_periodo
+
+    global _pendientes
+
+    # (cliente_id, anio, mes) de meses que se cerraron antes del volcado
+    cerrados: list[tuple[int, int, int]] = []
+
+    with _flush_lock:
+        with _lock:
+            lote, _pendientes = _pendientes, {}
+
+        if not lote:
+            return 0
+
+        sin_fila = {}
+        descartados = 0
+
+        db = SessionLocal()
+        try:
+            for (cliente_id, anio, mes), deltas in lote.items():
+                if not aplicar_deltas_resumen(db, cliente_id, anio, mes, deltas):
+                    sin_fila[(cliente_id, anio, mes)] = deltas
+
+            # acumular() ya exige el resumen abierto: aquí solo falla si el
+            # cliente se eliminó o el mes se cerró después; si falta la
+            # fila y el cliente existe, se reintenta
+            if sin_fila:
+                existentes = set(db.execute(
+                    select(Cliente.id).where(Cliente.id.in_({c for c, _, _ in sin_fila}))
+                ).scalars())
+
+                for clave, deltas in list(sin_fila.items()):
+                    if clave[0] not in existentes:
+                        print(f"⚠️ Cliente {clave[0]} eliminado; se descartan sus deltas: {deltas}")
+                        del sin_fila[clave]
+                        descartados += 1
+                        continue
+
+                    mensual, anual = estado_periodo(db, *clave)
+                    if mensual != "cerrado":
+                        continue
+
+                    if anual != "cerrado":
+                        aplicar_deltas_anual(db, clave[0], clave[1], deltas)
+                    cerrados.append(clave)
+                    del sin_fila[clave]
+
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Error volcando resúmenes, se reintenta: {e}")
+
+            # Devolver los deltas al buffer
+            with _lock:
+                for clave, deltas in lote.items():
+                    _sumar(_pendientes, clave, deltas)
+            return 0
+
+        finally:
+            db.close()
+
+        if sin_fila:
+            print(f"⚠️ {len(sin_fila)} períodos sin resumen; sus deltas quedan en el buffer")
+            with _lock:
+                for clave, deltas in sin_fila.items():
+                    _sumar(_pendientes, clave, deltas)
+
+    # Fuera del lock del volcado: la reparación relee y bloquea filas del cliente
+    if cerrados:
+        _reparar_cerrados(cerrados)
+
+    return len(lote) - len(sin_fila) - descartados
+
+
+def _reparar_cerrados(cerrados: list[tuple[int, int, int]]):
+    from services.reconciliacion import reparar_cerrados
+
+    por_cliente = defaultdict(set)
+    for cliente_id, anio, mes in cerrados:
+        por_cliente[cliente_id].add((anio, mes))
+
+    for cliente_id, periodos in por_cliente.items():
+        try:
+            informe = reparar_cerrados(cliente_id, periodos)
+            print(
+                f"⚠️ Cliente {cliente_id}: deltas para meses ya cerrados {sorted(periodos)}; "
+                f"{informe['filas_reparadas']} resúmenes rehechos desde los movimientos"
+            )
+        except Exception as e:
+            print(
+                f"❌ Cliente {cliente_id}: no se pudieron rehacer los meses cerrados {sorted(periodos)} ({e}); "
+                f"correr python -m services.reconciliacion --reparar --cliente {cliente_id}"
+            )
+
+
+def _ciclo():
+    while not _detener.wait(RESUMEN_FLUSH_INTERVALO):
+        flush()
+
+
+# ======================================================
+# ARRANQUE / PARADA
+# ======================================================
+def iniciar():
+    global _hilo
+
+    if not activo() or _hilo is not None:
+        return
+
+    _detener.clear()
+    _hilo = threading.Thread(target=_ciclo, name="resumen-flush", daemon=True)
+    _hilo.start()
+
+
+def detener():
+    global _hilo
+
+    _detener.set()
+    if _hilo is not None:
+        _hilo.join()
+        _hilo = None
+
+    # Último volcado al apagar
+    flush()
@@ -0,0 +1,70 @@
+# ============================================
+# services/saldo_diario_service.py
+# Consolidación periódica de saldos_diarios.
+#
+# - Cada SALDO_CONSOLIDACION_INTERVALO segundos consolida los
+#   días cerrados (hasta ayer) que aún no tienen saldo diario
+# - Con varios procesos, el primero que inserta un día gana;
+#   los demás chocan con uq_saldo_diario y lo omiten
+# ============================================
+
+import os
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+
+SALDO_CONSOLIDACION_INTERVALO = float(os.getenv("SALDO_CONSOLIDACION_INTERVALO", "3600"))
+
+_detener = threading.Event()
+_hilo: threading.Thread | None = None
+
+
+def consolidar() -> int:
+    from crud.crud_saldos import consolidar_pendientes
+
+    db = SessionLocal()
+    try:
+        return consolidar_pendientes(db)
+    except IntegrityError:
+        # Otro proceso consolidó el mismo día
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+def _ciclo():
+    while not _detener.is_set():
+        try:
+            dias = consolidar()
+            if dias:
+                print(f"✅ Saldos diarios consolidados: {dias} día(s)")
+        except Exception as e:
+            print(f"❌ Error consolidando saldos diarios: {e}")
+
+        _detener.wait(SALDO_CONSOLIDACION_INTERVALO)
+
+
+# ======================================================
+# ARRANQUE / PARADA
+# ======================================================
+def iniciar():
+    global _hilo
+
+    if _hilo is not None:
+        return
+
+    _detener.clear()
+    _hilo = threading.Thread(target=_ciclo, name="saldos-diarios", daemon=True)
+    _hilo.start()
+
+
+def detener():
+    global _hilo
+
+    _detener.set()
+    if _hilo is not None:
+        _hilo.join()
+        _hilo = None
@@ -0,0 +1,57 @@
+# ============================================
+# services/serializacion.py
+# Camino rápido de JSON para los listados grandes.
+#
+# - La consulta trae tuplas de columnas, no objetos ORM
+#   (sin identity map ni instancias por fila)
+# - Las filas se codifican directo con orjson, sin pasar
+#   por la validación del response_model
+# - El esquema Pydantic define las columnas y sigue
+#   documentando la respuesta en OpenAPI
+# ============================================
+
+from typing import Iterable
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Boolean, type_coerce
+
+from services.paginacion import CABECERA_CURSOR
+
+
+def columnas(esquema: type[BaseModel], modelo) -> list:
+    """Columnas del modelo con los mismos nombres que los campos del esquema."""
+    resultado = []
+
+    for campo, info in esquema.model_fields.items():
+        columna = getattr(modelo, campo)
+
+        # Banderas guardadas como Integer (clientes.bloqueado): la
+        # respuesta las sigue entregando como true / false
+        if info.annotation is bool:
+            columna = type_coerce(columna, Boolean).label(campo)
+
+        resultado.append(columna)
+
+    return resultado
+
+
+def respuesta_filas(
+    filas: Iterable,
+    esquema: type[BaseModel],
+    siguiente: str | None = None
+) -> Response:
+    """
+    filas: tuplas en el orden de columnas(esquema, ...).
+    siguiente: cursor de la página siguiente (X-Siguiente-Cursor).
+    Las fechas y los enums los resuelve orjson.
+    """
+    campos = tuple(esquema.model_fields)
+    cuerpo = orjson.dumps([dict(zip(campos, fila)) for fila in filas])
+
+    respuesta = Response(cuerpo, media_type="application/json")
+    if siguiente:
+        respuesta.headers[CABECERA_CURSOR] = siguiente
+
+    return respuesta